@@ -2,21 +2,75 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin 
 from django.contrib import messages 
 from django.db import models 
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Concat
 from django import forms
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.html import format_html
+from django.utils import timezone
+from datetime import date
+import io
 from .models import (
-    User, FoodMenu, LeaveRequest, Bill, Feedback, LostAndFound, AdminNotification, MealRating
+    User, FoodMenu, LeaveRequest, Bill, Feedback, LostAndFound, AdminNotification, MealRating,
+    MealRatingDaily, OutboundMessage
 )
-from .utils import send_whatsapp_notification
+from .billing import generate_monthly_bills, change_leave_status
+from .exports import export_queryset, streaming_export_response
+from .forms import StudentImportForm
+from .onboarding import import_students
+
+
+class StudentNameMixin:
+    """
+    For admins of models with a user foreign key (`student_field`): annotates
+    "First Last (username)" onto the queryset with one JOIN, so the
+    get_student_full_name column does not fetch the user row by row.
+    """
+    student_field = 'student'
+
+    def get_queryset(self, request):
+        user = self.student_field
+        return super().get_queryset(request).annotate(student_display_name=Case(
+            When(**{f'{user}__isnull': True}, then=Value('N/A')),
+            default=Concat(f'{user}__first_name', Value(' '), f'{user}__last_name', Value(' ('), f'{user}__username', Value(')')),
+            output_field=CharField(),
+        ))
 
 
 def get_student_full_name(obj):
+    name = getattr(obj, 'student_display_name', None)
+    if name is not None:
+        return name
     user = getattr(obj, 'student', getattr(obj, 'reporter', None))
     if user:
         return f"{user.first_name} {user.last_name} ({user.username})"
     return "N/A"
 
 get_student_full_name.short_description = 'Student Name'
-get_student_full_name.admin_order_field = 'student__first_name' 
+get_student_full_name.admin_order_field = 'student_display_name'
+
+
+def get_reporter_full_name(obj):
+    return get_student_full_name(obj)
+
+get_reporter_full_name.short_description = 'Reporter'
+get_reporter_full_name.admin_order_field = 'student_display_name'
+
+
+def export_action(kind, fmt):
+    """
+    An admin action that streams the selected rows (all rows matching the
+    changelist filters with "select all") as a CSV or JSON Lines download.
+    """
+    def export_selected(modeladmin, request, queryset):
+        return streaming_export_response(kind, export_queryset(kind, queryset=queryset), fmt)
+
+    export_selected.__name__ = f'export_{kind}_{fmt}'
+    export_selected.short_description = f"Export selected {kind} as {'CSV' if fmt == 'csv' else 'JSON Lines'}"
+    return export_selected
 
 # --- 1. Custom User Admin for Role Management ---
 
@@ -29,6 +83,69 @@ class CustomUserAdmin(UserAdmin):
     )
     list_display = ('username', 'email', 'first_name', 'department', 'role', 'is_staff')
     list_filter = ('role', 'is_staff', 'is_superuser')
+    actions = ['generate_current_month_bills']
+
+    def generate_current_month_bills(self, request, queryset):
+        """
+        Action to create or refresh this month's bills for the selected students
+        in one transaction, instead of saving each bill by hand.
+        """
+        month = date.today().replace(day=1)
+        result = generate_monthly_bills(month, students=queryset.filter(role=User.STUDENT))
+        self.message_user(
+            request,
+            f"{month.strftime('%B %Y')}: {result['created']} bill(s) created, {result['updated']} bill(s) updated.",
+            messages.SUCCESS,
+        )
+
+    generate_current_month_bills.short_description = "Generate this month's bills for selected students"
+
+    # --- Bulk onboarding from CSV ---
+
+    change_list_template = 'admin/mess_app/user/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import-students/', self.admin_site.admin_view(self.import_students_view), name='mess_app_user_import_students'),
+        ] + super().get_urls()
+
+    def import_students_view(self, request):
+        """
+        Creates the students of an uploaded CSV in one go, instead of one add
+        form (and one password hash in the request thread) per student.
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            dry_run = form.cleaned_data['dry_run']
+            try:
+                result = import_students(
+                    io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline=''), dry_run=dry_run,
+                )
+            except (ValueError, UnicodeDecodeError) as exc:
+                form.add_error('csv_file', str(exc))
+            else:
+                for line, error in result['errors'][:20]:
+                    self.message_user(request, f"Line {line}: {error}", messages.WARNING)
+                if len(result['errors']) > 20:
+                    self.message_user(request, f"...and {len(result['errors']) - 20} more rejected row(s).", messages.WARNING)
+                if dry_run:
+                    self.message_user(request, f"{result['valid']} valid row(s), {len(result['errors'])} rejected. Nothing was created.")
+                    return redirect(request.path)
+                self.message_user(
+                    request, f"{result['created']} student(s) created in {result['seconds']:.1f}s.", messages.SUCCESS,
+                )
+                return redirect('admin:mess_app_user_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import students from CSV',
+        }
+        return TemplateResponse(request, 'admin/mess_app/user/import_students.html', context)
 
 admin.site.register(User, CustomUserAdmin)
 
@@ -71,25 +188,41 @@ class FoodMenuAdmin(admin.ModelAdmin):
                     "Check the Portal for the full weekly menu."
                 )
 
-                # Send notification to all students
-                for student in students_to_notify:
-                    # recipient = f"whatsapp:{student.mobile_number}" 
-                    send_whatsapp_notification(student.mobile_number, message_body)
+                # Queue one message per student; the notification worker sends them
+                broadcast, queued = OutboundMessage.queue_broadcast(
+                    students_to_notify.values_list('mobile_number', flat=True), message_body
+                )
 
-                self.message_user(request, "Menu updated and WhatsApp notifications have been sent to students.", level=messages.SUCCESS)
+                self.message_user(
+                    request,
+                    f"Menu updated. WhatsApp notifications queued for {queued} student(s) as broadcast {broadcast}; "
+                    "the notification worker will send them shortly.",
+                    level=messages.SUCCESS,
+                )
 
             except Exception as e:
-                self.message_user(request, f"Menu saved, but failed to send some WhatsApp notifications: {e}", level=messages.WARNING)
+                self.message_user(request, f"Menu saved, but failed to queue the WhatsApp notifications: {e}", level=messages.WARNING)
 
 @admin.register(LeaveRequest)
-class LeaveRequestAdmin(admin.ModelAdmin):
+class LeaveRequestAdmin(StudentNameMixin, admin.ModelAdmin):
     list_display = (get_student_full_name, 'from_date', 'to_date', 'total_leave_days', 'status', 'requested_on')
     list_filter = ('status', 'from_date')
     readonly_fields = ('requested_on',)
+    actions = ['approve_selected_leaves', 'reject_selected_leaves', export_action('leaves', 'csv'), export_action('leaves', 'jsonl')]
+
+    def approve_selected_leaves(self, request, queryset):
+        changed = change_leave_status(queryset, 'A')
+        self.message_user(request, f"{changed} leave request(s) approved and the affected bills re-priced.", messages.SUCCESS)
+    approve_selected_leaves.short_description = "Approve selected leave requests"
+
+    def reject_selected_leaves(self, request, queryset):
+        changed = change_leave_status(queryset, 'R')
+        self.message_user(request, f"{changed} leave request(s) rejected and the affected bills re-priced.", messages.SUCCESS)
+    reject_selected_leaves.short_description = "Reject selected leave requests"
 
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(StudentNameMixin, admin.ModelAdmin):
     list_display = (get_student_full_name, 'comment', 'submitted_at')
     list_filter = ()
     search_fields = ('comment', 'student__username', 'student__first_name', 'student__last_name')
@@ -97,16 +230,16 @@ class FeedbackAdmin(admin.ModelAdmin):
 
 
 @admin.register(Bill)
-class BillAdmin(admin.ModelAdmin):
+class BillAdmin(StudentNameMixin, admin.ModelAdmin):
     # Display the notification status (Check/Cross) in the list view
-    list_display = ('student_full_name', 'month', 'total_amount', 'status', 'last_date_of_payment', 'notification_sent')
+    list_display = (get_student_full_name, 'month', 'total_amount', 'status', 'last_date_of_payment', 'notification_sent')
     
     # Filters to help find unsent or due bills
     list_filter = ('status', 'month', 'notification_sent')
     search_fields = ('student__username', 'student__first_name', 'student__last_name')
     
     # Add the manual resend action to the dropdown menu
-    actions = ['resend_bill_notifications']
+    actions = ['resend_bill_notifications', export_action('bills', 'csv'), export_action('bills', 'jsonl')]
     
     # Protect calculated fields from manual editing
     readonly_fields = ('base_amount', 'adjustment_amount', 'total_amount', 'leave_days_approved', 'notification_sent', 'current_student_display')
@@ -118,20 +251,17 @@ class BillAdmin(admin.ModelAdmin):
         'base_amount', 'adjustment_amount', 'total_amount', 'notification_sent'
     )
 
-    def student_full_name(self, obj):
-        return f"{obj.student.first_name} {obj.student.last_name} ({obj.student.username})"
-    
     def current_student_display(self, obj):
         if obj.pk:
-            return f"<strong>{obj.student.first_name} {obj.student.last_name}</strong>"
+            return format_html("<strong>{}</strong>", get_student_full_name(obj))
         return "Select a student above."
     current_student_display.short_description = "Selected Student Name"
-    current_student_display.allow_tags = True 
 
     def resend_bill_notifications(self, request, queryset):
         """
         Action to manually resend notifications.
-        Resets the flag and saves the model to trigger the automatic logic in models.py.
+        Resets the flag and saves the model to trigger the automatic logic in models.py,
+        which queues the message for the notification worker.
         """
         sent_count = 0
         for bill in queryset:
@@ -140,19 +270,17 @@ class BillAdmin(admin.ModelAdmin):
             bill.save() 
             sent_count += 1
         
-        self.message_user(request, f"Successfully resending notification for {sent_count} bill(s).", messages.SUCCESS)
+        self.message_user(request, f"Notification queued for {sent_count} bill(s).", messages.SUCCESS)
     
     resend_bill_notifications.short_description = "Resend WhatsApp Notifications to selected bills"
 
 
 @admin.register(LostAndFound)
-class LostAndFoundAdmin(admin.ModelAdmin):
-    list_display = ('item_name', get_student_full_name, 'type', 'is_approved', 'date_event', 'posted_on')
+class LostAndFoundAdmin(StudentNameMixin, admin.ModelAdmin):
+    list_display = ('item_name', get_reporter_full_name, 'type', 'is_approved', 'date_event', 'posted_on')
     list_filter = ('is_approved', 'type')
     actions = ['approve_selected_items']
-    
-    get_student_full_name.admin_order_field = 'reporter__first_name' 
-    get_student_full_name.short_description = 'Reporter'
+    student_field = 'reporter'
 
     def approve_selected_items(self, request, queryset):
         unapproved_items = queryset.filter(is_approved=False)
@@ -170,11 +298,59 @@ class AdminNotificationAdmin(admin.ModelAdmin):
 # --- 7. Meal Rating Admin ---
 
 @admin.register(MealRating)
-class MealRatingAdmin(admin.ModelAdmin):
+class MealRatingAdmin(StudentNameMixin, admin.ModelAdmin):
     list_display = (get_student_full_name, 'rating_date', 'meal_type', 'rating_score', 'submitted_at')
     list_filter = ('rating_date', 'meal_type', 'rating_score')
     search_fields = ('student__username', 'comment', 'student__first_name', 'student__last_name')
     readonly_fields = ('student', 'rating_date', 'meal_type', 'rating_score', 'comment', 'submitted_at')
-    
-    get_student_full_name.admin_order_field = 'student__first_name' 
-    get_student_full_name.short_description = 'Student Name'
\ No newline at end of file
+    actions = [export_action('ratings', 'csv'), export_action('ratings', 'jsonl')]
+
+
+@admin.register(MealRatingDaily)
+class MealRatingDailyAdmin(admin.ModelAdmin):
+    """Per-meal daily averages, read straight from the running totals."""
+    list_display = ('rating_date', 'meal_type', 'rating_count', 'average_rating', 'score_histogram')
+    list_filter = ('meal_type', 'rating_date')
+    date_hierarchy = 'rating_date'
+
+    def average_rating(self, obj):
+        return obj.average if obj.average is not None else 'N/A'
+    average_rating.short_description = 'Average'
+
+    def score_histogram(self, obj):
+        return ' · '.join(f"{score}★ {count}" for score, count in obj.histogram.items())
+    score_histogram.short_description = 'Scores (1-5)'
+
+    # Totals are maintained from MealRating; never edited by hand
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# --- 8. Notification Outbox Admin ---
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'bill', 'broadcast', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status',)
+    # Bill.__str__ shows the student's username
+    list_select_related = ('bill__student',)
+    # Searching a broadcast id lists that broadcast's messages
+    search_fields = ('recipient', 'body', 'broadcast')
+    readonly_fields = (
+        'recipient', 'body', 'bill', 'broadcast', 'status', 'attempts', 'next_attempt_at', 'claimed_by',
+        'claimed_until', 'provider_sid', 'last_error', 'created_at', 'sent_at',
+    )
+    actions = ['retry_selected_messages']
+
+    def retry_selected_messages(self, request, queryset):
+        retried = queryset.exclude(status=OutboundMessage.SENT).update(
+            status=OutboundMessage.PENDING, attempts=0, next_attempt_at=timezone.now(),
+            claimed_by='', claimed_until=None,
+        )
+        self.message_user(request, f"{retried} message(s) will be retried by the notification worker.")
+    retry_selected_messages.short_description = "Retry selected messages now"
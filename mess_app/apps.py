@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class MessAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mess_app'
+
+    def ready(self):
+        # Registers the signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,53 @@
+"""
+Authentication backend for the email-or-username login form.
+
+Django's ModelBackend only looks users up by username, so the login form used
+to find the user by email first and then authenticate() by username: two
+lookups, and a miss on the email fell back to a second authenticate(), i.e.
+two password hashes for one bad login. This backend resolves the login in a
+single query (username, or email through the case-insensitive email index)
+and hashes the password exactly once, whether or not a user was found.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+
+def find_login_user(login):
+    """
+    The user `login` refers to: the user whose email matches it case-
+    insensitively (when it contains '@' and only one account uses that
+    email), else the user with that username, else None. One query.
+    """
+    UserModel = get_user_model()
+    lookup = Q(**{UserModel.USERNAME_FIELD: login})
+    if '@' in login:
+        # Lower(email) = lower(login) is answered from user_email_lower_idx
+        lookup |= Q(email_lower=login.lower())
+    candidates = list(UserModel._default_manager.annotate(email_lower=Lower('email')).filter(lookup))
+
+    by_email = [user for user in candidates if '@' in login and user.email_lower == login.lower()]
+    if len(by_email) == 1:
+        return by_email[0]
+    by_username = [user for user in candidates if user.get_username() == login]
+    return by_username[0] if by_username else None
+
+
+class EmailOrUsernameBackend(ModelBackend):
+    """ModelBackend (permissions included) that also accepts an email as the username."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(get_user_model().USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = find_login_user(username)
+        if user is None:
+            # Hash anyway so unknown logins take as long as wrong passwords
+            get_user_model()().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
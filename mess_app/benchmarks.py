@@ -0,0 +1,517 @@
+"""
+Micro-benchmarks for the hot paths of MessNet.
+
+Every benchmark seeds its own rows, times the code under test and returns a
+dict of results. Run them with `python manage.py run_benchmarks`, which points
+them at a throwaway test database.
+"""
+import asyncio
+import io
+import os
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User, LeaveRequest, Bill, OutboundMessage
+from .billing import month_bounds, generate_monthly_bills, apply_leave_day_changes, change_leave_status
+from .broadcast import RateLimiter
+from .events import dashboard_hub
+from .exports import EXPORTS, FORMATS, export_queryset, export_lines
+from .sse import DashboardEventStream
+from .instrumentation import QueryCounter
+from .onboarding import import_students
+from .outbox import deliver_batch
+from .seeding import seed_benchmark_data
+from .session_cleanup import clear_expired_sessions
+from .testing import FakeTwilioServer
+from .utils import send_whatsapp_message
+from .views import DASHBOARD_MODULES
+
+
+def measure(func):
+    """
+    Runs func once and returns (result, {'seconds': ..., 'queries': ...}).
+
+    The benchmarks run inside a transaction that is rolled back, so the
+    on_commit callbacks func registers (version bumps, live pushes) would never
+    run. They are run here, inside the measurement, as a commit would.
+    """
+    with QueryCounter() as queries:
+        start = time.perf_counter()
+        pending = len(connection.run_on_commit)
+        result = func()
+        for _, callback in connection.run_on_commit[pending:]:
+            callback()
+        del connection.run_on_commit[pending:]
+        elapsed = time.perf_counter() - start
+    return result, {'seconds': round(elapsed, 4), 'queries': queries.count}
+
+
+def create_students(count, prefix='bench'):
+    """Bulk-creates `count` student accounts and returns their ids."""
+    User.objects.bulk_create(
+        [User(username=f'{prefix}{i:05d}', role=User.STUDENT, password='!') for i in range(count)],
+        batch_size=500,
+    )
+    return list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+
+
+# --- 1. Monthly Bill Generation ---
+
+def bench_bill_generation(students=500, leaves_per_student=3):
+    """Per-row Bill.save() versus the set-based generate_monthly_bills()."""
+    month_start, month_end = month_bounds(date.today())
+    rate = Decimal('100.00')
+    due_date = month_end + timedelta(days=10)
+
+    student_ids = create_students(students)
+    leaves = []
+    for i, student_id in enumerate(student_ids):
+        for n in range(leaves_per_student):
+            # Some leaves start in the previous month to exercise the overlap maths
+            from_date = month_start + timedelta(days=(i + n * 9) % 30 - 3)
+            leaves.append(LeaveRequest(
+                student_id=student_id, from_date=from_date, to_date=from_date + timedelta(days=2),
+                reason='Benchmark leave', status='A',
+            ))
+    LeaveRequest.objects.bulk_create(leaves, batch_size=500)
+    # bulk_create skips LeaveRequest.save(), which keeps the leave day ledger
+    apply_leave_day_changes(added=[(leave.student_id, leave.from_date, leave.to_date) for leave in leaves])
+
+    def per_row():
+        for student_id in student_ids:
+            # notification_sent=True keeps Twilio out of the measurement
+            Bill(
+                student_id=student_id, month=month_start, base_rate_per_day=rate,
+                total_days_in_month=month_end.day, last_date_of_payment=due_date, notification_sent=True,
+            ).save()
+        return sorted(Bill.objects.values_list('student_id', 'total_amount'))
+
+    def set_based():
+        generate_monthly_bills(month_start, base_rate_per_day=rate, last_date_of_payment=due_date, notify=False)
+        return sorted(Bill.objects.values_list('student_id', 'total_amount'))
+
+    per_row_totals, per_row_stats = measure(per_row)
+    Bill.objects.all().delete()
+    set_based_totals, set_based_stats = measure(set_based)
+
+    return {
+        'students': students,
+        'leaves': len(leaves),
+        'per_row_save': per_row_stats,
+        'set_based': set_based_stats,
+        'speedup': round(per_row_stats['seconds'] / max(set_based_stats['seconds'], 1e-9), 1),
+        'totals_match': per_row_totals == set_based_totals,
+    }
+
+
+# --- 2. Bulk Leave Approval ---
+
+def bench_leave_approval(students=500, leaves_per_student=2):
+    """
+    Approving pending leave requests one change-form save at a time versus the
+    bulk admin action, with a bill already issued for every student.
+    """
+    month_start, _ = month_bounds(date.today())
+    student_ids = create_students(students, prefix='leave')
+    generate_monthly_bills(month_start, notify=False, students=User.objects.filter(pk__in=student_ids))
+    LeaveRequest.objects.bulk_create([
+        LeaveRequest(
+            student_id=student_id, from_date=month_start + timedelta(days=n * 7), to_date=month_start + timedelta(days=n * 7 + 1),
+            reason='Term break', status='P',
+        )
+        for student_id in student_ids for n in range(leaves_per_student)
+    ], batch_size=500)
+    pending = LeaveRequest.objects.filter(student_id__in=student_ids, status='P')
+
+    def per_row():
+        for leave in pending:
+            leave.status = 'A'
+            leave.save()
+        return sorted(Bill.objects.filter(student_id__in=student_ids).values_list('student_id', 'total_amount'))
+
+    def bulk_action():
+        change_leave_status(pending, 'A')
+        return sorted(Bill.objects.filter(student_id__in=student_ids).values_list('student_id', 'total_amount'))
+
+    results = {}
+    for name, func in (('per_row_save', per_row), ('bulk_action', bulk_action)):
+        # Each variant starts from the same pending state
+        with transaction.atomic():
+            results[name] = measure(func)
+            transaction.set_rollback(True)
+
+    (per_row_totals, per_row_stats), (bulk_totals, bulk_stats) = results['per_row_save'], results['bulk_action']
+    return {
+        'leave_requests': students * leaves_per_student,
+        'per_row_save': per_row_stats,
+        'bulk_action': bulk_stats,
+        'speedup': round(per_row_stats['seconds'] / max(bulk_stats['seconds'], 1e-9), 1),
+        'totals_match': per_row_totals == bulk_totals,
+    }
+
+
+# --- 3. Menu Update Broadcast ---
+
+def bench_menu_broadcast(students=500, latency=0.05, rate_per_second=0, batch_size=50):
+    """
+    Sequential sends versus the notification worker draining a queued menu
+    broadcast through its fan-out pool, against a local stub of the Twilio API
+    that answers after `latency` seconds.
+    """
+    recipients = [f'+9190000{i:05d}' for i in range(students)]
+    body = "🍽️ MESS MENU UPDATE - Benchmark"
+
+    with FakeTwilioServer(latency=latency) as twilio, override_settings(
+        TWILIO_ACCOUNT_SID='AC00000000000000000000000000000000', TWILIO_AUTH_TOKEN='benchmark',
+        TWILIO_WHATSAPP_NUMBER='whatsapp:+14155238886', TWILIO_API_BASE_URL=twilio.url,
+    ):
+        start = time.perf_counter()
+        for recipient in recipients:
+            send_whatsapp_message(recipient, body)
+        sequential_seconds = time.perf_counter() - start
+
+        broadcast, _ = OutboundMessage.queue_broadcast(recipients, body)
+        limiter = RateLimiter(rate_per_second)
+        start = time.perf_counter()
+        while deliver_batch(batch_size, limiter=limiter)['broadcasts']:
+            pass
+        worker_seconds = time.perf_counter() - start
+        totals = OutboundMessage.broadcast_summary(broadcast)
+
+    return {
+        'recipients': students,
+        'stub_latency_seconds': latency,
+        'sequential': {'seconds': round(sequential_seconds, 3), 'messages_per_second': round(students / sequential_seconds, 1)},
+        'worker_fan_out': {
+            'seconds': round(worker_seconds, 3),
+            'messages_per_second': round(totals['sent'] / max(worker_seconds, 1e-9), 1),
+            'sent': totals['sent'],
+            'retrying': totals['retrying'],
+            'failed': totals['failed'],
+        },
+        'speedup': round(sequential_seconds / max(worker_seconds, 1e-9), 1),
+    }
+
+
+# --- 4. Idle Server-Sent Events Connections ---
+
+def bench_sse_connections(students=500):
+    """
+    Opens one dashboard stream per student on a single event loop (one worker)
+    and measures the memory held per idle connection and the time it takes to
+    push one notification change to all of them. Auth and data loading are
+    stubbed so only the streaming machinery is measured.
+    """
+    state = {'version': 1}
+
+    class BenchmarkStream(DashboardEventStream):
+        async def authenticate(self, scope):
+            return SimpleNamespace(pk=scope['user_id'])
+
+        async def load_update(self, user, last_etag):
+            etag = str(state['version'])
+            return etag, (None if etag == last_etag else {'notifications': [], 'version': etag})
+
+    async def run():
+        stream = BenchmarkStream()
+        closed = asyncio.Event()
+        delivered = [0]
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message['body'].startswith(b'id:'):
+                delivered[0] += 1
+
+        async def wait_for(count):
+            while delivered[0] < count:
+                await asyncio.sleep(0.001)
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(stream({'type': 'http', 'method': 'GET', 'headers': [], 'user_id': i}, receive, send))
+            for i in range(students)
+        ]
+        await wait_for(students)
+        connect_seconds = time.perf_counter() - start
+        idle_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        state['version'] += 1
+        start = time.perf_counter()
+        dashboard_hub.publish()
+        await wait_for(2 * students)
+        fan_out_seconds = time.perf_counter() - start
+
+        closed.set()
+        await asyncio.gather(*tasks)
+        return connect_seconds, idle_bytes, fan_out_seconds
+
+    connect_seconds, idle_bytes, fan_out_seconds = asyncio.run(run())
+    return {
+        'connections': students,
+        'connect_seconds': round(connect_seconds, 3),
+        'memory_per_idle_connection_kb': round(idle_bytes / students / 1024, 2),
+        'push_to_all_seconds': round(fan_out_seconds, 4),
+        'open_after_close': dashboard_hub.connection_count(),
+    }
+
+
+# --- 5. Student Dashboard ---
+
+def timed_get(client, url, repeat=5, **headers):
+    """GETs url `repeat` times; returns the last response and the per-request mean."""
+    seconds = queries = 0
+    for _ in range(repeat):
+        with QueryCounter() as counter:
+            start = time.perf_counter()
+            response = client.get(url, **headers)
+            seconds += time.perf_counter() - start
+        queries += counter.count
+    return response, {'status': response.status_code, 'seconds': round(seconds / repeat, 4), 'queries': queries // repeat}
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+def bench_dashboard(students=500, years=2):
+    """
+    The student dashboard shell, each module fragment and data_endpoint for
+    one student on a database seeded with `students` students and `years` of
+    history each.
+    """
+    seeded = seed_benchmark_data(students=students, years=years, prefix='dash')
+    client = Client()
+    client.force_login(User.objects.filter(username__startswith='dash').order_by('username').first())
+
+    cache.clear()
+    _, cold = timed_get(client, reverse('student_dashboard'), repeat=1)
+    _, warm = timed_get(client, reverse('student_dashboard'))
+    response, data = timed_get(client, reverse('data_endpoint'))
+    _, not_modified = timed_get(client, reverse('data_endpoint'), HTTP_IF_NONE_MATCH=response['ETag'])
+    _, history = timed_get(client, reverse('leave_history'))
+    # What opening each of the other tabs costs
+    modules = {module: timed_get(client, reverse('dashboard_module', args=[module]))[1] for module in DASHBOARD_MODULES}
+
+    return {
+        'rows': seeded,
+        'dashboard_cold_cache': cold,
+        'dashboard': warm,
+        'modules': modules,
+        'data_endpoint': data,
+        'data_endpoint_not_modified': not_modified,
+        'leave_history_page': history,
+    }
+
+
+# --- 6. Admin Changelists ---
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+def bench_admin_changelists(students=500, years=2):
+    """Every mess_app changelist, first page, on a seeded database."""
+    seeded = seed_benchmark_data(students=students, years=years, prefix='admin')
+    client = Client()
+    client.force_login(User.objects.create_superuser(username='bench-admin', email='', password='!', role=User.ADMIN))
+
+    changelists = {}
+    for model in sorted(admin.site._registry, key=lambda model: model.__name__):
+        if model._meta.app_label != 'mess_app':
+            continue
+        url = reverse(f'admin:mess_app_{model._meta.model_name}_changelist')
+        _, changelists[model.__name__] = timed_get(client, url, repeat=3)
+    return {'rows': seeded, 'changelists': changelists}
+
+
+# --- 7. Sessions ---
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+def bench_sessions(students=500, years=2):
+    """
+    Per-poll DB reads with database-backed and cache-backed (cached_db)
+    sessions, and the batched cleanup of one expired session per student
+    per day of a week.
+    """
+    user = User.objects.create(username='bench-session', role=User.STUDENT)
+    polls = {}
+    for engine in ('db', 'cached_db'):
+        with override_settings(SESSION_ENGINE=f'django.contrib.sessions.backends.{engine}'):
+            client = Client()
+            client.force_login(user)
+            response, _ = timed_get(client, reverse('data_endpoint'), repeat=1)
+            _, polls[engine] = timed_get(client, reverse('data_endpoint'), HTTP_IF_NONE_MATCH=response['ETag'], repeat=20)
+
+    now = timezone.now()
+    Session.objects.bulk_create([
+        Session(session_key=f'bench{n:08d}', session_data='', expire_date=now - timedelta(hours=n % 168 + 1))
+        for n in range(students * 7)
+    ], batch_size=1000)
+    with QueryCounter() as queries:
+        cleanup = clear_expired_sessions()
+
+    return {'poll_not_modified': polls, 'cleanup': {**cleanup, 'queries': queries.count}}
+
+
+# --- 8. Template Rendering ---
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+def bench_template_rendering(students=500, years=2, repeat=50):
+    """
+    Rendering the dashboard shell and the dashboard and menu fragments, with
+    and without the cached template loader and the {% cache %} fragments.
+    """
+    seed_benchmark_data(students=students, years=years, prefix='tpl')
+    user = User.objects.filter(username__startswith='tpl').order_by('username').first()
+    engine = settings.TEMPLATES[0]
+    plain_loaders = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+    loaders = {'plain': plain_loaders, 'cached': [('django.template.loaders.cached.Loader', plain_loaders)]}
+    fragment_caches = {
+        # {% cache %} uses the 'template_fragments' cache when there is one
+        'off': {**settings.CACHES, 'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        'on': settings.CACHES,
+    }
+    urls = {
+        'shell': reverse('student_dashboard'),
+        'dashboard': reverse('dashboard_module', args=['dashboard']),
+        'menu': reverse('dashboard_module', args=['menu']),
+    }
+
+    results = {}
+    for loader_name, loader in loaders.items():
+        for fragments, caches in fragment_caches.items():
+            templates = [{**engine, 'OPTIONS': {**engine['OPTIONS'], 'loaders': loader}}]
+            with override_settings(TEMPLATES=templates, CACHES=caches):
+                client = Client()
+                client.force_login(user)
+                results[f'loader_{loader_name}_fragments_{fragments}'] = {
+                    name: timed_get(client, url, repeat=repeat)[1] for name, url in urls.items()
+                }
+    return results
+
+
+# --- 9. Accounting Exports ---
+
+def bench_exports(students=500, years=2):
+    """Streams every export in both formats; the peak memory should not grow with the row count."""
+    seed_benchmark_data(students=students, years=years, prefix='export')
+    results = {}
+    for kind in EXPORTS:
+        for fmt in FORMATS:
+            start = time.perf_counter()
+            rows = size = 0
+            for line in export_lines(kind, export_queryset(kind), fmt):
+                rows += 1
+                size += len(line)
+            seconds = time.perf_counter() - start
+
+            # Memory in a second pass: tracing slows the export down several times
+            tracemalloc.start()
+            for line in export_lines(kind, export_queryset(kind), fmt):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[f'{kind}_{fmt}'] = {
+                'lines': rows, 'megabytes': round(size / 1024 / 1024, 2),
+                'seconds': round(seconds, 3), 'peak_memory_kb': round(peak / 1024, 1),
+            }
+    return results
+
+
+# --- 10. Student Onboarding ---
+
+def bench_student_import(students=500):
+    """Imports `students` CSV rows with serial hashing, then with one hashing process per CPU."""
+    def csv_file(prefix, mobile_prefix):
+        lines = ['username,first_name,last_name,email,department,mobile_number,password']
+        lines += [f'{prefix}{i:05d},Import,{i},{prefix}{i}@example.com,CSE,{mobile_prefix}{i:09d},pw-{i}' for i in range(students)]
+        return io.StringIO('\n'.join(lines) + '\n')
+
+    results = {'cpus': os.cpu_count()}
+    for label, prefix, mobile_prefix, workers in (('serial', 'ser', 9, 1), ('pool', 'par', 8, None)):
+        result, stats = measure(lambda: import_students(csv_file(prefix, mobile_prefix), workers=workers))
+        results[label] = {'created': result['created'], **stats}
+    results['speedup'] = round(results['serial']['seconds'] / results['pool']['seconds'], 2)
+    return results
+
+
+# --- 11. Login Throughput ---
+
+def _legacy_authenticate(login, password):
+    # The login form before EmailOrUsernameBackend: look the email up, then authenticate() by username
+    # (another lookup), falling back to authenticate() with the raw login (another hash) on a miss
+    user = None
+    with override_settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend']):
+        if '@' in login:
+            match = User.objects.filter(email__iexact=login).first()
+            if match:
+                user = authenticate(None, username=match.username, password=password)
+        if user is None:
+            user = authenticate(None, username=login, password=password)
+    return user
+
+
+def _backend_authenticate(login, password):
+    return authenticate(None, username=login, password=password)
+
+
+def bench_logins(students=500, attempts=40):
+    """
+    Logins per second, queries and password hashes per login for a meal-time
+    mix of email, username and failed logins, with the old two-step lookup and
+    with EmailOrUsernameBackend.
+    """
+    password_hash = make_password('meal-rush')
+    User.objects.bulk_create([
+        User(username=f'login{i:05d}', email=f'Login{i}@Example.com', role=User.STUDENT, password=password_hash)
+        for i in range(students)
+    ], batch_size=500)
+    logins = []
+    for n in range(attempts):
+        i = n * 7919 % students
+        logins.append([
+            (f'login{i}@example.com', 'meal-rush'), (f'login{i:05d}', 'meal-rush'),
+            (f'login{i}@example.com', 'wrong'), (f'nobody{i}@example.com', 'meal-rush'),
+        ][n % 4])
+
+    hasher = get_hasher()
+    results = {}
+    for label, login in (('legacy', _legacy_authenticate), ('backend', _backend_authenticate)):
+        with mock.patch.object(type(hasher), 'encode', autospec=True, side_effect=type(hasher).encode) as encode:
+            accepted, stats = measure(lambda: sum(login(username, password) is not None for username, password in logins))
+        results[label] = {
+            'accepted': accepted, 'logins_per_second': round(attempts / stats['seconds'], 1),
+            'queries_per_login': round(stats['queries'] / attempts, 2), 'hashes_per_login': round(encode.call_count / attempts, 2),
+        }
+    return results
+
+
+BENCHMARKS = {
+    'bills': bench_bill_generation,
+    'leaves': bench_leave_approval,
+    'broadcast': bench_menu_broadcast,
+    'sse': bench_sse_connections,
+    'dashboard': bench_dashboard,
+    'admin': bench_admin_changelists,
+    'sessions': bench_sessions,
+    'templates': bench_template_rendering,
+    'exports': bench_exports,
+    'onboarding': bench_student_import,
+    'logins': bench_logins,
+}
@@ -0,0 +1,232 @@
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import User, LeaveRequest, Bill, LeaveDayLedger, OutboundMessage
+from .versions import BILLS, user_scope, bump_versions
+
+# Fields rewritten when an existing bill is regenerated
+BILL_UPDATE_FIELDS = [
+    'base_rate_per_day', 'leave_days_approved',
+    'base_amount', 'adjustment_amount', 'total_amount',
+]
+
+
+def month_bounds(month):
+    """Returns the first and last date of the month containing `month`."""
+    _, last_day = calendar.monthrange(month.year, month.month)
+    return month.replace(day=1), month.replace(day=last_day)
+
+
+def approved_leave_days_by_student(month, students=None):
+    """
+    Reads approved leave days inside the month for every student from the
+    LeaveDayLedger in ONE query.
+    `students` may be a User queryset (used as a subquery) or a list of ids.
+    Returns a dict of {student_id: days}; students without leave are absent.
+    """
+    ledger = LeaveDayLedger.objects.filter(month=month.replace(day=1), approved_days__gt=0)
+    if students is not None:
+        ledger = ledger.filter(student__in=students)
+    return dict(ledger.values_list('student_id', 'approved_days'))
+
+
+def leave_days_by_month(from_date, to_date):
+    """Splits an inclusive date range at month boundaries: {first of month: days}."""
+    days = {}
+    start = from_date
+    while start <= to_date:
+        month_start, month_end = month_bounds(start)
+        end = min(month_end, to_date)
+        days[month_start] = (end - start).days + 1
+        start = month_end + timedelta(days=1)
+    return days
+
+
+def apply_leave_day_changes(removed=(), added=()):
+    """
+    Moves approved leave ranges out of / into the LeaveDayLedger and re-prices
+    the bills of every (student, month) whose leave days changed.
+
+    `removed` and `added` are iterables of (student_id, from_date, to_date).
+    Counters are changed with F() expressions, one UPDATE per (month, change)
+    rather than per leave, so bulk approvals stay cheap. Must run inside the
+    transaction that changed the leaves.
+    """
+    deltas = defaultdict(int)
+    for sign, ranges in ((-1, removed), (1, added)):
+        for student_id, from_date, to_date in ranges:
+            for month_start, days in leave_days_by_month(from_date, to_date).items():
+                deltas[(student_id, month_start)] += sign * days
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    LeaveDayLedger.objects.bulk_create(
+        [LeaveDayLedger(student_id=student_id, month=month) for student_id, month in deltas],
+        batch_size=500, ignore_conflicts=True,
+    )
+    students_by_change = defaultdict(list)
+    for (student_id, month_start), delta in deltas.items():
+        students_by_change[(month_start, delta)].append(student_id)
+    for (month_start, delta), student_ids in students_by_change.items():
+        LeaveDayLedger.objects.filter(month=month_start, student_id__in=student_ids).update(
+            approved_days=F('approved_days') + delta
+        )
+
+    reprice_bills(deltas.keys())
+
+
+def change_leave_status(leaves, status):
+    """
+    Sets the status of every leave request in the queryset with one UPDATE,
+    then moves the approved days in or out of the ledger and re-prices the
+    affected bills in bulk, all in one transaction. Requests already in that
+    status are left alone. Returns the number of requests changed.
+    """
+    with transaction.atomic():
+        changing = list(
+            leaves.exclude(status=status).select_for_update()
+            .values_list('pk', 'student_id', 'status', 'from_date', 'to_date')
+        )
+        if not changing:
+            return 0
+        LeaveRequest.objects.filter(pk__in=[row[0] for row in changing]).update(status=status)
+
+        removed = [(student_id, from_date, to_date) for _, student_id, old_status, from_date, to_date in changing if old_status == 'A']
+        added = [(student_id, from_date, to_date) for _, student_id, _, from_date, to_date in changing] if status == 'A' else []
+        apply_leave_day_changes(removed=removed, added=added)
+        # update() skips the post_save signals, so bump the dashboard versions here
+        bump_versions(*{user_scope(student_id) for _, student_id, *_ in changing})
+    return len(changing)
+
+
+def reprice_bills(student_months):
+    """
+    Recomputes leave days and amounts of the bills for the given
+    (student_id, first of month) pairs from the ledger, with one bulk_update.
+    Returns the number of bills re-priced.
+    """
+    student_months = set(student_months)
+    student_ids = {student_id for student_id, _ in student_months}
+    months = [month_start for _, month_start in student_months]
+    first_month, last_month = min(months), month_bounds(max(months))[1]
+
+    ledger = dict(
+        ((student_id, month_start), days)
+        for student_id, month_start, days in LeaveDayLedger.objects.filter(
+            student_id__in=student_ids, month__range=(first_month, last_month),
+        ).values_list('student_id', 'month', 'approved_days')
+    )
+    bills = [
+        bill for bill in Bill.objects.filter(student_id__in=student_ids, month__range=(first_month, last_month))
+        if (bill.student_id, bill.month.replace(day=1)) in student_months
+    ]
+    for bill in bills:
+        bill.leave_days_approved = ledger.get((bill.student_id, bill.month.replace(day=1)), 0)
+        bill.calculate_amounts()
+
+    Bill.objects.bulk_update(bills, BILL_UPDATE_FIELDS, batch_size=500)
+    # Bulk writes skip Bill.save(), so refresh the alerts still waiting in the outbox
+    OutboundMessage.refresh_pending_bill_alerts(bills)
+    # ...and skip the post_save signals, so bump the dashboard versions here
+    bump_versions(*{user_scope(bill.student_id) for bill in bills})
+    return len(bills)
+
+
+def generate_monthly_bills(month, base_rate_per_day=None, last_date_of_payment=None, students=None, notify=True):
+    """
+    Creates or refreshes the bills of every student for one month without going
+    through Bill.save() row by row.
+
+    Leave days come from a single overlap query and all rows are written with
+    bulk_create/bulk_update inside one transaction. Existing bills keep their
+    own rate, day count and due date unless new values are passed in.
+    Returns a dict with the number of bills created and updated.
+    """
+    month_start, month_end = month_bounds(month)
+    days_in_month = month_end.day
+    default_rate = Decimal(str(base_rate_per_day if base_rate_per_day is not None else settings.MESS_BASE_RATE_PER_DAY))
+    default_due_date = last_date_of_payment or month_end + timedelta(days=settings.MESS_BILL_DUE_DAYS)
+
+    # Whole-hostel runs skip the student filter and let the month range do the work
+    scope = students
+    if students is None:
+        students = User.objects.filter(role=User.STUDENT, is_active=True)
+    student_mobiles = dict(students.values_list('id', 'mobile_number'))
+
+    with transaction.atomic():
+        leave_days = approved_leave_days_by_student(month_start, scope)
+
+        existing_bills = Bill.objects.filter(month__range=(month_start, month_end))
+        if scope is not None:
+            existing_bills = existing_bills.filter(student__in=scope)
+        bills_by_student = defaultdict(list)
+        for bill in existing_bills:
+            bills_by_student[bill.student_id].append(bill)
+
+        to_create, to_update = [], []
+        for student_id in student_mobiles:
+            bills = bills_by_student.get(student_id)
+            if not bills:
+                bills = [Bill(
+                    student_id=student_id,
+                    month=month_start,
+                    base_rate_per_day=default_rate,
+                    total_days_in_month=days_in_month,
+                    last_date_of_payment=default_due_date,
+                )]
+                to_create.extend(bills)
+            else:
+                to_update.extend(bills)
+
+            for bill in bills:
+                if base_rate_per_day is not None:
+                    bill.base_rate_per_day = default_rate
+                if last_date_of_payment is not None:
+                    bill.last_date_of_payment = last_date_of_payment
+                bill.leave_days_approved = leave_days.get(student_id, 0)
+                bill.calculate_amounts()
+
+        Bill.objects.bulk_create(to_create, batch_size=500)
+        update_fields = BILL_UPDATE_FIELDS + (['last_date_of_payment'] if last_date_of_payment is not None else [])
+        Bill.objects.bulk_update(to_update, update_fields, batch_size=500)
+        # Bulk writes skip the post_save signals. One coarse bump for the whole run:
+        # a counter write per student would cost more than the bills themselves
+        bump_versions(BILLS)
+
+        if notify:
+            # bulk_create does not hand back primary keys on every backend, so re-read the month
+            month_bills = Bill.objects.filter(month__range=(month_start, month_end))
+            if scope is not None:
+                month_bills = month_bills.filter(student__in=scope)
+            queue_due_bill_notifications(month_bills, student_mobiles)
+        else:
+            # Alerts queued earlier must not go out with the old amounts
+            OutboundMessage.refresh_pending_bill_alerts(to_update)
+
+    return {'created': len(to_create), 'updated': len(to_update)}
+
+
+def queue_due_bill_notifications(bills, student_mobiles):
+    """
+    Writes an outbox message for every due bill that has not been notified, or
+    refreshes the one still pending with the bill's current amounts.
+    Returns the number of messages queued.
+    """
+    due_bills = list(bills.filter(status='D', notification_sent=False))
+    already_queued = OutboundMessage.refresh_pending_bill_alerts(due_bills, student_mobiles)
+
+    messages = []
+    for bill in due_bills:
+        mobile_number = student_mobiles.get(bill.student_id)
+        if mobile_number and bill.pk not in already_queued:
+            messages.append(OutboundMessage(recipient=mobile_number, body=bill.whatsapp_message_body, bill=bill))
+
+    OutboundMessage.objects.bulk_create(messages, batch_size=500)
+    return len(messages)
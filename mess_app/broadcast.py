@@ -0,0 +1,69 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .utils import send_whatsapp_message, twilio_is_configured
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Spaces calls out so that no more than `rate` start per second, across all
+    threads sharing the limiter. A rate of 0 or None disables the limit.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def broadcast_whatsapp(messages, max_workers=None, limiter=None):
+    """
+    Sends (recipient, body) pairs from a bounded thread pool, sharing one pooled
+    Twilio client and one messages-per-second limit (a RateLimiter at
+    settings.WHATSAPP_MESSAGES_PER_SECOND unless `limiter` is given).
+
+    Returns one (sid, error) pair per message, in order; exactly one of the two is None.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    if not twilio_is_configured():
+        # Fail fast instead of pacing hundreds of calls that cannot succeed
+        return [(None, "Twilio API credentials are missing.")] * len(messages)
+
+    max_workers = max_workers or settings.WHATSAPP_BROADCAST_WORKERS
+    if limiter is None:
+        limiter = RateLimiter(settings.WHATSAPP_MESSAGES_PER_SECOND)
+
+    def send(message):
+        limiter.wait()
+        try:
+            return send_whatsapp_message(*message), None
+        except Exception as e:
+            return None, str(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(messages)), thread_name_prefix='whatsapp') as executor:
+        results = list(executor.map(send, messages))
+
+    logger.info(
+        "WhatsApp fan-out: %s of %s sent in %.2fs",
+        sum(error is None for _, error in results), len(messages), time.perf_counter() - start,
+    )
+    return results
@@ -0,0 +1,96 @@
+"""
+A file-based cache for the data every worker process on a host must agree on:
+the version counters, throttle counters and cached sessions.
+
+Django's FileBasedCache lists the whole directory on every write to decide
+whether to cull, so writes get slower as the cache grows, and a cull deletes
+random live entries (a lost version counter changes every ETag built on it).
+SharedFileCache never evicts a live entry: expired files are swept at most
+once every SWEEP_INTERVAL seconds (OPTIONS, default 300) per process, and
+MAX_ENTRIES is ignored. add() and incr() hold a lock file in the cache
+directory, so concurrent increments from several processes are never lost
+and incr() keeps the entry's expiry.
+
+The directory is created with mode 0700; keep it out of world-writable places
+such as /tmp, since entries are pickles.
+"""
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+
+# Next sweep time per cache directory, shared by the per-thread cache instances
+_next_sweep = {}
+_sweep_lock = threading.Lock()
+
+
+class SharedFileCache(FileBasedCache):
+    lock_filename = 'update.lock'
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._sweep_interval = params.get('OPTIONS', {}).get('SWEEP_INTERVAL', 300)
+
+    @contextmanager
+    def _update_lock(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_filename), 'ab') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._update_lock():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._update_lock():
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    if expiry is not None and expiry < time.time():
+                        raise FileNotFoundError
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            self._write_entry(fname, expiry, value)
+        return value
+
+    def _write_entry(self, fname, expiry, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        renamed = False
+        try:
+            with open(fd, 'wb') as f:
+                f.write(pickle.dumps(expiry, self.pickle_protocol))
+                f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+            file_move_safe(tmp_path, fname, allow_overwrite=True)
+            renamed = True
+        finally:
+            if not renamed:
+                os.remove(tmp_path)
+
+    def _cull(self):
+        now = time.monotonic()
+        with _sweep_lock:
+            if now < _next_sweep.get(self._dir, 0):
+                return
+            _next_sweep[self._dir] = now + self._sweep_interval
+        for fname in self._list_cache_files():
+            try:
+                with open(fname, 'rb') as f:
+                    self._is_expired(f)
+            except FileNotFoundError:
+                # Deleted by another process meanwhile
+                pass
@@ -0,0 +1,128 @@
+"""
+Cached copies of the read-mostly data shown on every dashboard: the weekly
+menu, the active admin notifications and a per-student snapshot (latest bill,
+leave status and today's rated meals).
+
+Cache keys embed the version counters from versions.py, which the post_save /
+post_delete signals on FoodMenu, AdminNotification, Bill, LeaveRequest and
+MealRating bump, so an edit shows up on the very next request. Works with any
+Django cache backend (locmem, file, Redis or Memcached).
+
+Every lookup counts a hit or a miss per kind of data; get_cache_stats() (and
+the staff-only cache_stats view) report them.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import FoodMenu, AdminNotification, Bill, LeaveRequest, MealRating
+from .versions import BILLS, MENU, NOTIFICATIONS, get_versions, user_scope
+
+# Kinds of cached data, as reported by get_cache_stats()
+CACHE_KINDS = ('menu', 'notifications', 'student_snapshot')
+
+
+def _stats_key(kind, outcome):
+    return f"messnet:stats:{kind}:{outcome}"
+
+
+def count_lookup(kind, hit):
+    """Adds one to the hit or miss counter of `kind`, kept in the default cache (per process unless CACHE_BACKEND is shared)."""
+    key = _stats_key(kind, 'hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First lookup since the counter was reset or evicted
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cache_stats():
+    """{kind: {'hits', 'misses', 'hit_rate'}} since the counters were last reset."""
+    keys = [_stats_key(kind, outcome) for kind in CACHE_KINDS for outcome in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+    stats = {}
+    for kind in CACHE_KINDS:
+        hits = counts.get(_stats_key(kind, 'hits'), 0)
+        misses = counts.get(_stats_key(kind, 'misses'), 0)
+        stats[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many([_stats_key(kind, outcome) for kind in CACHE_KINDS for outcome in ('hits', 'misses')])
+
+
+def cached_for_version(scopes, name, build, kind=None):
+    """Returns build() cached under the current versions of `scopes`, counted as a lookup of `kind` (default: name)."""
+    versions = get_versions(*scopes)
+    key = f"messnet:{name}:{'-'.join(str(versions[scope]) for scope in scopes)}"
+    value = cache.get(key)
+    count_lookup(kind or name, hit=value is not None)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.MESS_CACHE_TIMEOUT)
+    return value
+
+
+def _load_menu():
+    by_day = {}
+    updated_at = None
+    for day, meal, details, item_updated_at in FoodMenu.objects.values_list(
+        'day_of_week', 'meal_type', 'menu_details', 'updated_at'
+    ):
+        by_day.setdefault(day, {})[meal] = details
+        if updated_at is None or item_updated_at > updated_at:
+            updated_at = item_updated_at
+    return {'by_day': by_day, 'updated_at': updated_at}
+
+
+def get_menu():
+    """
+    The whole weekly menu in one cached dict:
+    {'by_day': {day_of_week: {meal_type: menu_details}}, 'updated_at': latest update or None}
+    """
+    return cached_for_version((MENU,), 'menu', _load_menu)
+
+
+def get_active_notifications():
+    """The five latest active admin notifications, as dicts with 'message' and 'created_at'."""
+    return cached_for_version((NOTIFICATIONS,), 'notifications', lambda: list(
+        AdminNotification.objects.filter(is_active=True).order_by('-created_at').values('message', 'created_at')[:5]
+    ))
+
+
+def _load_student_snapshot(user_id, today):
+    latest_bill = Bill.objects.filter(student_id=user_id).order_by('-month').values(
+        'total_amount', 'last_date_of_payment', 'status',
+    ).first()
+    if latest_bill:
+        latest_bill['status_display'] = dict(Bill.STATUS_CHOICES)[latest_bill['status']]
+    latest_leave_status = LeaveRequest.objects.filter(student_id=user_id).order_by('-requested_on').values_list('status', flat=True).first()
+    return {
+        'latest_bill': latest_bill,
+        'pending_leaves_count': LeaveRequest.objects.filter(student_id=user_id, status='P').count(),
+        'latest_leave_status': latest_leave_status or 'N',
+        'rated_meals_today': list(MealRating.objects.filter(student_id=user_id, rating_date=today).values_list('meal_type', flat=True)),
+    }
+
+
+def get_student_snapshot(user_id):
+    """
+    The per-student parts of the dashboard in one cached dict:
+    'latest_bill' (dict with total_amount, last_date_of_payment, status and
+    status_display, or None), 'pending_leaves_count', 'latest_leave_status'
+    ('P', 'A', 'R', or 'N' without requests) and 'rated_meals_today'.
+    """
+    today = date.today()
+    # The date is part of the key, so yesterday's rated meals are not carried over midnight.
+    # Bill generation runs move BILLS rather than every student's own counter.
+    return cached_for_version(
+        (user_scope(user_id), BILLS), f'student:{user_id}:{today.isoformat()}',
+        lambda: _load_student_snapshot(user_id, today), kind='student_snapshot',
+    )
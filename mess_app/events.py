@@ -0,0 +1,72 @@
+"""
+In-process fan-out of dashboard change events to Server-Sent Events streams.
+
+Model signals fire on ordinary request/worker threads; SSE connections are
+asyncio tasks. The hub hands a nudge from the former to the queues of the
+latter with call_soon_threadsafe. Changes made in another process are picked
+up by the streams' periodic version check instead.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from .versions import BILLS, NOTIFICATIONS
+
+
+def _nudge(queue):
+    # One pending nudge is enough: the stream always reloads the latest state
+    if queue.empty():
+        queue.put_nowait(True)
+
+
+class EventHub:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Registers a stream of this user; must be called from its event loop."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=1))
+        with self._lock:
+            self._subscribers[user_id].add(entry)
+        return entry
+
+    def unsubscribe(self, user_id, entry):
+        with self._lock:
+            entries = self._subscribers.get(user_id)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self._subscribers[user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._subscribers.values())
+
+    def publish(self, user_ids=None):
+        """Nudges the streams of the given users, or of everyone when user_ids is None."""
+        with self._lock:
+            if user_ids is None:
+                entries = [entry for group in self._subscribers.values() for entry in group]
+            else:
+                entries = [entry for user_id in user_ids for entry in self._subscribers.get(user_id, ())]
+
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(_nudge, queue)
+            except RuntimeError:
+                # The stream's loop has already shut down
+                pass
+
+    def publish_scopes(self, scopes):
+        """Maps changed version scopes ('user:<id>', 'notifications', 'bills') to the streams that show them."""
+        if NOTIFICATIONS in scopes or BILLS in scopes:
+            self.publish()
+            return
+        user_ids = [int(scope.split(':', 1)[1]) for scope in scopes if scope.startswith('user:')]
+        if user_ids:
+            self.publish(user_ids)
+
+
+dashboard_hub = EventHub()
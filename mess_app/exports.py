@@ -0,0 +1,130 @@
+"""
+Streaming CSV / JSON Lines exports of bills, leave requests and meal ratings
+for accounting.
+
+Rows are filtered in the database, read with .iterator(chunk_size=...) (no
+queryset cache) and encoded one at a time, so memory stays flat whatever the
+row count. The same generators back the admin actions (as a
+StreamingHttpResponse) and `manage.py export_records` (written to a file).
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+from .billing import month_bounds
+from .models import Bill, LeaveRequest, MealRating
+
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _student_columns():
+    return [
+        ('student_username', lambda row: row.student.username),
+        ('student_name', lambda row: f"{row.student.first_name} {row.student.last_name}".strip()),
+        ('department', lambda row: row.student.department or ''),
+    ]
+
+
+# kind: model, column specs (header, value), filters per option, export order
+EXPORTS = {
+    'bills': {
+        'model': Bill,
+        'columns': _student_columns() + [
+            ('month', lambda bill: bill.month.strftime('%Y-%m')),
+            ('base_rate_per_day', lambda bill: bill.base_rate_per_day),
+            ('total_days_in_month', lambda bill: bill.total_days_in_month),
+            ('leave_days_approved', lambda bill: bill.leave_days_approved),
+            ('base_amount', lambda bill: bill.base_amount),
+            ('adjustment_amount', lambda bill: bill.adjustment_amount),
+            ('total_amount', lambda bill: bill.total_amount),
+            ('status', lambda bill: bill.get_status_display()),
+            ('last_date_of_payment', lambda bill: bill.last_date_of_payment),
+        ],
+        'month': lambda start, end: {'month__range': (start, end)},
+        'status': True,
+        'order_by': ('month', 'student__username'),
+    },
+    'leaves': {
+        'model': LeaveRequest,
+        'columns': _student_columns() + [
+            ('from_date', lambda leave: leave.from_date),
+            ('to_date', lambda leave: leave.to_date),
+            ('days', lambda leave: leave.total_leave_days),
+            ('status', lambda leave: leave.get_status_display()),
+            ('reason', lambda leave: leave.reason),
+            ('requested_on', lambda leave: leave.requested_on),
+        ],
+        # Every leave that overlaps the month
+        'month': lambda start, end: {'from_date__lte': end, 'to_date__gte': start},
+        'status': True,
+        'order_by': ('from_date', 'student__username'),
+    },
+    'ratings': {
+        'model': MealRating,
+        'columns': _student_columns() + [
+            ('rating_date', lambda rating: rating.rating_date),
+            ('meal_type', lambda rating: rating.get_meal_type_display()),
+            ('rating_score', lambda rating: rating.rating_score),
+            ('comment', lambda rating: rating.comment or ''),
+            ('submitted_at', lambda rating: rating.submitted_at),
+        ],
+        'month': lambda start, end: {'rating_date__range': (start, end)},
+        'status': False,
+        'order_by': ('rating_date', 'meal_type', 'student__username'),
+    },
+}
+
+
+def export_queryset(kind, month=None, status=None, queryset=None):
+    """
+    The rows of export `kind`, filtered in the database to `month` (any date
+    in it) and `status` (a status code). `queryset` narrows the rows further,
+    e.g. to an admin selection.
+    """
+    spec = EXPORTS[kind]
+    if status and not spec['status']:
+        raise ValueError(f"{kind} have no status to filter on.")
+
+    queryset = spec['model'].objects.all() if queryset is None else queryset
+    if month:
+        queryset = queryset.filter(**spec['month'](*month_bounds(month)))
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.select_related('student').order_by(*spec['order_by'])
+
+
+class _Echo:
+    """A file-like object whose write() just returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(kind, queryset, fmt='csv', chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the export one line (str) at a time: a header first for CSV."""
+    columns = EXPORTS[kind]['columns']
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow([header for header, _ in columns])
+        for row in rows:
+            yield writer.writerow([value(row) for _, value in columns])
+    elif fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps({header: value(row) for header, value in columns}, default=str) + '\n'
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+
+
+def streaming_export_response(kind, queryset, fmt='csv', filename=None):
+    """A StreamingHttpResponse download of export_lines()."""
+    filename = filename or f"messnet-{kind}.{fmt}"
+    response = StreamingHttpResponse(export_lines(kind, queryset, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
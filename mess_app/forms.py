@@ -22,19 +22,9 @@ class EmailOrUsernameAuthenticationForm(AuthenticationForm):
         self.user_cache = None 
         
         if username and password:
-            if '@' in username:
-                try:
-                    user_model = self.get_user_model()
-                    user = user_model.objects.get(email__iexact=username)
-                    self.user_cache = authenticate(self.request, username=user.username, password=password)
-                except user_model.DoesNotExist:
-                    pass 
-
-            # --- 2. Fallback to Standard Username Authentication ---
-            if self.user_cache is None:
-                self.user_cache = authenticate(self.request, username=username, password=password)
+            # EmailOrUsernameBackend resolves the username or email in one query and hashes once
+            self.user_cache = authenticate(self.request, username=username, password=password)
 
-            # --- 3. Final Validation and Confirmation ---
             if self.user_cache is None:
                 raise forms.ValidationError(
                     self.error_messages['invalid_login'],
@@ -55,10 +45,6 @@ class EmailOrUsernameAuthenticationForm(AuthenticationForm):
                 code='inactive',
             )
 
-    def get_user_model(self):
-        from django.contrib.auth import get_user_model
-        return get_user_model()
-
 
 # --- Leave Request Form ---
 
@@ -126,4 +112,11 @@ class MealRatingForm(forms.ModelForm):
         widgets = {
             'meal_type': forms.HiddenInput(),
             'comment': forms.Textarea(attrs={'rows': 2, 'class': 'form-textarea', 'placeholder': 'Optional: Add your specific feedback here...'}),
-        }
\ No newline at end of file
+        }
+
+
+# --- Student CSV Import Form (admin) ---
+
+class StudentImportForm(forms.Form):
+    csv_file = forms.FileField(label="CSV file")
+    dry_run = forms.BooleanField(required=False, label="Only validate", help_text="Check the file without creating anyone.")
@@ -0,0 +1,79 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """
+    Counts the SQL queries (and the time spent in them) run on a connection
+    while the block is active. Uses an execute wrapper, so it works with
+    DEBUG off and is not capped like connection.queries.
+    """
+
+    def __init__(self, using=None):
+        self.connection = using or connection
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+
+def query_budget(url_name, method):
+    """
+    The query budget of a request, or None. A settings.QUERY_BUDGETS entry is
+    either a number (every method) or {method: number}.
+    """
+    budget = settings.QUERY_BUDGETS.get(url_name)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the number of SQL queries and the DB time of every request.
+
+    Views listed in settings.QUERY_BUDGETS (by URL name, optionally by method)
+    log a warning when they go over their budget. With DEBUG on, the numbers are also sent as a
+    Server-Timing header, which the browser's network panel shows per request.
+    Keep it first in MIDDLEWARE so the session and user lookups are counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCounter() as queries:
+            response = self.get_response(request)
+
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        budget = query_budget(url_name, request.method)
+        if budget is not None and queries.count > budget:
+            logger.warning(
+                "%s %s ran %s queries (%.1f ms), over its budget of %s",
+                request.method, request.path, queries.count, queries.duration * 1000, budget,
+            )
+        else:
+            logger.debug("%s %s ran %s queries (%.1f ms)", request.method, request.path, queries.count, queries.duration * 1000)
+
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"'
+        return response
@@ -0,0 +1,162 @@
+"""
+A local load harness that replays the lunch-time rush against a running
+server (gunicorn or uvicorn) on a seeded database.
+
+Every virtual student opens the dashboard, then polls data_endpoint like
+script.js does (with If-None-Match), and some of them rate a meal through the
+dashboard form. Sessions are created straight in the session store, so the
+harness must share the server's database and SECRET_KEY.
+"""
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from importlib import import_module
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.urls import reverse
+
+from .models import User, MealRating
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list; None when it is empty."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoadStats:
+    """Thread-safe latency and error counters per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status=None, error=False):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status or 'error'] += 1
+            if error:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        """Per-endpoint requests, throughput, error rate and p50/p95/p99 latency in ms."""
+        report = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            report[endpoint] = {
+                'requests': len(latencies),
+                'requests_per_second': round(len(latencies) / elapsed, 2),
+                'error_rate': round(self.errors[endpoint] / len(latencies), 4),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1),
+                'statuses': dict(self.statuses[endpoint]),
+            }
+        return report
+
+
+def create_session(user):
+    """Logs `user` in by writing a session directly, as django.contrib.auth.login would."""
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+class VirtualStudent(threading.Thread):
+    """One student's browser during the rush."""
+
+    def __init__(self, base_url, session_key, meals_to_rate, stats, stop_at, start_delay, poll_interval, rng):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.meals_to_rate = meals_to_rate
+        self.stats = stats
+        self.stop_at = stop_at
+        self.start_delay = start_delay
+        self.poll_interval = poll_interval
+        self.rng = rng
+        self.http = requests.Session()
+        self.http.cookies.set(settings.SESSION_COOKIE_NAME, session_key)
+
+    def call(self, endpoint, method, path, expected, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, urljoin(self.base_url, path), timeout=30, allow_redirects=False, **kwargs)
+        except requests.RequestException:
+            self.stats.record(endpoint, time.perf_counter() - start, error=True)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start, response.status_code, error=response.status_code not in expected)
+        return response
+
+    def run(self):
+        time.sleep(self.start_delay)
+        self.call('student_dashboard', 'GET', reverse('student_dashboard'), expected={200})
+        etag = None
+        # Each rating goes in at a random moment of the student's visit
+        rate_at = sorted(self.rng.uniform(time.time(), self.stop_at) for _ in self.meals_to_rate)
+        meals = list(self.meals_to_rate)
+
+        while time.time() < self.stop_at:
+            if meals and time.time() >= rate_at[0]:
+                rate_at.pop(0)
+                self.call('meal_rating', 'POST', reverse('student_dashboard'), expected={302}, data={
+                    'form_action': 'meal_rating', 'meal_type': meals.pop(0), 'rating_score': self.rng.randint(1, 5),
+                    'csrfmiddlewaretoken': self.http.cookies.get(settings.CSRF_COOKIE_NAME, ''),
+                })
+                continue
+
+            headers = {'If-None-Match': etag} if etag else {}
+            response = self.call('data_endpoint', 'GET', reverse('data_endpoint'), expected={200, 304}, headers=headers)
+            if response is not None and response.headers.get('ETag'):
+                etag = response.headers['ETag']
+            # script.js polls every 10 s; jitter keeps the students out of lockstep
+            time.sleep(min(self.poll_interval * self.rng.uniform(0.9, 1.1), max(0, self.stop_at - time.time())))
+
+
+def run_meal_rush(base_url, students=200, duration=900, ramp_up=60, poll_interval=10, rating_share=0.5, prefix='seed', seed=42):
+    """
+    Replays the rush with up to `students` seeded students (usernames starting
+    with `prefix`) arriving evenly over `ramp_up` seconds and staying until
+    `duration` seconds after the start. `rating_share` of them rate one meal
+    they have not rated today. Returns the per-endpoint summary.
+    """
+    rng = random.Random(seed)
+    users = list(User.objects.filter(username__startswith=prefix, role=User.STUDENT).order_by('username')[:students])
+    if not users:
+        raise ValueError(f"No students starting with '{prefix}'. Run seed_benchmark_data first.")
+
+    rated = defaultdict(set)
+    for student_id, meal_type in MealRating.objects.filter(student__in=users, rating_date=date.today()).values_list('student_id', 'meal_type'):
+        rated[student_id].add(meal_type)
+
+    stats = LoadStats()
+    start = time.time()
+    stop_at = start + duration
+    threads = []
+    for i, user in enumerate(users):
+        unrated = [meal for meal, _ in MealRating.MEAL_CHOICES if meal not in rated[user.pk]]
+        meals_to_rate = [rng.choice(unrated)] if unrated and rng.random() < rating_share else []
+        threads.append(VirtualStudent(
+            base_url, create_session(user), meals_to_rate, stats, stop_at,
+            start_delay=ramp_up * i / len(users), poll_interval=poll_interval, rng=random.Random(rng.random()),
+        ))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.time() - start
+    return {'students': len(users), 'seconds': round(elapsed, 1), 'endpoints': stats.summary(elapsed)}
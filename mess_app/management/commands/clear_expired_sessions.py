@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_app.session_cleanup import clear_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Deletes expired sessions in small batches, each in its own short transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.SESSION_CLEANUP_BATCH_SIZE, help="Sessions deleted per transaction.",
+        )
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds to wait between batches.")
+        parser.add_argument(
+            '--every', type=float, help="Keep running and clean up every this many seconds (default: run once, e.g. from cron).",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        try:
+            while True:
+                summary = clear_expired_sessions(options['batch_size'], options['pause'])
+                self.stdout.write(
+                    f"Deleted {summary['deleted']} expired session(s) in {summary['batches']} batch(es), {summary['seconds']} s."
+                )
+                if not options['every']:
+                    break
+                time.sleep(options['every'])
+        except KeyboardInterrupt:
+            self.stdout.write("Session cleanup stopped.")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_app.exports import EXPORTS, EXPORT_CHUNK_SIZE, FORMATS, export_queryset, export_lines
+from mess_app.management.commands.generate_bills import parse_month
+
+
+class Command(BaseCommand):
+    help = "Streams bills, leave requests or meal ratings as CSV or JSON Lines, for accounting."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS), help="What to export.")
+        parser.add_argument('--month', help="Only this month, as YYYY-MM (leaves: every leave overlapping it).")
+        parser.add_argument('--status', help="Only this status code, e.g. D (due) or P (paid) for bills, A for approved leaves.")
+        parser.add_argument('--format', choices=list(FORMATS), default='csv', help="Output format (default: csv).")
+        parser.add_argument('--output', help="File to write (default: standard output).")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        month = parse_month(options['month']) if options['month'] else None
+        try:
+            queryset = export_queryset(options['kind'], month=month, status=options['status'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        lines = export_lines(options['kind'], queryset, options['format'], options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        rows = 0
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                rows += 1
+        if options['format'] == 'csv':
+            rows -= 1
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} {options['kind']} row(s) to {options['output']}."))
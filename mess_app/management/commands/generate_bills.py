@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_app.billing import generate_monthly_bills
+
+
+def parse_month(value):
+    """Parses a YYYY-MM string into the first day of that month."""
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"Invalid month '{value}'. Use the YYYY-MM format.")
+
+
+class Command(BaseCommand):
+    help = "Generates (or refreshes) the mess bills of every student for one month in a single transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Billing month as YYYY-MM (defaults to the current month).")
+        parser.add_argument('--rate', help="Base rate per day. Defaults to MESS_BASE_RATE_PER_DAY for new bills.")
+        parser.add_argument('--due-date', help="Last date of payment as YYYY-MM-DD.")
+        parser.add_argument('--no-notify', action='store_true', help="Do not queue WhatsApp alerts for due bills.")
+
+    def handle(self, *args, **options):
+        month = parse_month(options['month']) if options['month'] else date.today().replace(day=1)
+
+        rate = None
+        if options['rate']:
+            try:
+                rate = Decimal(options['rate'])
+            except InvalidOperation:
+                raise CommandError(f"Invalid rate '{options['rate']}'.")
+
+        due_date = None
+        if options['due_date']:
+            try:
+                due_date = datetime.strptime(options['due_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid due date '{options['due_date']}'. Use the YYYY-MM-DD format.")
+
+        result = generate_monthly_bills(
+            month,
+            base_rate_per_day=rate,
+            last_date_of_payment=due_date,
+            notify=not options['no_notify'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{month.strftime('%B %Y')}: {result['created']} bill(s) created, {result['updated']} bill(s) updated."
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_app.onboarding import IMPORT_CHUNK_SIZE, import_students
+
+
+class Command(BaseCommand):
+    help = "Creates students from a CSV file, hashing passwords in parallel and inserting them in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="CSV with a header row: username, first_name, last_name, email, department, mobile_number, password.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: one per CPU).")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Students hashed and inserted per batch.")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the file.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                result = import_students(
+                    csv_file, workers=options['workers'], chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        for line, error in result['errors']:
+            self.stderr.write(f"Line {line}: {error}")
+        if options['dry_run']:
+            self.stdout.write(f"{result['valid']} valid row(s), {len(result['errors'])} rejected.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['created']} student(s) created, {len(result['errors'])} row(s) skipped, in {result['seconds']} s."
+            ))
@@ -0,0 +1,64 @@
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from mess_app.benchmarks import BENCHMARKS
+from mess_app.testing import isolated_caches
+
+
+class Command(BaseCommand):
+    help = "Runs the MessNet benchmarks against a throwaway test database (your data is never touched)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all).")
+        parser.add_argument('--students', type=int, default=500, help="Number of synthetic students to seed.")
+        parser.add_argument(
+            '--scales', help="Comma-separated student counts, e.g. 100,1000,5000. Runs every benchmark once per scale.",
+        )
+        parser.add_argument('--output', help="Also write the results to this JSON file, for comparing runs.")
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')] if options['scales'] else [options['students']]
+        except ValueError:
+            raise CommandError(f"Invalid --scales '{options['scales']}'. Use comma-separated numbers.")
+
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+            'results': {name: [] for name in names},
+        }
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Keep the benchmarks' counters and sessions out of a running server's caches
+            with isolated_caches():
+                for name in names:
+                    for students in scales:
+                        # Each benchmark seeds its own rows; roll them back so runs stay independent
+                        with transaction.atomic():
+                            result = BENCHMARKS[name](students=students)
+                            transaction.set_rollback(True)
+                        report['results'][name].append({'students': students, **result})
+                        self.stdout.write(f"{name} ({students} students): {json.dumps(result, indent=2)}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_app.loadtest import run_meal_rush
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays the lunch-time rush (dashboard loads, data_endpoint polling, meal ratings) against a running "
+        "server on a seeded database and reports p50/p95/p99 latency, throughput and error rate per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/', help="Server to load, e.g. a gunicorn or uvicorn instance.")
+        parser.add_argument('--students', type=int, default=200, help="Number of concurrent virtual students.")
+        parser.add_argument('--duration', type=float, default=900, help="Length of the rush in seconds (default 15 minutes).")
+        parser.add_argument('--ramp-up', type=float, default=60, help="Seconds over which the students arrive.")
+        parser.add_argument('--poll-interval', type=float, default=10, help="data_endpoint polling interval, as in script.js.")
+        parser.add_argument('--rating-share', type=float, default=0.5, help="Fraction of students who rate a meal.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix of the seeded students to log in as.")
+        parser.add_argument('--output', help="Also write the report to this JSON file.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Replaying a {options['duration']:.0f}s rush with {options['students']} students against {options['base_url']}..."
+        )
+        try:
+            report = run_meal_rush(
+                options['base_url'], students=options['students'], duration=options['duration'],
+                ramp_up=options['ramp_up'], poll_interval=options['poll_interval'],
+                rating_share=options['rating_share'], prefix=options['prefix'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{report['students']} students over {report['seconds']}s")
+        self.stdout.write(f"{'endpoint':<20}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for endpoint, row in report['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<20}{row['requests']:>10}{row['requests_per_second']:>9}{row['error_rate']:>9.2%}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mess_app.broadcast import RateLimiter
+from mess_app.models import OutboundMessage
+from mess_app.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Delivers queued WhatsApp notifications from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Messages claimed per batch.")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the messages that are due now and exit.")
+
+    def handle(self, *args, **options):
+        # One limiter for the whole run, so the messages-per-second limit holds across batches
+        limiter = RateLimiter(settings.WHATSAPP_MESSAGES_PER_SECOND)
+        try:
+            while True:
+                summary = deliver_batch(options['batch_size'], limiter=limiter)
+                if summary['sent'] or summary['retried'] or summary['failed']:
+                    self.stdout.write(
+                        f"Sent {summary['sent']}, retrying {summary['retried']}, failed {summary['failed']}."
+                    )
+                    for broadcast in summary['broadcasts']:
+                        totals = OutboundMessage.broadcast_summary(broadcast)
+                        self.stdout.write(
+                            f"Broadcast {broadcast}: {totals['sent']} of {totals['total']} sent, "
+                            f"{totals['retrying']} retrying, {totals['failed']} failed, {totals['pending']} not tried yet."
+                        )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Notification worker stopped.")
@@ -0,0 +1,38 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mess_app.models import User
+from mess_app.seeding import seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = "Fills the database with deterministic synthetic students and their history, for trying MessNet at realistic size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help="Number of students to create.")
+        parser.add_argument('--years', type=int, default=2, help="Years of history per student.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix of the created students.")
+        parser.add_argument('--rating-share', type=float, default=0.1, help="Fraction of meals each student rates.")
+        parser.add_argument('--end-date', help="Last day of the history as YYYY-MM-DD (defaults to today).")
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users starting with '{options['prefix']}' already exist. Pick another --prefix.")
+
+        end_date = None
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid end date '{options['end_date']}'. Use the YYYY-MM-DD format.")
+
+        start = time.perf_counter()
+        counts = seed_benchmark_data(
+            students=options['students'], years=options['years'], seed=options['seed'],
+            prefix=options['prefix'], rating_share=options['rating_share'], end_date=end_date,
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {time.perf_counter() - start:.1f}s."))
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_app', '0009_outboundmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminnotification',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='notification_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['student', 'month'], name='bill_student_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['student', 'status', 'requested_on'], name='leave_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lostandfound',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['posted_on'], name='lostfound_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealrating',
+            index=models.Index(fields=['rating_date', 'meal_type'], name='rating_date_meal_idx'),
+        ),
+    ]
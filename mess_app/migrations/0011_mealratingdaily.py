@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:54
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_daily_totals(apps, schema_editor):
+    MealRating = apps.get_model('mess_app', 'MealRating')
+    MealRatingDaily = apps.get_model('mess_app', 'MealRatingDaily')
+    rows = MealRating.objects.values('rating_date', 'meal_type').annotate(
+        rating_count=Count('id'),
+        score_total=Sum('rating_score'),
+        **{f'score_{score}': Count('id', filter=Q(rating_score=score)) for score in range(1, 6)},
+    ).order_by()
+    MealRatingDaily.objects.bulk_create([MealRatingDaily(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_app', '0010_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealRatingDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_date', models.DateField()),
+                ('meal_type', models.CharField(choices=[('B', 'Breakfast'), ('L', 'Lunch'), ('D', 'Dinner')], max_length=1)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveIntegerField(default=0)),
+                ('score_1', models.PositiveIntegerField(default=0)),
+                ('score_2', models.PositiveIntegerField(default=0)),
+                ('score_3', models.PositiveIntegerField(default=0)),
+                ('score_4', models.PositiveIntegerField(default=0)),
+                ('score_5', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Meal Ratings',
+                'ordering': ['-rating_date', 'meal_type'],
+                'unique_together': {('rating_date', 'meal_type')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import calendar
+from collections import defaultdict
+from datetime import timedelta
+
+
+def build_ledger(apps, schema_editor):
+    LeaveRequest = apps.get_model('mess_app', 'LeaveRequest')
+    LeaveDayLedger = apps.get_model('mess_app', 'LeaveDayLedger')
+    days = defaultdict(int)
+    for student_id, from_date, to_date in LeaveRequest.objects.filter(status='A').values_list('student_id', 'from_date', 'to_date').iterator():
+        start = from_date
+        while start <= to_date:
+            month_end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+            days[(student_id, start.replace(day=1))] += (min(month_end, to_date) - start).days + 1
+            start = month_end + timedelta(days=1)
+    LeaveDayLedger.objects.bulk_create(
+        [LeaveDayLedger(student_id=student_id, month=month, approved_days=total) for (student_id, month), total in days.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_app', '0011_mealratingdaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveDayLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('approved_days', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Leave Day Ledger',
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.RunPython(build_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mess_app', '0013_user_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='broadcast',
+            field=models.CharField(blank=True, db_index=True, max_length=32),
+        ),
+    ]
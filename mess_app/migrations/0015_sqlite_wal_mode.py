@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def enable_wal_mode(apps, schema_editor):
+    # Stored in the database file, so it is set once here rather than on every connection
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode = wal")
+
+
+class Migration(migrations.Migration):
+    # SQLite cannot change the journal mode inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('mess_app', '0014_outboundmessage_broadcast'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal_mode, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models 
+from django.db import models, transaction
+from django.utils import timezone
 import calendar
+import uuid
 from datetime import date
 from decimal import Decimal 
-from django.db.models import F, Sum, ExpressionWrapper, fields 
+from django.db.models import F, Q, Sum, Count, ExpressionWrapper, fields 
+from django.db.models.functions import Lower
 
 # --- 1. User Management Model---
 
@@ -23,6 +26,12 @@ class User(AbstractUser):
     department = models.CharField(max_length=100, blank=True, null=True)
     mobile_number = models.CharField(max_length=15, unique=True, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Email logins look users up by LOWER(email)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -68,6 +77,12 @@ class LeaveRequest(models.Model):
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='P')
     requested_on = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Pending count and history on the student dashboard
+            models.Index(fields=['student', 'status', 'requested_on'], name='leave_student_status_idx'),
+        ]
+
     @property
     def total_leave_days(self):
         """Calculates total days requested."""
@@ -75,6 +90,44 @@ class LeaveRequest(models.Model):
             return (self.to_date - self.from_date).days + 1
         return 0
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the request and, when approved days are gained or lost, updates the
+        student's LeaveDayLedger and re-prices the affected bills in the same transaction.
+        """
+        from .billing import apply_leave_day_changes
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = LeaveRequest.objects.filter(pk=self.pk).values_list(
+                    'student_id', 'status', 'from_date', 'to_date'
+                ).first()
+            super().save(*args, **kwargs)
+
+            removed = [(previous[0], previous[2], previous[3])] if previous and previous[1] == 'A' else []
+            added = [(self.student_id, self.from_date, self.to_date)] if self.status == 'A' else []
+            if removed != added:
+                apply_leave_day_changes(removed=removed, added=added)
+
+
+class LeaveDayLedger(models.Model):
+    """
+    Approved leave days of one student in one calendar month (`month` is the 1st).
+    Kept current by LeaveRequest.save() and the post_delete signal, so bills read
+    their leave days from one row instead of rescanning the student's leaves.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()
+    approved_days = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'month')
+        verbose_name_plural = "Leave Day Ledger"
+
+    def __str__(self):
+        return f"{self.student_id} - {self.month.strftime('%B %Y')}: {self.approved_days} day(s)"
+
 # --- 4. Bill Details Module ---
 class Bill(models.Model):
     STATUS_CHOICES = (
@@ -100,28 +153,19 @@ class Bill(models.Model):
     # --- Verification & Automation Field ---
     notification_sent = models.BooleanField(default=False)
 
-    def get_approved_leave_days(self):
-        """Calculates total approved leave days for the specific month."""
-        month_start = self.month.replace(day=1)
-        _, last_day = calendar.monthrange(self.month.year, self.month.month)
-        month_end = self.month.replace(day=last_day)
-
-        # Pulling LeaveRequest locally to avoid circular imports if necessary
-        from .models import LeaveRequest
-        approved_leaves = LeaveRequest.objects.filter(
-            student=self.student,
-            status='A', 
-            from_date__lte=month_end,
-            to_date__gte=month_start,
-        )
+    class Meta:
+        indexes = [
+            # A student's bills, newest month first
+            models.Index(fields=['student', 'month'], name='bill_student_month_idx'),
+        ]
 
-        total_days = 0
-        for req in approved_leaves:
-            overlap_start = max(req.from_date, month_start)
-            overlap_end = min(req.to_date, month_end)
-            if overlap_start <= overlap_end:
-                total_days += (overlap_end - overlap_start).days + 1
-        return total_days
+    def get_approved_leave_days(self):
+        """Approved leave days for the bill's month, read from the student's ledger row."""
+        approved_days = LeaveDayLedger.objects.filter(
+            student_id=self.student_id,
+            month=self.month.replace(day=1),
+        ).values_list('approved_days', flat=True).first()
+        return approved_days or 0
 
     def calculate_amounts(self):
         """Calculates financial totals."""
@@ -136,31 +180,26 @@ class Bill(models.Model):
     def save(self, *args, **kwargs):
         """
         Triggers every time a Bill is created or updated.
-        Calculates values and sends automatic WhatsApp if status is Due.
+        Calculates values and queues an automatic WhatsApp if status is Due.
         """
         # 1. Update calculations
         self.leave_days_approved = self.get_approved_leave_days()
         self.calculate_amounts()
-        
-        # 2. Save record to Database first
-        super().save(*args, **kwargs)
-        
-        # 3. AUTOMATIC TRIGGER LOGIC
-        # Conditions: Status is 'Due' AND message hasn't been sent yet
-        if self.status == 'D' and not self.notification_sent:
-            if self.student.mobile_number:
-                from .utils import send_whatsapp_notification
-                
-                # Try sending the message
-                success = send_whatsapp_notification(self.student.mobile_number, self.whatsapp_message_body)
-                
-                if success:
-                    # Update the database flag so the cross turns into a checkmark
-                    # Using .update() prevents the save() method from looping
-                    self.__class__.objects.filter(pk=self.pk).update(notification_sent=True)
-            else:
-                # Log to terminal if number is missing
-                print(f"⚠️ Notification skipped for {self.student.username}: No mobile number found.")
+
+        with transaction.atomic():
+            # 2. Save record to Database first
+            super().save(*args, **kwargs)
+
+            # 3. AUTOMATIC TRIGGER LOGIC
+            # Conditions: Status is 'Due' AND message hasn't been sent yet.
+            # The message is written to the outbox in the same transaction; the
+            # run_notification_worker command delivers it and sets notification_sent.
+            if self.status == 'D' and not self.notification_sent:
+                if self.student.mobile_number:
+                    OutboundMessage.queue_for_bill(self, self.student.mobile_number)
+                else:
+                    # Log to terminal if number is missing
+                    print(f"⚠️ Notification skipped for {self.student.username}: No mobile number found.")
 
     @property
     def whatsapp_message_body(self):
@@ -209,6 +248,12 @@ class LostAndFound(models.Model):
     
     class Meta:
         verbose_name_plural = "Lost and Found"
+        indexes = [
+            # Approved items, newest first. Partial rather than (is_approved, posted_on):
+            # boolean filters compile to a bare `WHERE is_approved`, which SQLite can
+            # only match against an index's WHERE clause, never its leading column.
+            models.Index(fields=['posted_on'], condition=models.Q(is_approved=True), name='lostfound_approved_idx'),
+        ]
 
 # --- 7. Admin Notification Module ---
 
@@ -220,6 +265,10 @@ class AdminNotification(models.Model):
     class Meta:
         verbose_name_plural = "Admin Notifications"
         ordering = ['-created_at'] 
+        indexes = [
+            # Partial for the same reason as lostfound_approved_idx
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='notification_active_idx'),
+        ]
 
     def __str__(self):
         return f"Notification: {self.message[:50]}..."
@@ -254,6 +303,192 @@ class MealRating(models.Model):
         unique_together = ('student', 'meal_type', 'rating_date') 
         verbose_name_plural = "Meal Ratings"
         ordering = ['-rating_date', 'meal_type']
+        indexes = [
+            # Daily averages across all students
+            models.Index(fields=['rating_date', 'meal_type'], name='rating_date_meal_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username}'s {self.get_meal_type_display()} Rating ({self.rating_date})"
+
+    def save(self, *args, **kwargs):
+        """Saves the rating and moves it into the matching MealRatingDaily totals."""
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = MealRating.objects.filter(pk=self.pk).values_list(
+                    'rating_date', 'meal_type', 'rating_score'
+                ).first()
+            super().save(*args, **kwargs)
+            if previous:
+                MealRatingDaily.record(*previous, delta=-1)
+            MealRatingDaily.record(self.rating_date, self.meal_type, self.rating_score)
+
+
+class MealRatingDaily(models.Model):
+    """
+    Running totals of the ratings for one meal on one day, so averages are read
+    from a single row instead of aggregating every MealRating.
+    Maintained by MealRating.save() and the post_delete signal.
+    """
+    rating_date = models.DateField()
+    meal_type = models.CharField(max_length=1, choices=MealRating.MEAL_CHOICES)
+    rating_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveIntegerField(default=0)
+
+    # Histogram: number of ratings with each score
+    score_1 = models.PositiveIntegerField(default=0)
+    score_2 = models.PositiveIntegerField(default=0)
+    score_3 = models.PositiveIntegerField(default=0)
+    score_4 = models.PositiveIntegerField(default=0)
+    score_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('rating_date', 'meal_type')
+        verbose_name_plural = "Daily Meal Ratings"
+        ordering = ['-rating_date', 'meal_type']
+
+    def __str__(self):
+        return f"{self.get_meal_type_display()} on {self.rating_date}: {self.average} ({self.rating_count} ratings)"
+
+    @property
+    def average(self):
+        if not self.rating_count:
+            return None
+        return round(self.score_total / self.rating_count, 2)
+
+    @property
+    def histogram(self):
+        return {score: getattr(self, f'score_{score}') for score, _ in MealRating.RATING_CHOICES}
+
+    @classmethod
+    def record(cls, rating_date, meal_type, score, delta=1):
+        """
+        Adds (delta=1) or removes (delta=-1) one rating. The counters are changed
+        with F() expressions in a single UPDATE, so concurrent ratings for the
+        same meal never overwrite each other.
+        """
+        score = int(score)
+        cls.objects.get_or_create(rating_date=rating_date, meal_type=meal_type)
+        cls.objects.filter(rating_date=rating_date, meal_type=meal_type).update(**{
+            'rating_count': F('rating_count') + delta,
+            'score_total': F('score_total') + delta * score,
+            f'score_{score}': F(f'score_{score}') + delta,
+        })
+
+    @classmethod
+    def rebuild(cls, start_date, end_date):
+        """Recomputes the totals of a date range from the MealRating rows, e.g. after a bulk load."""
+        rows = MealRating.objects.filter(rating_date__range=(start_date, end_date)).values('rating_date', 'meal_type').annotate(
+            rating_count=Count('id'),
+            score_total=Sum('rating_score'),
+            **{f'score_{score}': Count('id', filter=Q(rating_score=score)) for score, _ in MealRating.RATING_CHOICES},
+        ).order_by()
+        with transaction.atomic():
+            cls.objects.filter(rating_date__range=(start_date, end_date)).delete()
+            cls.objects.bulk_create([cls(**row) for row in rows], batch_size=500)
+
+    @classmethod
+    def average_for(cls, rating_date):
+        """The average of all the day's ratings across meals, or None if there are none."""
+        totals = cls.objects.filter(rating_date=rating_date).aggregate(
+            count=Sum('rating_count'), total=Sum('score_total'),
+        )
+        if not totals['count']:
+            return None
+        return round(totals['total'] / totals['count'], 2)
+
+
+# --- 9. Notification Outbox ---
+
+class OutboundMessage(models.Model):
+    """
+    A WhatsApp message waiting to be delivered by the notification worker.
+    Rows are written in the same transaction as the change that triggered them.
+    """
+    PENDING = 'P'
+    SENT = 'S'
+    FAILED = 'F'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    recipient = models.CharField(max_length=20)
+    body = models.TextField()
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, null=True, blank=True)
+    # Shared by every message of one menu broadcast, so its delivery can be summarised
+    broadcast = models.CharField(max_length=32, blank=True, db_index=True)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    # Set while a worker holds the message, so two workers never send it twice
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    provider_sid = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Outbound Messages"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    @classmethod
+    def queue_for_bill(cls, bill, recipient):
+        """Queues the bill alert, or refreshes the one that is still pending."""
+        if not cls.refresh_pending_bill_alerts([bill], {bill.student_id: recipient}):
+            cls.objects.create(recipient=recipient, body=bill.whatsapp_message_body, bill=bill)
+
+    @classmethod
+    def refresh_pending_bill_alerts(cls, bills, recipients=None):
+        """
+        Rewrites the still-pending alerts of `bills` with their current amounts
+        (and numbers, from `recipients` = {student_id: mobile_number}), so an
+        alert never goes out with a stale total. Returns the ids of the bills
+        that had one.
+        """
+        bills_by_id = {bill.pk: bill for bill in bills}
+        pending = list(cls.objects.filter(bill_id__in=bills_by_id, status=cls.PENDING))
+        for message in pending:
+            bill = bills_by_id[message.bill_id]
+            message.body = bill.whatsapp_message_body
+            if recipients and recipients.get(bill.student_id):
+                message.recipient = recipients[bill.student_id]
+        cls.objects.bulk_update(pending, ['body', 'recipient'], batch_size=500)
+        return {message.bill_id for message in pending}
+
+    @classmethod
+    def queue_broadcast(cls, recipients, body):
+        """
+        Queues `body` once per distinct non-empty recipient.
+        Returns (broadcast id, number of messages queued).
+        """
+        broadcast = uuid.uuid4().hex
+        recipients = dict.fromkeys(r for r in recipients if r)
+        cls.objects.bulk_create(
+            (cls(recipient=recipient, body=body, broadcast=broadcast) for recipient in recipients), batch_size=500,
+        )
+        return broadcast, len(recipients)
+
+    @classmethod
+    def broadcast_summary(cls, broadcast):
+        """Counts a broadcast's messages: total, sent, failed, retrying and not yet tried."""
+        pending = Q(status=cls.PENDING)
+        return cls.objects.filter(broadcast=broadcast).aggregate(
+            total=Count('id'),
+            sent=Count('id', filter=Q(status=cls.SENT)),
+            failed=Count('id', filter=Q(status=cls.FAILED)),
+            retrying=Count('id', filter=pending & Q(attempts__gt=0)),
+            pending=Count('id', filter=pending & Q(attempts=0)),
+        )
 
     def __str__(self):
-        return f"{self.student.username}'s {self.get_meal_type_display()} Rating ({self.rating_date})"
\ No newline at end of file
+        return f"Message to {self.recipient} ({self.get_status_display()})"
@@ -0,0 +1,181 @@
+"""
+Bulk student onboarding from a CSV file.
+
+Columns: username, first_name, last_name, email, department, mobile_number,
+password (only username is required; a blank password leaves the account
+without a usable one until an admin sets it).
+
+The file is read in one streaming pass. Every row is validated and checked
+for duplicate usernames, emails and mobile numbers against an index of the
+existing users that is loaded with a single query and grows as rows are
+accepted. Accepted rows go out in chunks: the passwords of a chunk are hashed
+in a process pool (PBKDF2 is CPU-bound, so threads would not help), outside
+any transaction, and then the users are inserted with one bulk_create in a
+short transaction of their own. The SQLite write lock (taken at BEGIN) is
+therefore held only for the inserts, never while hashing.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import User
+
+COLUMNS = ('username', 'first_name', 'last_name', 'email', 'department', 'mobile_number', 'password')
+IMPORT_CHUNK_SIZE = 500
+# Below this many passwords, starting the worker processes costs more than it saves
+MIN_POOL_PASSWORDS = 8
+
+
+def _init_hashing_worker(settings_module):
+    # Forked workers (the Linux default) inherit the set-up Django, where this
+    # is a no-op; spawned ones (macOS, Windows) start without it
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password or None)
+
+
+def hash_passwords(passwords, pool=None, workers=1):
+    """make_password() for every password (blank: unusable), spread over `pool`'s `workers` when given."""
+    if pool is None or len(passwords) < MIN_POOL_PASSWORDS:
+        return [_hash_password(password) for password in passwords]
+    return list(pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+class ExistingUserIndex:
+    """Usernames, emails (case-insensitive) and mobile numbers already taken, loaded in one query."""
+
+    def __init__(self):
+        self.usernames, self.emails, self.mobiles = set(), set(), set()
+        for username, email, mobile in User.objects.values_list('username', 'email', 'mobile_number').iterator():
+            self.add(username, email, mobile)
+
+    def add(self, username, email, mobile):
+        self.usernames.add(username)
+        if email:
+            self.emails.add(email.lower())
+        if mobile:
+            self.mobiles.add(mobile)
+
+
+def validate_row(row, index):
+    """Cleans one CSV row; returns (fields, None) or (None, error message)."""
+    fields = {column: (row.get(column) or '').strip() for column in COLUMNS}
+    if not fields['username']:
+        return None, "username is required"
+    if len(fields['username']) > User._meta.get_field('username').max_length:
+        return None, "username is too long"
+    if fields['username'] in index.usernames:
+        return None, f"username '{fields['username']}' already exists"
+    if fields['email']:
+        try:
+            validate_email(fields['email'])
+        except ValidationError:
+            return None, f"'{fields['email']}' is not a valid email"
+        if fields['email'].lower() in index.emails:
+            return None, f"email '{fields['email']}' is already used"
+    if fields['mobile_number']:
+        if len(fields['mobile_number']) > User._meta.get_field('mobile_number').max_length:
+            return None, "mobile_number is too long"
+        if fields['mobile_number'] in index.mobiles:
+            return None, f"mobile number '{fields['mobile_number']}' is already used"
+
+    index.add(fields['username'], fields['email'], fields['mobile_number'])
+    return fields, None
+
+
+def _accepted_rows(reader, index, errors):
+    # Line 1 is the header
+    for line, row in enumerate(reader, start=2):
+        fields, error = validate_row(row, index)
+        if error:
+            errors.append((line, error))
+        else:
+            yield line, fields
+
+
+def _new_student(fields, password_hash):
+    return User(
+        username=fields['username'], first_name=fields['first_name'], last_name=fields['last_name'],
+        email=fields['email'], department=fields['department'] or None,
+        mobile_number=fields['mobile_number'] or None, role=User.STUDENT, password=password_hash,
+    )
+
+
+def _insert_chunk(students, errors):
+    """
+    Inserts (line, User) pairs in one transaction. If someone else created one
+    of the usernames or mobile numbers since the index was loaded, inserts
+    them one by one instead and reports the clashing rows. Returns the number
+    created.
+    """
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create([user for _, user in students])
+        return len(students)
+    except IntegrityError:
+        pass
+
+    created = 0
+    for line, user in students:
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+            created += 1
+        except IntegrityError:
+            errors.append((line, f"username '{user.username}' or mobile number was taken during the import"))
+    return created
+
+
+def import_students(csv_file, workers=None, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Imports the students in `csv_file` (a text file object). Invalid and
+    duplicate rows are skipped and reported; with dry_run nothing is written.
+    Each chunk is committed on its own, so a failure part-way keeps the
+    chunks before it.
+    `workers` is the number of hashing processes (default: one per CPU; 1
+    hashes in this process). Returns {'created', 'valid', 'errors': [(line, message)], 'seconds'}.
+    """
+    start = time.perf_counter()
+    reader = csv.DictReader(csv_file)
+    if 'username' not in (reader.fieldnames or []):
+        raise ValueError("The CSV has no username column.")
+
+    errors = []
+    rows = _accepted_rows(reader, ExistingUserIndex(), errors)
+    if dry_run:
+        valid = sum(1 for _ in rows)
+        return {'created': 0, 'valid': valid, 'errors': errors, 'seconds': round(time.perf_counter() - start, 3)}
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(
+        workers, initializer=_init_hashing_worker, initargs=(settings.SETTINGS_MODULE,),
+    ) if workers > 1 else None
+    created = valid = 0
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            valid += len(chunk)
+            hashes = hash_passwords([fields['password'] for _, fields in chunk], pool, workers)
+            created += _insert_chunk(
+                [(line, _new_student(fields, password_hash)) for (line, fields), password_hash in zip(chunk, hashes)], errors,
+            )
+    finally:
+        if pool:
+            pool.shutdown()
+
+    errors.sort()
+    return {'created': created, 'valid': valid, 'errors': errors, 'seconds': round(time.perf_counter() - start, 3)}
@@ -0,0 +1,100 @@
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .broadcast import broadcast_whatsapp
+from .models import Bill, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 3600
+
+
+def retry_delay(attempts):
+    """Exponential backoff (with a little jitter) before the next attempt."""
+    delay = min(settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return timedelta(seconds=delay * random.uniform(1.0, 1.1))
+
+
+def claim_batch(batch_size=50, lease_seconds=300):
+    """
+    Claims up to `batch_size` due messages for this worker.
+
+    The claim is a single conditional UPDATE, so concurrent workers never pick
+    up the same row. A crashed worker's lease simply runs out and the messages
+    become claimable again.
+    """
+    now = timezone.now()
+    claimable = Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    due_ids = list(
+        OutboundMessage.objects
+        .filter(claimable, status=OutboundMessage.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    OutboundMessage.objects.filter(claimable, id__in=due_ids).update(
+        claimed_by=token, claimed_until=now + timedelta(seconds=lease_seconds),
+    )
+    return list(OutboundMessage.objects.filter(claimed_by=token, status=OutboundMessage.PENDING))
+
+
+def deliver_batch(batch_size=50, limiter=None):
+    """
+    Claims one batch of messages and sends them through the bounded fan-out
+    pool, paced by `limiter` (pass the same RateLimiter to every call so the
+    messages-per-second limit holds across batches).
+
+    Returns a dict counting the messages sent, scheduled for retry and given up
+    on, with the same counts per menu broadcast under 'broadcasts'.
+    """
+    messages = claim_batch(batch_size)
+    summary = {'sent': 0, 'retried': 0, 'failed': 0, 'broadcasts': {}}
+
+    results = broadcast_whatsapp(((m.recipient, m.body) for m in messages), limiter=limiter)
+    for message, (sid, error) in zip(messages, results):
+        message.attempts += 1
+        message.claimed_by = ''
+        message.claimed_until = None
+        if error is not None:
+            logger.warning("Delivery of outbound message %s failed (attempt %s): %s", message.pk, message.attempts, error)
+            message.last_error = error
+            if message.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                message.status = OutboundMessage.FAILED
+                outcome = 'failed'
+            else:
+                message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+                outcome = 'retried'
+        else:
+            message.provider_sid = sid
+            message.status = OutboundMessage.SENT
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            outcome = 'sent'
+
+        summary[outcome] += 1
+        if message.broadcast:
+            counts = summary['broadcasts'].setdefault(message.broadcast, {'sent': 0, 'retried': 0, 'failed': 0})
+            counts[outcome] += 1
+
+    if messages:
+        sent_bill_ids = [m.bill_id for m in messages if m.status == OutboundMessage.SENT and m.bill_id]
+        with transaction.atomic():
+            OutboundMessage.objects.bulk_update(messages, [
+                'status', 'attempts', 'next_attempt_at', 'claimed_by', 'claimed_until',
+                'provider_sid', 'last_error', 'sent_at',
+            ])
+            # Using .update() so the cross turns into a checkmark without re-running Bill.save()
+            if sent_bill_ids:
+                Bill.objects.filter(pk__in=sent_bill_ids).update(notification_sent=True)
+
+    return summary
@@ -0,0 +1,58 @@
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(queryset, order_field, cursor):
+    """Turns a cursor back into (order_field value, pk); raises InvalidCursor if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        value, pk = raw.rsplit('|', 1)
+        field = queryset.model._meta.get_field(order_field)
+        return field.to_python(value), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError):
+        raise InvalidCursor(cursor)
+
+
+def keyset_page(queryset, order_field, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Returns one page of `queryset`, newest `order_field` first, as (rows, next_cursor).
+
+    Unlike OFFSET paging, the page is located with a WHERE on the last row seen
+    (ties broken on the primary key), so page 100 costs the same as page 1.
+    next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(f'-{order_field}', '-pk')
+    if cursor:
+        value, pk = decode_cursor(queryset, order_field, cursor)
+        queryset = queryset.filter(Q(**{f'{order_field}__lt': value}) | Q(**{order_field: value, 'pk__lt': pk}))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, order_field), last.pk)
+    return rows, next_cursor
+
+
+def page_size_from(request):
+    """Reads ?limit= from the request, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        return max(1, min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
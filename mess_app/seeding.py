@@ -0,0 +1,147 @@
+"""
+Deterministic synthetic data for trying MessNet at realistic size.
+
+The same arguments always produce the same rows. Everything is written with
+bulk_create, and the derived tables (LeaveDayLedger, MealRatingDaily and the
+bill amounts) are filled in alongside, so the data is consistent without
+going through the per-row save() hooks.
+"""
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import (
+    User, FoodMenu, LeaveRequest, LeaveDayLedger, Bill, Feedback, LostAndFound, AdminNotification,
+    MealRating, MealRatingDaily, WEEKDAYS,
+)
+from .billing import month_bounds, leave_days_by_month
+from .versions import MENU, NOTIFICATIONS, bump_versions
+
+BATCH_SIZE = 1000
+DEPARTMENTS = ['CSE', 'ECE', 'EEE', 'MECH', 'CIVIL', 'IT']
+PLACES = ['Mess hall', 'Reading room', 'Main gate', 'Hostel A', 'Hostel B', 'Sports ground']
+ITEMS = ['Umbrella', 'ID card', 'Water bottle', 'Keys', 'Calculator', 'Earphones', 'Wallet']
+
+
+def month_starts(end_date, months):
+    """The first day of the last `months` months up to end_date, oldest first."""
+    starts = []
+    for n in range(months - 1, -1, -1):
+        year, month_index = divmod(end_date.year * 12 + end_date.month - 1 - n, 12)
+        starts.append(date(year, month_index + 1, 1))
+    return starts
+
+
+def seed_benchmark_data(students=500, years=2, seed=42, prefix='seed', rating_share=0.1, end_date=None):
+    """
+    Creates `students` students with `years` of leave requests, bills, meal
+    ratings and feedback, plus Lost & Found posts. `rating_share` is the
+    fraction of meals each student rates. Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    months = month_starts(end_date, years * 12)
+    rate = Decimal(settings.MESS_BASE_RATE_PER_DAY)
+
+    with transaction.atomic():
+        # The weekly menu is shared; keep whatever is already there
+        FoodMenu.objects.bulk_create([
+            FoodMenu(day_of_week=day, meal_type=meal, menu_details=f'{meal_name} of {day_name}')
+            for day, day_name in WEEKDAYS for meal, meal_name in FoodMenu.MEAL_CHOICES
+        ], ignore_conflicts=True)
+        AdminNotification.objects.bulk_create([
+            AdminNotification(message=f'Seeded notice {n}', is_active=n >= 5) for n in range(10)
+        ])
+        bump_versions(MENU, NOTIFICATIONS)
+
+        User.objects.bulk_create([
+            User(
+                username=f'{prefix}{i:05d}', first_name='Student', last_name=f'{i:05d}', email=f'{prefix}{i:05d}@example.com',
+                role=User.STUDENT, department=rng.choice(DEPARTMENTS), password='!',
+            )
+            for i in range(students)
+        ], batch_size=BATCH_SIZE)
+        # bulk_create does not set primary keys on every backend, so read the ids back
+        student_ids = list(User.objects.filter(username__startswith=prefix, role=User.STUDENT).order_by('username').values_list('id', flat=True))
+
+        # Leave requests: about one month in three, mostly approved
+        leaves, ledger = [], defaultdict(int)
+        for student_id in student_ids:
+            for month_start in months:
+                if rng.random() >= 0.35:
+                    continue
+                month_end = month_bounds(month_start)[1]
+                from_date = month_start + timedelta(days=rng.randrange(month_end.day))
+                if from_date > end_date:
+                    continue
+                to_date = min(from_date + timedelta(days=rng.randrange(5)), end_date)
+                status = 'P' if month_start == months[-1] and rng.random() < 0.5 else rng.choices('AR', weights=(85, 15))[0]
+                leaves.append(LeaveRequest(
+                    student_id=student_id, from_date=from_date, to_date=to_date, reason='Going home', status=status,
+                ))
+                if status == 'A':
+                    for ledger_month, days in leave_days_by_month(from_date, to_date).items():
+                        ledger[(student_id, ledger_month)] += days
+        LeaveRequest.objects.bulk_create(leaves, batch_size=BATCH_SIZE)
+        LeaveDayLedger.objects.bulk_create([
+            LeaveDayLedger(student_id=student_id, month=month, approved_days=days)
+            for (student_id, month), days in ledger.items()
+        ], batch_size=BATCH_SIZE)
+
+        # One bill per student per month; only the current month is still due
+        bills = []
+        for student_id in student_ids:
+            for month_start in months:
+                month_end = month_bounds(month_start)[1]
+                bill = Bill(
+                    student_id=student_id, month=month_start, base_rate_per_day=rate, total_days_in_month=month_end.day,
+                    leave_days_approved=ledger.get((student_id, month_start), 0),
+                    last_date_of_payment=month_end + timedelta(days=settings.MESS_BILL_DUE_DAYS),
+                    status='D' if month_start == months[-1] else 'P', notification_sent=True,
+                )
+                bill.calculate_amounts()
+                bills.append(bill)
+        Bill.objects.bulk_create(bills, batch_size=BATCH_SIZE)
+
+        # Meal ratings for a share of all meals
+        ratings = []
+        day = months[0]
+        while day <= end_date:
+            for meal_type, _ in MealRating.MEAL_CHOICES:
+                for student_id in student_ids:
+                    if rng.random() < rating_share:
+                        score = rng.choices(range(1, 6), weights=(5, 10, 30, 35, 20))[0]
+                        ratings.append(MealRating(student_id=student_id, meal_type=meal_type, rating_date=day, rating_score=score))
+            day += timedelta(days=1)
+        MealRating.objects.bulk_create(ratings, batch_size=BATCH_SIZE)
+        # Other students may already have rated these days, so recount rather than insert
+        MealRatingDaily.rebuild(months[0], end_date)
+
+        feedback = [
+            Feedback(student_id=student_id, comment=f'Feedback {n} from a seeded student')
+            for student_id in student_ids for n in range(rng.randrange(len(months) // 2 + 1))
+        ]
+        Feedback.objects.bulk_create(feedback, batch_size=BATCH_SIZE)
+
+        lost_found = [
+            LostAndFound(
+                reporter_id=rng.choice(student_ids), type=rng.choice('LF'), item_name=rng.choice(ITEMS),
+                date_event=end_date - timedelta(days=rng.randrange(len(months) * 30)), place_event=rng.choice(PLACES),
+                description='Seeded item', is_approved=rng.random() < 0.8,
+            )
+            for _ in range(max(1, students // 5))
+        ] if student_ids else []
+        LostAndFound.objects.bulk_create(lost_found, batch_size=BATCH_SIZE)
+
+    return {
+        'students': len(student_ids),
+        'leave_requests': len(leaves),
+        'bills': len(bills),
+        'meal_ratings': len(ratings),
+        'feedback': len(feedback),
+        'lost_and_found': len(lost_found),
+    }
@@ -0,0 +1,114 @@
+import threading
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import User, Bill, LeaveRequest, AdminNotification, FoodMenu, MealRating, MealRatingDaily
+from .billing import apply_leave_day_changes
+from .versions import NOTIFICATIONS, MENU, user_scope, bump_versions, versions_changed
+from .events import dashboard_hub
+
+
+# --- Version counters behind the dashboard ETags and caches ---
+
+@receiver([post_save, post_delete], sender=Bill)
+@receiver([post_save, post_delete], sender=LeaveRequest)
+@receiver([post_save, post_delete], sender=MealRating)
+def bump_student_version(sender, instance, **kwargs):
+    bump_versions(user_scope(instance.student_id))
+
+
+@receiver([post_save, post_delete], sender=AdminNotification)
+def bump_notifications_version(sender, instance, **kwargs):
+    bump_versions(NOTIFICATIONS)
+
+
+@receiver([post_save, post_delete], sender=FoodMenu)
+def bump_menu_version(sender, instance, **kwargs):
+    bump_versions(MENU)
+
+
+# --- Leave day ledger ---
+
+# Users whose delete is in progress in this thread. Their leaves, ledger rows and
+# bills all go with them, so the leaves' post_delete must not write ledger rows
+# for them (that fails the foreign key check at commit) or re-price their bills.
+# post_delete has no `origin` before Django 4.1, and the user row still exists
+# while its dependents are deleted, hence the marker.
+_users_being_deleted = threading.local()
+
+
+def users_being_deleted():
+    if not hasattr(_users_being_deleted, 'ids'):
+        _users_being_deleted.ids = set()
+    return _users_being_deleted.ids
+
+
+@receiver(pre_delete, sender=User)
+def mark_user_deleted(sender, instance, **kwargs):
+    users_being_deleted().add(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def unmark_user_deleted(sender, instance, **kwargs):
+    users_being_deleted().discard(instance.pk)
+
+
+@receiver(post_delete, sender=LeaveRequest)
+def remove_leave_from_ledger(sender, instance, **kwargs):
+    if instance.status == 'A' and instance.student_id not in users_being_deleted():
+        apply_leave_day_changes(removed=[(instance.student_id, instance.from_date, instance.to_date)])
+
+
+# --- Daily meal rating totals ---
+
+@receiver(post_delete, sender=MealRating)
+def remove_rating_from_daily_totals(sender, instance, **kwargs):
+    # Runs inside the delete's transaction, queryset deletes included
+    MealRatingDaily.record(instance.rating_date, instance.meal_type, instance.rating_score, delta=-1)
+
+
+# --- Live dashboard pushes (Server-Sent Events) ---
+
+@receiver(versions_changed)
+def push_dashboard_events(sender, scopes, **kwargs):
+    dashboard_hub.publish_scopes(scopes)
+
+
+# --- Database connections ---
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+    if settings.SQLITE_IMMEDIATE_TRANSACTIONS:
+        # A deferred transaction that reads and then writes cannot wait for the
+        # write lock: SQLite fails it at once with "database is locked", whatever
+        # the busy timeout. Taking the lock at BEGIN makes it queue instead.
+        # This replaces a private method of Django 3.2's SQLite backend, so it is
+        # pinned to that release; Django 5.1 has OPTIONS['transaction_mode'] for it.
+        if django.VERSION[:2] != (3, 2):
+            raise ImproperlyConfigured(
+                "SQLITE_IMMEDIATE_TRANSACTIONS only supports Django 3.2. On Django 5.1 or later set "
+                "DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE' and turn it off."
+            )
+        connection._start_transaction_under_autocommit = lambda: connection.cursor().execute("BEGIN IMMEDIATE")
+
+
+@receiver(request_started)
+def drop_broken_persistent_connections(sender, **kwargs):
+    # Without this a request could reuse a connection the database server has closed
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and connection.settings_dict['CONN_MAX_AGE'] and not connection.is_usable():
+            connection.close()
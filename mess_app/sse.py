@@ -0,0 +1,139 @@
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+
+from .events import dashboard_hub
+from .views import is_student, dashboard_version, build_dashboard_data
+
+
+class DashboardEventStream:
+    """
+    ASGI app streaming a student's live dashboard data as Server-Sent Events.
+
+    The current state is sent on connect (unless the browser's Last-Event-ID
+    is still current), then again whenever the hub reports a change for this
+    student. Every SSE_HEARTBEAT_SECONDS the stream re-checks the version
+    counters, which catches changes saved by other processes, and otherwise
+    sends a keep-alive comment. An idle connection holds no thread and no
+    database connection.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope['method'] not in ('GET', 'HEAD'):
+            await self.plain_response(send, 405, b"Method not allowed")
+            return
+
+        user = await self.authenticate(scope)
+        if user is None:
+            await self.plain_response(send, 403, b"Login as a student to receive dashboard events")
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache, no-store'),
+                # Stops nginx from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+
+        headers = dict(scope['headers'])
+        last_etag = headers.get(b'last-event-id', b'').decode('latin1') or None
+        entry = dashboard_hub.subscribe(user.pk)
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            last_etag = await self.push_update(send, user, last_etag)
+            while True:
+                reason = await self.wait_for_change(entry[1], disconnected)
+                if reason == 'disconnect':
+                    break
+                etag = await self.push_update(send, user, last_etag)
+                if etag == last_etag and reason == 'timeout':
+                    await self.send_chunk(send, b": keep-alive\n\n")
+                last_etag = etag
+        finally:
+            dashboard_hub.unsubscribe(user.pk, entry)
+            disconnected.cancel()
+
+    @sync_to_async
+    def authenticate(self, scope):
+        """Resolves the student from the session cookie, like AuthenticationMiddleware."""
+        cookies = SimpleCookie()
+        for name, value in scope['headers']:
+            if name == b'cookie':
+                cookies.load(value.decode('latin1'))
+        morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+        if morsel is None:
+            return None
+
+        engine = import_module(settings.SESSION_ENGINE)
+        close_old_connections()
+        try:
+            user = get_user(SimpleNamespace(session=engine.SessionStore(morsel.value)))
+        finally:
+            close_old_connections()
+        if user.is_authenticated and is_student(user):
+            return user
+        return None
+
+    @sync_to_async
+    def load_update(self, user, last_etag):
+        """Returns (etag, payload); payload is None while last_etag is still current."""
+        etag = dashboard_version(user.pk)
+        if etag == last_etag:
+            return etag, None
+        close_old_connections()
+        try:
+            return etag, build_dashboard_data(user)
+        finally:
+            close_old_connections()
+
+    async def push_update(self, send, user, last_etag):
+        etag, payload = await self.load_update(user, last_etag)
+        if payload is not None:
+            message = f"id: {etag}\nevent: dashboard\ndata: {json.dumps(payload)}\n\n"
+            await self.send_chunk(send, message.encode())
+        return etag
+
+    async def wait_for_change(self, queue, disconnected):
+        getter = asyncio.ensure_future(queue.get())
+        done, _ = await asyncio.wait(
+            {getter, disconnected}, timeout=settings.SSE_HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED,
+        )
+        if getter not in done:
+            getter.cancel()
+        if disconnected in done:
+            return 'disconnect'
+        return 'change' if getter in done else 'timeout'
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    @staticmethod
+    async def send_chunk(send, body):
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+    @staticmethod
+    async def plain_response(send, status, body):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+dashboard_events = DashboardEventStream()
@@ -13,14 +13,6 @@ document.addEventListener('DOMContentLoaded', function() {
     const pageTitle = document.getElementById('page-title');
     const backdrop = document.getElementById('backdrop');
 
-    // --- Real-time Polling Elements ---
-    const billAmount = document.getElementById('bill-amount');
-    const billDueDate = document.getElementById('bill-due-date');
-    const billStatus = document.getElementById('bill-status');
-    const notificationsList = document.getElementById('notifications-list');
-    const leaveSummary = document.getElementById('leave-summary');
-    const leaveCard = document.getElementById('leave-card'); 
-
 
     // --- Mobile Menu Toggle ---
     function toggleSidebar() {
@@ -32,81 +24,128 @@ document.addEventListener('DOMContentLoaded', function() {
     menuButton.addEventListener('click', toggleSidebar);
     backdrop.addEventListener('click', toggleSidebar);
 
-    // --- Real-time Polling Logic ---
-    const updateDashboardData = async () => {
-        const endpointUrl = window.location.origin + '/data-endpoint/'; 
-        try {
-            const response = await fetch(endpointUrl);
-            if (!response.ok) throw new Error('Network response was not ok.');
-            
-            const data = await response.json();
-            const dash = data.dashboard;
-
-            // 1. Update Bill Card
-            if (dash.bill) {
-                billAmount.textContent = `₹${dash.bill.amount}`;
-                billDueDate.textContent = dash.bill.due_date;
-                billStatus.textContent = `(${dash.bill.status})`;
-                
-                // Update color based on status code
-                billStatus.classList.remove('text-red-600', 'text-green-600');
-                billStatus.classList.add(dash.bill.status_code === 'D' ? 'text-red-600' : 'text-green-600');
-                
-                // Update card border color based on status
-                const billCard = document.getElementById('bill-card');
-                billCard.classList.remove('border-red-600', 'border-indigo-600', 'border-green-600');
-                
-                if (dash.bill.status_code === 'D') {
-                    billCard.classList.add('border-red-600');
-                } else if (dash.bill.status_code === 'P') {
-                    // Use green for paid/resolved status
-                    billCard.classList.add('border-green-600'); 
-                } else {
-                    // Fallback for unexpected status
-                    billCard.classList.add('border-indigo-600');
-                }
-            }
+    // --- Real-time Dashboard Rendering ---
+    const renderDashboardData = (dash) => {
+        // The dashboard module may not have been fetched yet; it is rendered fresh when it is
+        const billAmount = document.getElementById('bill-amount');
+        if (!billAmount) return;
+        const billDueDate = document.getElementById('bill-due-date');
+        const billStatus = document.getElementById('bill-status');
+        const notificationsList = document.getElementById('notifications-list');
+        const leaveSummary = document.getElementById('leave-summary');
+        const leaveCard = document.getElementById('leave-card');
 
-            // 2. Update Leave Status Card
-            const leaveCount = dash.pending_leaves;
-            const latestStatus = dash.latest_leave_status;
-
-            if (leaveCount > 0) {
-                leaveSummary.innerHTML = `<span class="text-amber-600">${leaveCount} Pending Requests</span>`;
-                leaveCard.classList.remove('border-green-500', 'border-red-500');
-                leaveCard.classList.add('border-amber-500');
-            } else if (latestStatus === 'A') {
-                leaveSummary.innerHTML = `<span class="text-green-600">Latest: Approved</span>`;
-                leaveCard.classList.remove('border-amber-500', 'border-red-500');
-                leaveCard.classList.add('border-green-500');
-            } else if (latestStatus === 'R') {
-                leaveSummary.innerHTML = `<span class="text-red-600">Latest: Rejected</span>`;
-                leaveCard.classList.remove('border-amber-500', 'border-green-500');
-                leaveCard.classList.add('border-red-500'); 
+        // 1. Update Bill Card
+        if (dash.bill) {
+            billAmount.textContent = `₹${dash.bill.amount}`;
+            billDueDate.textContent = dash.bill.due_date;
+            billStatus.textContent = `(${dash.bill.status})`;
+            
+            // Update color based on status code
+            billStatus.classList.remove('text-red-600', 'text-green-600');
+            billStatus.classList.add(dash.bill.status_code === 'D' ? 'text-red-600' : 'text-green-600');
+            
+            // Update card border color based on status
+            const billCard = document.getElementById('bill-card');
+            billCard.classList.remove('border-red-600', 'border-indigo-600', 'border-green-600');
+            
+            if (dash.bill.status_code === 'D') {
+                billCard.classList.add('border-red-600');
+            } else if (dash.bill.status_code === 'P') {
+                // Use green for paid/resolved status
+                billCard.classList.add('border-green-600'); 
             } else {
-                leaveSummary.innerHTML = `<span class="text-gray-600">All Resolved / No Requests</span>`;
-                leaveCard.classList.remove('border-amber-500', 'border-green-500');
-                leaveCard.classList.add('border-gray-500');
+                // Fallback for unexpected status
+                billCard.classList.add('border-indigo-600');
             }
+        }
 
-            // 3. Update Notifications
-            notificationsList.innerHTML = '';
-            if (dash.notifications.length > 0) {
-                dash.notifications.forEach(notif => {
-                    const item = document.createElement('div');
-                    item.className = 'p-3 bg-gray-50 rounded-lg border border-gray-200 text-sm font-medium';
-                    item.innerHTML = `
-                        <span class="text-indigo-600 mr-2">[Admin Alert]</span>
-                        ${notif.message}
-                        <span class="text-xs text-gray-500 ml-2 float-right">${notif.date}</span>
-                    `;
-                    notificationsList.appendChild(item);
-                });
-            } else {
-                notificationsList.innerHTML = '<p class="text-center text-gray-500 py-2">No active announcements from the administration.</p>';
+        // 2. Update Leave Status Card
+        const leaveCount = dash.pending_leaves;
+        const latestStatus = dash.latest_leave_status;
+
+        if (leaveCount > 0) {
+            leaveSummary.innerHTML = `<span class="text-amber-600">${leaveCount} Pending Requests</span>`;
+            leaveCard.classList.remove('border-green-500', 'border-red-500');
+            leaveCard.classList.add('border-amber-500');
+        } else if (latestStatus === 'A') {
+            leaveSummary.innerHTML = `<span class="text-green-600">Latest: Approved</span>`;
+            leaveCard.classList.remove('border-amber-500', 'border-red-500');
+            leaveCard.classList.add('border-green-500');
+        } else if (latestStatus === 'R') {
+            leaveSummary.innerHTML = `<span class="text-red-600">Latest: Rejected</span>`;
+            leaveCard.classList.remove('border-amber-500', 'border-green-500');
+            leaveCard.classList.add('border-red-500'); 
+        } else {
+            leaveSummary.innerHTML = `<span class="text-gray-600">All Resolved / No Requests</span>`;
+            leaveCard.classList.remove('border-amber-500', 'border-green-500');
+            leaveCard.classList.add('border-gray-500');
+        }
+
+        // 3. Update Notifications
+        notificationsList.innerHTML = '';
+        if (dash.notifications.length > 0) {
+            dash.notifications.forEach(notif => {
+                const item = document.createElement('div');
+                item.className = 'p-3 bg-gray-50 rounded-lg border border-gray-200 text-sm font-medium';
+                item.innerHTML = `
+                    <span class="text-indigo-600 mr-2">[Admin Alert]</span>
+                    ${notif.message}
+                    <span class="text-xs text-gray-500 ml-2 float-right">${notif.date}</span>
+                `;
+                notificationsList.appendChild(item);
+            });
+        } else {
+            notificationsList.innerHTML = '<p class="text-center text-gray-500 py-2">No active announcements from the administration.</p>';
+        }
+        
+        renderIcons();
+    };
+
+    // --- Push Channel (Server-Sent Events, when served over ASGI) ---
+    // While the stream is open, polling is paused; if it drops, polling takes over.
+    let liveChannelOpen = false;
+    // The server answers 304 (no body) while our ETag is still current
+    let dashboardEtag = null;
+
+    if (window.EventSource) {
+        const liveChannel = new EventSource('/events/dashboard/');
+        liveChannel.onopen = () => { liveChannelOpen = true; };
+        liveChannel.onerror = () => { liveChannelOpen = false; };
+        liveChannel.addEventListener('dashboard', (event) => {
+            liveChannelOpen = true;
+            // Same version token as the polling ETag, so a fallback poll can still get a 304
+            dashboardEtag = `"${event.lastEventId}"`;
+            renderDashboardData(JSON.parse(event.data));
+        });
+    }
+
+    // --- Real-time Polling Logic (fallback) ---
+    // A 429 (throttled) pauses polling for the Retry-After the server sent,
+    // doubling the pause for every 429 in a row (up to 5 minutes).
+    let pollPausedUntil = 0;
+    let throttledPolls = 0;
+
+    const updateDashboardData = async () => {
+        if (liveChannelOpen || Date.now() < pollPausedUntil) return;
+
+        const endpointUrl = window.location.origin + '/data-endpoint/'; 
+        try {
+            const headers = dashboardEtag ? { 'If-None-Match': dashboardEtag } : {};
+            const response = await fetch(endpointUrl, { headers });
+            if (response.status === 429) {
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 10;
+                pollPausedUntil = Date.now() + Math.min(retryAfter * 2 ** throttledPolls, 300) * 1000;
+                throttledPolls += 1;
+                return;
             }
+            throttledPolls = 0;
+            if (response.status === 304) return;
+            if (!response.ok) throw new Error('Network response was not ok.');
             
-            renderIcons();
+            dashboardEtag = response.headers.get('ETag');
+            const data = await response.json();
+            renderDashboardData(data.dashboard);
 
         } catch (error) {
             console.error('Polling failed:', error);
@@ -118,6 +157,149 @@ document.addEventListener('DOMContentLoaded', function() {
     updateDashboardData();
 
 
+    // --- Lazily Loaded Lists (keyset-paginated JSON endpoints) ---
+    // Each list container carries data-lazy-list="<url>" and data-renderer="<name>".
+    // The first page is fetched when its module is opened; "Load more" follows next_cursor.
+    const escapeHtml = (value) => String(value ?? '').replace(/[&<>"']/g, (c) => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[c]);
+
+    const truncate = (value, length) => value.length > length ? value.slice(0, length - 1) + '…' : value;
+
+    const statusBadge = (label, colour) =>
+        `<span class="px-2 py-0.5 inline-flex text-xs leading-5 font-bold rounded-full bg-${colour}-200 text-${colour}-800">${label}</span>`;
+
+    const listRenderers = {
+        leave: {
+            empty: '<tr><td colspan="2" class="p-4 text-center text-gray-500 italic bg-gray-50">No leave requests submitted yet.</td></tr>',
+            row: (req) => `
+                <tr class="hover:bg-indigo-50 transition duration-150">
+                    <td class="p-3 text-sm font-medium text-gray-900">
+                        ${req.from_date} - ${req.to_date}
+                        <p class="text-xs text-gray-500 mt-0.5" title="${escapeHtml(req.reason)}">(${escapeHtml(truncate(req.reason, 25))})</p>
+                    </td>
+                    <td class="p-3">
+                        ${req.status === 'A' ? statusBadge('Approved', 'green') : req.status === 'R' ? statusBadge('Rejected', 'red') : statusBadge('Pending', 'yellow')}
+                    </td>
+                </tr>`,
+        },
+        bill: {
+            empty: '<tr><td colspan="5" class="p-4 text-center text-gray-500 italic bg-gray-50">No bill records found.</td></tr>',
+            row: (bill) => `
+                <tr class="hover:bg-gray-50">
+                    <td class="p-3 whitespace-nowrap text-sm font-medium text-gray-900">${bill.month}</td>
+                    <td class="p-3 whitespace-nowrap text-sm text-gray-700 font-semibold">₹${bill.total_amount}</td>
+                    <td class="p-3 whitespace-nowrap text-sm text-gray-500">- ₹${bill.adjustment_amount} (${bill.leave_days_approved} days)</td>
+                    <td class="p-3 whitespace-nowrap text-sm text-gray-500">${bill.due_date}</td>
+                    <td class="p-3 whitespace-nowrap">${bill.status === 'P' ? statusBadge('Paid', 'green') : statusBadge('Due', 'red')}</td>
+                </tr>`,
+        },
+        lostFound: {
+            empty: '<p class="text-center text-gray-500 py-4">No approved lost or found items currently listed.</p>',
+            row: (item) => {
+                const lost = item.type === 'L';
+                return `
+                <div class="p-4 rounded-lg shadow-sm ${lost ? 'bg-red-50 border-red-200' : 'bg-green-50 border-green-200'} border">
+                    <div class="flex justify-between items-start flex-wrap">
+                        <h4 class="font-bold text-lg text-gray-800">${escapeHtml(item.item_name)} 
+                            <span class="text-sm font-medium px-2 py-0.5 rounded-full ${lost ? 'bg-red-300 text-red-900' : 'bg-green-300 text-green-900'}">${escapeHtml(item.type_display)}</span>
+                        </h4>
+                        <span class="text-xs text-gray-500 mt-1 sm:mt-0">Posted by: ${escapeHtml(item.reporter)}</span>
+                    </div>
+                    <p class="text-sm text-gray-700 mt-1">${escapeHtml(item.description)}</p>
+                    <p class="text-xs text-gray-600 mt-2">
+                        <span class="font-semibold">Event Date:</span> ${item.date_event} | 
+                        <span class="font-semibold">Place:</span> ${escapeHtml(item.place_event)}
+                    </p>
+                </div>`;
+            },
+        },
+    };
+
+    const loadListPage = async (container) => {
+        if (container.dataset.loading === 'true') return;
+        container.dataset.loading = 'true';
+
+        const renderer = listRenderers[container.dataset.renderer];
+        const loadMoreButton = document.querySelector(`[data-load-more="${container.id}"]`);
+        const url = new URL(container.dataset.lazyList, window.location.origin);
+        if (container.dataset.nextCursor) url.searchParams.set('cursor', container.dataset.nextCursor);
+
+        try {
+            const response = await fetch(url);
+            if (!response.ok) throw new Error('Network response was not ok.');
+            const data = await response.json();
+
+            const firstPage = container.dataset.loaded !== 'true';
+            const html = data.results.map(renderer.row).join('');
+            if (firstPage) {
+                container.innerHTML = html || renderer.empty;
+            } else {
+                container.insertAdjacentHTML('beforeend', html);
+            }
+            container.dataset.loaded = 'true';
+            container.dataset.nextCursor = data.next_cursor || '';
+            if (loadMoreButton) loadMoreButton.classList.toggle('hidden', !data.next_cursor);
+            renderIcons();
+        } catch (error) {
+            console.error('Loading list failed:', error);
+        } finally {
+            container.dataset.loading = 'false';
+        }
+    };
+
+    const loadModuleLists = (moduleName) => {
+        document.querySelectorAll(`#${moduleName}-module [data-lazy-list]`).forEach((container) => {
+            if (container.dataset.loaded !== 'true') loadListPage(container);
+        });
+    };
+
+    // Delegated, since the buttons arrive with their module's fragment
+    document.addEventListener('click', (event) => {
+        const button = event.target.closest('[data-load-more]');
+        if (!button) return;
+        const container = document.getElementById(button.dataset.loadMore);
+        if (container) loadListPage(container);
+    });
+
+    // One submission per click: a double-clicked submit button would count twice against the throttle
+    document.addEventListener('submit', (event) => {
+        if (!event.target.querySelector('input[name="form_action"]')) return;
+        event.target.querySelectorAll('[type="submit"]').forEach((button) => { button.disabled = true; });
+    });
+
+
+    // --- Form Styling (the server-rendered module and every fetched fragment) ---
+    const styleFormFields = (root) => {
+        const formFields = root.querySelectorAll('.form-field-wrapper input:not([type="submit"]):not([type="radio"]):not([type="checkbox"]), .form-field-wrapper textarea, .form-field-wrapper select');
+        formFields.forEach(input => {
+            input.classList.add('w-full', 'px-3', 'py-2', 'border', 'border-gray-300', 'rounded-lg', 'shadow-sm', 'focus:ring-indigo-500', 'focus:border-indigo-500', 'transition', 'text-sm');
+        });
+    };
+
+
+    // --- Lazily Loaded Modules (HTML fragments) ---
+    // Only the active module is rendered with the page. Every other module's
+    // container carries data-fragment-url and is fetched the first time it is opened.
+    const loadModuleFragment = async (moduleName) => {
+        const container = document.querySelector(`#${moduleName}-module [data-fragment-url]`);
+        if (!container || container.dataset.fragmentLoaded !== 'false') return;
+        container.dataset.fragmentLoaded = 'loading';
+
+        try {
+            const response = await fetch(container.dataset.fragmentUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+            if (!response.ok) throw new Error('Network response was not ok.');
+            container.innerHTML = await response.text();
+            container.dataset.fragmentLoaded = 'true';
+            styleFormFields(container);
+        } catch (error) {
+            // Try again the next time the module is opened
+            container.dataset.fragmentLoaded = 'false';
+            console.error('Loading module failed:', error);
+        }
+    };
+
+
     // --- Module Switching ---
     function switchModule(moduleName) {
         // 1. Hide all modules
@@ -155,7 +337,13 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         window.history.pushState({}, '', newUrl);
 
-        // 5. Re-render icons after DOM manipulation 
+        // 5. Fetch the module (then its lists) the first time it is opened
+        loadModuleFragment(moduleName).then(() => {
+            loadModuleLists(moduleName);
+            renderIcons();
+        });
+
+        // 6. Re-render icons after DOM manipulation 
         renderIcons();
     }
     
@@ -174,8 +362,9 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // --- Initial State Setup ---
+    // The server says which module it rendered (a failed form submission picks its own)
     const urlParams = new URLSearchParams(window.location.search);
-    const initialModule = urlParams.get('module') || 'dashboard';
+    const initialModule = document.getElementById('app-container').dataset.initialModule || urlParams.get('module') || 'dashboard';
     
     // Initial app setup
     setTimeout(() => {
@@ -183,12 +372,8 @@ document.addEventListener('DOMContentLoaded', function() {
         renderIcons(); 
     }, 0); 
     
-    // --- Form Styling Initialization (Run once after initial DOM is ready) ---
-    const formFields = document.querySelectorAll('.form-field-wrapper input:not([type="submit"]):not([type="radio"]):not([type="checkbox"]), .form-field-wrapper textarea, .form-field-wrapper select');
-    formFields.forEach(input => {
-        input.classList.add('w-full', 'px-3', 'py-2', 'border', 'border-gray-300', 'rounded-lg', 'shadow-sm', 'focus:ring-indigo-500', 'focus:border-indigo-500', 'transition', 'text-sm');
-    
-    });
+    // --- Form Styling Initialization (the server-rendered module) ---
+    styleFormFields(document);
 });
 
 // Auto-dismiss Django Messages
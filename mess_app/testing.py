@@ -0,0 +1,193 @@
+"""
+Helpers shared by the test suite and the benchmarks.
+"""
+import itertools
+import json
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from .instrumentation import QueryCounter, query_budget
+
+
+@contextmanager
+def isolated_caches():
+    """
+    Swaps in a private locmem 'default' cache and a 'shared' cache in a new
+    temporary directory, so tests and benchmarks never read, bump or clear the
+    version counters, sessions and throttle counters of a running server.
+    """
+    directory = tempfile.mkdtemp(prefix='messnet-cache-')
+    try:
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'messnet-isolated'},
+            'shared': {'BACKEND': 'mess_app.cache_backends.SharedFileCache', 'LOCATION': directory},
+        }):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the suite with isolated_caches() (settings.TEST_RUNNER)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = ExitStack()
+        self._caches.enter_context(isolated_caches())
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.close()
+        super().teardown_test_environment(**kwargs)
+
+
+class FakeTwilioServer:
+    """
+    A local stand-in for the Twilio Messages API.
+
+    Point settings.TWILIO_API_BASE_URL at `url` and the real Twilio client will
+    talk to it. Accepted messages are recorded in `messages`; set `fail_next`
+    to make the next N requests answer HTTP 500, and `latency` (seconds) to
+    simulate a slow network round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.fail_next = 0
+        self.messages = []
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._sids = itertools.count(1)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, path, form):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.request_count += 1
+            if not path.endswith('/Messages.json'):
+                return 404, {'code': 20404, 'message': 'Not found', 'status': 404}
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return 500, {'code': 20500, 'message': 'Fake Twilio failure', 'status': 500}
+            message = {
+                'sid': f"SM{next(self._sids):032d}",
+                'to': form.get('To'),
+                'from': form.get('From'),
+                'body': form.get('Body'),
+                'status': 'queued',
+            }
+            self.messages.append(message)
+            return 201, message
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+                status, payload = fake._handle(self.path, form)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# --- Query Budgets ---
+
+@contextmanager
+def assert_query_budget(testcase, url_name, budget=None, method='GET'):
+    """
+    Fails the test if the block runs more SQL queries than the view's budget
+    (its settings.QUERY_BUDGETS entry for `method` unless `budget` is given).
+    """
+    budget = query_budget(url_name, method) if budget is None else budget
+    with QueryCounter() as queries:
+        yield queries
+    testcase.assertLessEqual(
+        queries.count, budget,
+        f"{url_name} ran {queries.count} queries ({queries.duration * 1000:.1f} ms), over its budget of {budget}",
+    )
+
+
+def seed_student_history(student, months=24, other_students=5):
+    """
+    Gives `student` a realistic history (two years of bills and leaves, today's
+    ratings) next to a full weekly menu, notifications, Lost & Found posts and
+    a few other students, so query counts are measured on non-trivial data.
+    """
+    from .models import User, FoodMenu, LeaveRequest, Bill, LostAndFound, AdminNotification, MealRating, MealRatingDaily, WEEKDAYS
+
+    User.objects.bulk_create([
+        User(username=f'{student.username}-peer{i}', role=User.STUDENT, password='!') for i in range(other_students)
+    ])
+    # bulk_create does not set primary keys on every backend, so read the users back
+    others = list(User.objects.filter(username__startswith=f'{student.username}-peer'))
+    FoodMenu.objects.bulk_create([
+        FoodMenu(day_of_week=day, meal_type=meal, menu_details=f'Menu {day}{meal}')
+        for day, _ in WEEKDAYS for meal, _ in FoodMenu.MEAL_CHOICES
+    ])
+    AdminNotification.objects.bulk_create([AdminNotification(message=f'Notice {i}', is_active=i % 3 != 0) for i in range(10)])
+
+    today = date.today()
+    bills, leaves = [], []
+    for n in range(months):
+        year, month_index = divmod(today.year * 12 + today.month - 1 - n, 12)
+        month = date(year, month_index + 1, 1)
+        bills.append(Bill(
+            student=student, month=month, base_rate_per_day=100, last_date_of_payment=month + timedelta(days=40),
+            status='P' if n else 'D', notification_sent=True,
+        ))
+        leaves.append(LeaveRequest(
+            student=student, from_date=month + timedelta(days=3), to_date=month + timedelta(days=5),
+            reason='Going home for the weekend', status='A' if n else 'P',
+        ))
+    Bill.objects.bulk_create(bills)
+    LeaveRequest.objects.bulk_create(leaves)
+
+    LostAndFound.objects.bulk_create([
+        LostAndFound(reporter=others[i % len(others)] if others else student, type='LF'[i % 2], item_name=f'Item {i}',
+                     date_event=today, place_event='Mess hall', description='Seeded item', is_approved=i % 4 != 0)
+        for i in range(40)
+    ])
+    ratings = [
+        MealRating(student=peer, meal_type=meal, rating_date=today, rating_score=3 + i % 3)
+        for i, peer in enumerate(others) for meal in 'BL'
+    ] + [MealRating(student=student, meal_type='B', rating_date=today, rating_score=4)]
+    MealRating.objects.bulk_create(ratings)
+    # bulk_create skips MealRating.save(), which keeps the daily totals
+    for rating in ratings:
+        MealRatingDaily.record(rating.rating_date, rating.meal_type, rating.rating_score)
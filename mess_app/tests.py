@@ -1,3 +1,1439 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.signals import request_started
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.servers.basehttp import WSGIServer
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.models import Sum
+from django.db.models.functions import Lower
+from django.test import Client, LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User, LeaveRequest, Bill, OutboundMessage, AdminNotification, FoodMenu, LostAndFound, MealRating, MealRatingDaily, LeaveDayLedger, Feedback
+from .billing import generate_monthly_bills, apply_leave_day_changes, change_leave_status
+from .broadcast import RateLimiter
+from .cache_backends import SharedFileCache
+from .caching import get_menu, get_active_notifications, get_student_snapshot, get_cache_stats
+from .outbox import deliver_batch
+from .versions import BILLS, bump_versions, get_versions, user_scope
+from .testing import FakeTwilioServer, assert_query_budget, seed_student_history
+from .sse import dashboard_events
+from .seeding import seed_benchmark_data
+from .loadtest import percentile, run_meal_rush
+from .session_cleanup import clear_expired_sessions
+from .onboarding import hash_passwords, import_students
+from .throttling import count_request
+from .views import DASHBOARD_MODULES
+
+# Password hashing is not what these tests measure
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class GenerateMonthlyBillsTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', role=User.STUDENT)
+        self.bob = User.objects.create(username='bob', role=User.STUDENT)
+        User.objects.create(username='warden', role=User.ADMIN)
+        # 3 days in March (30 Mar - 1 Apr) and 2 days inside March
+        LeaveRequest.objects.create(student=self.alice, from_date=date(2026, 3, 30), to_date=date(2026, 4, 4), reason='Home visit', status='A')
+        LeaveRequest.objects.create(student=self.alice, from_date=date(2026, 3, 10), to_date=date(2026, 3, 11), reason='Sports meet', status='A')
+        LeaveRequest.objects.create(student=self.bob, from_date=date(2026, 3, 1), to_date=date(2026, 3, 5), reason='Still pending', status='P')
+
+    def test_creates_bills_matching_per_row_save(self):
+        result = generate_monthly_bills(date(2026, 3, 15), base_rate_per_day=Decimal('100'))
+
+        self.assertEqual(result, {'created': 2, 'updated': 0})
+        bill = Bill.objects.get(student=self.alice)
+        self.assertEqual(bill.month, date(2026, 3, 1))
+        self.assertEqual(bill.leave_days_approved, 4)
+        self.assertEqual(bill.total_amount, Decimal('2700.00'))
+
+        # The per-row path must agree with the set-based one
+        bill.save()
+        bill.refresh_from_db()
+        self.assertEqual(bill.leave_days_approved, 4)
+        self.assertEqual(Bill.objects.get(student=self.bob).leave_days_approved, 0)
+
+    def test_refreshes_existing_bills_in_place(self):
+        Bill.objects.create(
+            student=self.bob, month=date(2026, 3, 1), base_rate_per_day=Decimal('80'),
+            total_days_in_month=30, last_date_of_payment=date(2026, 4, 10), notification_sent=True,
+        )
+        # Approving through save() keeps the leave day ledger current
+        for leave in LeaveRequest.objects.filter(student=self.bob):
+            leave.status = 'A'
+            leave.save()
+
+        # ...plus one read of the bills' pending alerts
+        with self.assertNumQueries(8):
+            result = generate_monthly_bills(date(2026, 3, 1), notify=False)
+
+        self.assertEqual(result, {'created': 1, 'updated': 1})
+        bill = Bill.objects.get(student=self.bob)
+        self.assertEqual(bill.base_rate_per_day, Decimal('80'))
+        self.assertEqual(bill.leave_days_approved, 5)
+        self.assertEqual(bill.total_amount, Decimal('2000.00'))
+
+
+TWILIO_TEST_SETTINGS = {
+    'TWILIO_ACCOUNT_SID': 'AC00000000000000000000000000000000',
+    'TWILIO_AUTH_TOKEN': 'test-token',
+    'TWILIO_WHATSAPP_NUMBER': 'whatsapp:+14155238886',
+}
+
+
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        self.student = User.objects.create(username='carol', role=User.STUDENT, mobile_number='+919800000001')
+
+    def create_bill(self, **kwargs):
+        return Bill.objects.create(
+            student=self.student, month=date(2026, 3, 1), base_rate_per_day=Decimal('100'),
+            last_date_of_payment=date(2026, 4, 10), **kwargs
+        )
+
+    def test_bill_save_queues_instead_of_sending(self):
+        bill = self.create_bill()
+        bill.save()
+
+        message = OutboundMessage.objects.get()
+        self.assertEqual(message.bill, bill)
+        self.assertEqual(message.recipient, '+919800000001')
+        self.assertIn('MESS BILL ALERT', message.body)
+        self.assertFalse(Bill.objects.get().notification_sent)
+
+    def test_paid_bill_is_not_queued(self):
+        self.create_bill(status='P')
+        self.assertFalse(OutboundMessage.objects.exists())
+
+    def test_generate_bills_queues_one_message_per_due_bill(self):
+        generate_monthly_bills(date(2026, 3, 1))
+        generate_monthly_bills(date(2026, 3, 1))
+        self.assertEqual(OutboundMessage.objects.count(), 1)
+
+    def test_pending_alert_follows_the_bill_amount(self):
+        bill = self.create_bill()
+        original_body = OutboundMessage.objects.get().body
+        # An approval re-prices the bill with bulk_update, skipping Bill.save()
+        LeaveRequest.objects.create(
+            student=self.student, from_date=date(2026, 3, 2), to_date=date(2026, 3, 6), reason='Home', status='A',
+        )
+        bill.refresh_from_db()
+        body = OutboundMessage.objects.get().body
+        self.assertNotEqual(body, original_body)
+        self.assertEqual(body, bill.whatsapp_message_body)
+
+        # Regenerating the month at a new rate refreshes the alert instead of skipping it
+        generate_monthly_bills(date(2026, 3, 1), base_rate_per_day='90')
+        bill.refresh_from_db()
+        self.assertEqual(OutboundMessage.objects.get().body, bill.whatsapp_message_body)
+        self.assertNotEqual(bill.whatsapp_message_body, body)
+
+    def test_worker_delivers_through_fake_twilio(self):
+        bill = self.create_bill()
+        with FakeTwilioServer() as twilio, override_settings(TWILIO_API_BASE_URL=twilio.url, **TWILIO_TEST_SETTINGS):
+            summary = deliver_batch()
+
+        self.assertEqual(summary, {'sent': 1, 'retried': 0, 'failed': 0, 'broadcasts': {}})
+        self.assertEqual(twilio.messages[0]['to'], 'whatsapp:+919800000001')
+        message = OutboundMessage.objects.get()
+        self.assertEqual(message.status, OutboundMessage.SENT)
+        self.assertEqual(message.provider_sid, twilio.messages[0]['sid'])
+        bill.refresh_from_db()
+        self.assertTrue(bill.notification_sent)
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=2, NOTIFICATION_RETRY_BASE_SECONDS=30)
+    def test_worker_retries_with_backoff_then_gives_up(self):
+        self.create_bill()
+        with FakeTwilioServer() as twilio, override_settings(TWILIO_API_BASE_URL=twilio.url, **TWILIO_TEST_SETTINGS):
+            twilio.fail_next = 2
+            self.assertEqual(deliver_batch(), {'sent': 0, 'retried': 1, 'failed': 0, 'broadcasts': {}})
+
+            message = OutboundMessage.objects.get()
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=25))
+            # Not due yet, so the next batch leaves it alone
+            self.assertEqual(deliver_batch(), {'sent': 0, 'retried': 0, 'failed': 0, 'broadcasts': {}})
+
+            OutboundMessage.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_batch(), {'sent': 0, 'retried': 0, 'failed': 1, 'broadcasts': {}})
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundMessage.FAILED)
+        self.assertEqual(message.attempts, 2)
+        self.assertFalse(Bill.objects.get().notification_sent)
+
+    def test_claimed_messages_are_skipped_by_other_workers(self):
+        self.create_bill()
+        OutboundMessage.objects.update(claimed_by='other', claimed_until=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(deliver_batch(), {'sent': 0, 'retried': 0, 'failed': 0, 'broadcasts': {}})
+
+
+@override_settings(**TWILIO_TEST_SETTINGS)
+class MenuBroadcastTests(TestCase):
+
+    def test_menu_save_queues_instead_of_sending(self):
+        admin_user = User.objects.create(username='warden', is_staff=True, is_superuser=True, role=User.ADMIN)
+        for i, mobile in enumerate(['+919800000001', '+919800000002', '', None]):
+            User.objects.create(username=f'student{i}', role=User.STUDENT, mobile_number=mobile)
+        menu = FoodMenu.objects.create(day_of_week='0', meal_type='B', menu_details='Idli')
+        self.client.force_login(admin_user)
+
+        response = self.client.post(
+            reverse('admin:mess_app_foodmenu_change', args=[menu.pk]),
+            {'day_of_week': '0', 'meal_type': 'B', 'menu_details': 'Poha'}, follow=True,
+        )
+
+        self.assertContains(response, 'queued for 2 student(s)')
+        self.assertEqual(
+            sorted(OutboundMessage.objects.filter(status=OutboundMessage.PENDING).values_list('recipient', flat=True)),
+            ['+919800000001', '+919800000002'],
+        )
+        self.assertIn('New Menu: Poha', OutboundMessage.objects.first().body)
+
+    def test_worker_fans_out_and_summarises_the_broadcast(self):
+        recipients = ['+919800000001', '+919800000002', '+919800000002', '', '+919800000003']
+        broadcast, queued = OutboundMessage.queue_broadcast(recipients, "Menu changed")
+        self.assertEqual(queued, 3)
+
+        with FakeTwilioServer() as twilio, override_settings(TWILIO_API_BASE_URL=twilio.url):
+            twilio.fail_next = 1
+            summary = deliver_batch(limiter=RateLimiter(0))
+
+        counts = {'sent': 2, 'retried': 1, 'failed': 0}
+        self.assertEqual(summary, dict(counts, broadcasts={broadcast: counts}))
+        self.assertEqual(twilio.request_count, 3)
+        self.assertEqual(
+            OutboundMessage.broadcast_summary(broadcast),
+            {'total': 3, 'sent': 2, 'failed': 0, 'retrying': 1, 'pending': 0},
+        )
+
+    @override_settings(WHATSAPP_BROADCAST_WORKERS=6, WHATSAPP_MESSAGES_PER_SECOND=20)
+    def test_rate_limit_paces_the_worker(self):
+        OutboundMessage.queue_broadcast([f'+91980000{i:04d}' for i in range(6)], "Menu changed")
+        with FakeTwilioServer() as twilio, override_settings(TWILIO_API_BASE_URL=twilio.url):
+            start = time.monotonic()
+            summary = deliver_batch()
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(summary['sent'], 6)
+        # Six sends at 20/s need at least five 50 ms gaps
+        self.assertGreaterEqual(elapsed, 0.25)
+
+    def test_pool_sends_concurrently(self):
+        OutboundMessage.queue_broadcast([f'+91980000{i:04d}' for i in range(8)], "Menu changed")
+        with FakeTwilioServer(latency=0.2) as twilio, override_settings(TWILIO_API_BASE_URL=twilio.url):
+            start = time.monotonic()
+            summary = deliver_batch(limiter=RateLimiter(0))
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(summary['sent'], 8)
+        # Eight 200 ms round trips, one after another, would take 1.6 s
+        self.assertLess(elapsed, 1.0)
+
+    def test_worker_command_reports_each_broadcast(self):
+        broadcast, _ = OutboundMessage.queue_broadcast(['+919800000001', '+919800000002'], "Menu changed")
+        out = StringIO()
+        with FakeTwilioServer() as twilio, override_settings(TWILIO_API_BASE_URL=twilio.url):
+            call_command('run_notification_worker', '--once', stdout=out)
+
+        self.assertIn(f"Broadcast {broadcast}: 2 of 2 sent, 0 retrying, 0 failed", out.getvalue())
+
+    @override_settings(TWILIO_AUTH_TOKEN=None)
+    def test_missing_credentials_fail_fast(self):
+        broadcast, _ = OutboundMessage.queue_broadcast(['+919800000001'], "Menu changed")
+        summary = deliver_batch()
+        self.assertEqual(summary['broadcasts'], {broadcast: {'sent': 0, 'retried': 1, 'failed': 0}})
+        self.assertIn('credentials', OutboundMessage.objects.get().last_error)
+
+
+class DataEndpointConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='dave', role=User.STUDENT)
+        self.client.force_login(self.student)
+        self.url = reverse('data_endpoint')
+
+    def test_matching_etag_returns_304_without_data_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Only the user lookup of the auth middleware remains (the session comes from the cache)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_own_changes_and_notifications_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(student=self.student, from_date=date(2026, 3, 1), to_date=date(2026, 3, 2), reason='Family function')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dashboard']['pending_leaves'], 1)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminNotification.objects.create(message='Mess closed on Sunday')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dashboard']['notifications'][0]['message'], 'Mess closed on Sunday')
+
+    def test_other_students_changes_keep_the_etag(self):
+        other = User.objects.create(username='erin', role=User.STUDENT)
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.create(student=other, from_date=date(2026, 3, 1), to_date=date(2026, 3, 2), reason='Family function')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class VersionCounterTests(TestCase):
+
+    def test_counters_survive_a_full_default_cache(self):
+        small_default = {**settings.CACHES, 'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiny', 'OPTIONS': {'MAX_ENTRIES': 50},
+        }}
+        scopes = [user_scope(user_id) for user_id in range(400)]
+        with override_settings(CACHES=small_default):
+            before = get_versions(*scopes)
+            # Snapshots, sessions and throttle buckets of 400 students churn the default cache
+            cache.set_many({f'churn:{n}': n for n in range(400)})
+            self.assertEqual(get_versions(*scopes), before)
+
+    def test_counters_are_kept_in_the_shared_cache(self):
+        self.assertEqual(settings.VERSION_CACHE_ALIAS, 'shared')
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_versions('menu')
+        version = get_versions('menu')['menu']
+        self.assertEqual(caches['shared'].get('messnet:version:menu'), version)
+        self.assertIsNone(cache.get('messnet:version:menu'))
+
+    def test_bumping_thousands_of_counters_stays_fast(self):
+        scopes = [user_scope(user_id) for user_id in range(3000)]
+        start = time.perf_counter()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_versions(*scopes)
+        # FileBasedCache listed its whole directory on every write: 14 s for 3,000 counters
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(len(caches['shared'].get_many([f'messnet:version:{scope}' for scope in scopes])), 3000)
+
+
+class SharedFileCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache = SharedFileCache(directory, {'OPTIONS': {'SWEEP_INTERVAL': 0}})
+
+    def test_live_entries_are_never_culled(self):
+        self.cache.set('expired', 1, timeout=-1)
+        self.cache.set_many({f'live:{n}': n for n in range(400)}, timeout=None)
+        self.assertEqual(len(self.cache.get_many([f'live:{n}' for n in range(400)])), 400)
+        # The sweep removed only the expired file
+        self.assertEqual(len(self.cache._list_cache_files()), 400)
+
+    def test_incr_keeps_the_expiry(self):
+        self.cache.add('hits', 0, timeout=60)
+        self.assertEqual(self.cache.incr('hits', 2), 2)
+        with open(self.cache._key_to_file('hits'), 'rb') as f:
+            self.assertAlmostEqual(pickle.load(f), time.time() + 60, delta=5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_concurrent_increments_are_not_lost(self):
+        self.cache.add('hits', 0, timeout=None)
+        # A separate instance per thread, like Django's per-thread cache connections
+        caches_ = [SharedFileCache(self.cache._dir, {}) for _ in range(8)]
+        threads = [threading.Thread(target=lambda c=c: [c.incr('hits') for _ in range(25)]) for c in caches_]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('hits'), 200)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={
+    'data_endpoint': {'requests': 2, 'seconds': 10},
+    'student_dashboard': {'requests': 1, 'seconds': 10, 'methods': ('POST',)},
+})
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        # The start of a 10-second window, so no test straddles two
+        self.clock = 1_800_000_000.0
+        patcher = mock.patch('mess_app.throttling.time.time', side_effect=lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.student = User.objects.create(username='tabs', role=User.STUDENT)
+        self.client.force_login(self.student)
+        self.url = reverse('data_endpoint')
+
+    def test_over_the_limit_answers_429_with_retry_after_until_the_window_ends(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.clock += 4
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Refused before the view runs: only the user lookup
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '6')
+        self.assertEqual(response.json()['status'], 'error')
+
+        self.clock += 6
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_parallel_burst_cannot_exceed_the_limit(self):
+        barrier = threading.Barrier(20)
+        results = []
+
+        def hit():
+            barrier.wait()
+            results.append(count_request('messnet:throttle:burst', 5, 60))
+
+        threads = [threading.Thread(target=hit) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(0), 5)
+
+    def test_counters_are_shared_by_every_worker(self):
+        self.assertEqual(settings.THROTTLE_CACHE_ALIAS, 'shared')
+        for _ in range(2):
+            self.client.get(self.url)
+        # A second worker process has its own cache instances but the same shared store
+        other_worker = SharedFileCache(caches['shared']._dir, {})
+        self.assertEqual(other_worker.get(f'messnet:throttle:data_endpoint:user:{self.student.pk}:1800000000'), 2)
+
+    def test_counters_are_per_user_and_per_ip(self):
+        for _ in range(2):
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, 429)
+
+        other = Client()
+        other.force_login(User.objects.create(username='other-tab', role=User.STUDENT))
+        self.assertEqual(other.get(self.url).status_code, 200)
+
+        # Signed out, the counter is the address's (the endpoint then redirects to the login page)
+        anonymous = Client(REMOTE_ADDR='10.0.0.7')
+        self.assertEqual([anonymous.get(self.url).status_code for _ in range(3)], [302, 302, 429])
+        self.assertEqual(Client(REMOTE_ADDR='10.0.0.8').get(self.url).status_code, 302)
+
+    def test_only_form_posts_are_throttled_on_the_dashboard(self):
+        url = reverse('student_dashboard')
+        # An invalid submission re-renders the page (200); the throttle refuses the next one first
+        self.assertEqual(self.client.post(url, {'form_action': 'feedback'}).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # A plain form post goes back to the page with the reason; a script gets the 429
+        response = self.client.post(url, {'form_action': 'feedback'}, follow=True)
+        self.assertRedirects(response, url)
+        self.assertContains(response, 'Too many requests. Try again in 10 seconds.')
+        response = self.client.post(url, {'form_action': 'feedback'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 429)
+
+    def test_can_be_switched_off(self):
+        with self.settings(THROTTLE_ENABLED=False):
+            self.assertEqual({self.client.get(self.url).status_code for _ in range(4)}, {200})
+
+
+class DashboardEventStreamTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='frank', role=User.STUDENT)
+
+    def open_stream(self, cookie=None):
+        headers = [(b'cookie', f'{settings.SESSION_COOKIE_NAME}={cookie}'.encode())] if cookie else []
+        scope = {'type': 'http', 'method': 'GET', 'path': settings.SSE_DASHBOARD_PATH, 'headers': headers}
+        closed = asyncio.Event()
+        sent = []
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        task = asyncio.ensure_future(dashboard_events(scope, receive, send))
+        return task, closed, sent
+
+    @staticmethod
+    async def wait_for_events(sent, count):
+        for _ in range(200):
+            events = [m['body'] for m in sent if m['type'] == 'http.response.body' and m['body'].startswith(b'id:')]
+            if len(events) >= count:
+                return events
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"expected {count} event(s), got {len(events)}")
+
+    def test_anonymous_stream_is_rejected(self):
+        async def scenario():
+            task, closed, sent = self.open_stream()
+            await task
+            return sent
+
+        sent = async_to_sync(scenario)()
+        self.assertEqual(sent[0]['status'], 403)
+
+    def test_pushes_current_state_then_changes(self):
+        self.client.force_login(self.student)
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        def create_leave():
+            with self.captureOnCommitCallbacks(execute=True):
+                LeaveRequest.objects.create(student=self.student, from_date=date(2026, 3, 1), to_date=date(2026, 3, 2), reason='Family function')
+
+        async def scenario():
+            task, closed, sent = self.open_stream(cookie)
+            await self.wait_for_events(sent, 1)
+            await sync_to_async(create_leave)()
+            events = await self.wait_for_events(sent, 2)
+            closed.set()
+            await task
+            return sent, events
+
+        sent, events = async_to_sync(scenario)()
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        first = json.loads(events[0].split(b'data: ', 1)[1])
+        second = json.loads(events[1].split(b'data: ', 1)[1])
+        self.assertEqual(first['pending_leaves'], 0)
+        self.assertEqual(second['pending_leaves'], 1)
+
+
+class GlobalDataCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.today = str(date.today().weekday())
+        self.lunch = FoodMenu.objects.create(day_of_week=self.today, meal_type='L', menu_details='Rice, Sambar')
+
+    def test_menu_is_read_once_until_it_changes(self):
+        self.assertEqual(get_menu()['by_day'][self.today]['L'], 'Rice, Sambar')
+        with self.assertNumQueries(0):
+            get_menu()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lunch.menu_details = 'Biryani'
+            self.lunch.save()
+        self.assertEqual(get_menu()['by_day'][self.today]['L'], 'Biryani')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lunch.delete()
+        self.assertEqual(get_menu()['by_day'], {})
+
+    def test_notifications_follow_admin_edits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notice = AdminNotification.objects.create(message='Water supply cut at 3 PM')
+        self.assertEqual([n['message'] for n in get_active_notifications()], ['Water supply cut at 3 PM'])
+        with self.assertNumQueries(0):
+            get_active_notifications()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notice.is_active = False
+            notice.save()
+        self.assertEqual(get_active_notifications(), [])
+
+    def test_dashboard_renders_cached_menu(self):
+        student = User.objects.create(username='gina', role=User.STUDENT)
+        self.client.force_login(student)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertContains(response, 'Lunch:</span> Rice, Sambar')
+
+    def test_menu_and_notification_fragments_follow_admin_edits(self):
+        student = User.objects.create(username='gita', role=User.STUDENT)
+        self.client.force_login(student)
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminNotification.objects.create(message='Water supply cut at 3 PM')
+        self.assertContains(self.client.get(reverse('dashboard_module', args=['dashboard'])), 'Water supply cut at 3 PM')
+        self.assertContains(self.client.get(reverse('dashboard_module', args=['menu'])), 'Rice, Sambar')
+
+        # Writes that skip the signals stay invisible until a version moves...
+        AdminNotification.objects.update(message='Mess closed on Sunday')
+        FoodMenu.objects.update(menu_details='Biryani')
+        self.assertContains(self.client.get(reverse('dashboard_module', args=['dashboard'])), 'Water supply cut at 3 PM')
+        self.assertContains(self.client.get(reverse('dashboard_module', args=['menu'])), 'Rice, Sambar')
+
+        # ...while admin edits bump the versions in their keys
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminNotification.objects.get().save()
+            self.lunch.refresh_from_db()
+            self.lunch.save()
+        dashboard = self.client.get(reverse('dashboard_module', args=['dashboard']))
+        self.assertContains(dashboard, 'Mess closed on Sunday')
+        self.assertContains(dashboard, 'Lunch:</span> Biryani')
+        self.assertContains(self.client.get(reverse('dashboard_module', args=['menu'])), 'Biryani')
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.student = User.objects.create(username='hari', role=User.STUDENT)
+        self.client.force_login(self.student)
+
+    def fetch_all(self, url, limit):
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(url, params).json()
+            seen.extend(data['results'])
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                return seen, pages
+
+    def test_walks_every_leave_once_even_with_equal_timestamps(self):
+        for day in range(1, 8):
+            LeaveRequest.objects.create(student=self.student, from_date=date(2026, 3, day), to_date=date(2026, 3, day), reason=f'Leave {day}')
+        # Identical requested_on values must still page cleanly (ties broken on the id)
+        LeaveRequest.objects.update(requested_on=timezone.now())
+
+        results, pages = self.fetch_all(reverse('leave_history'), limit=3)
+        self.assertEqual(pages, 3)
+        self.assertEqual([r['reason'] for r in results], [f'Leave {day}' for day in range(7, 0, -1)])
+
+    def test_lists_only_own_bills_and_approved_items(self):
+        other = User.objects.create(username='ira', role=User.STUDENT)
+        for student, month in [(self.student, 1), (self.student, 2), (other, 1)]:
+            Bill.objects.create(student=student, month=date(2026, month, 1), last_date_of_payment=date(2026, month, 10), notification_sent=True)
+        LostAndFound.objects.create(reporter=other, type='L', item_name='Umbrella', date_event=date(2026, 3, 1), place_event='Mess hall', description='Black', is_approved=True)
+        LostAndFound.objects.create(reporter=other, type='F', item_name='Keys', date_event=date(2026, 3, 1), place_event='Gate', description='Pending', is_approved=False)
+
+        bills, _ = self.fetch_all(reverse('bill_history'), limit=20)
+        self.assertEqual([b['month'] for b in bills], ['February 2026', 'January 2026'])
+        items, _ = self.fetch_all(reverse('lost_found_list'), limit=20)
+        self.assertEqual([(i['item_name'], i['reporter']) for i in items], [('Umbrella', 'ira')])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('leave_history'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryBudgetTests(TestCase):
+    """Every student-facing view must stay within its settings.QUERY_BUDGETS entry on a realistic dataset."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='jaya', role=User.STUDENT, mobile_number='+919800000010')
+        seed_student_history(self.student)
+        self.client.force_login(self.student)
+
+    def test_dashboard_pages(self):
+        for url_name in ('student_dashboard', 'home'):
+            with self.subTest(url_name=url_name):
+                cache.clear()
+                with assert_query_budget(self, url_name):
+                    response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+
+    def test_data_endpoint_full_and_not_modified(self):
+        with assert_query_budget(self, 'data_endpoint'):
+            response = self.client.get(reverse('data_endpoint'))
+        self.assertEqual(response.status_code, 200)
+
+        with assert_query_budget(self, 'data_endpoint', budget=1):
+            response = self.client.get(reverse('data_endpoint'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_history_lists_cost_the_same_on_every_page(self):
+        for url_name in ('leave_history', 'bill_history', 'lost_found_list'):
+            with self.subTest(url_name=url_name):
+                with assert_query_budget(self, url_name):
+                    first = self.client.get(reverse(url_name), {'limit': 10}).json()
+                with assert_query_budget(self, url_name):
+                    self.client.get(reverse(url_name), {'limit': 10, 'cursor': first['next_cursor']})
+
+    def test_dashboard_module_fragments(self):
+        for module in DASHBOARD_MODULES:
+            with self.subTest(module=module):
+                cache.clear()
+                with assert_query_budget(self, 'dashboard_module'):
+                    response = self.client.get(reverse('dashboard_module', args=[module]))
+                self.assertEqual(response.status_code, 200)
+
+    @override_settings(DEBUG=True, QUERY_BUDGETS={'data_endpoint': 1})
+    def test_middleware_reports_and_warns_over_budget(self):
+        with self.assertLogs('mess_app.instrumentation', level='WARNING') as logs:
+            response = self.client.get(reverse('data_endpoint'))
+        self.assertIn('over its budget of 1', logs.output[0])
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+
+
+class LazyDashboardModuleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='kiran', role=User.STUDENT)
+        seed_student_history(self.student)
+        self.client.force_login(self.student)
+
+    def test_shell_renders_only_the_active_module(self):
+        response = self.client.get(reverse('student_dashboard'), {'module': 'leave'})
+        self.assertContains(response, 'Submit Leave Request')
+        self.assertNotContains(response, 'Last Mess Bill')
+        self.assertNotContains(response, 'Current Weekly Schedule')
+        self.assertContains(response, f'data-fragment-url="{reverse("dashboard_module", args=["menu"])}" data-fragment-loaded="false"')
+
+        with CaptureQueriesContext(connection) as leave_shell:
+            self.client.get(reverse('student_dashboard'), {'module': 'leave'})
+        with CaptureQueriesContext(connection) as dashboard_shell:
+            self.client.get(reverse('student_dashboard'))
+        # The user only; the dashboard module adds its bill and leave lookups
+        self.assertEqual(len(leave_shell), 1)
+        self.assertLess(len(leave_shell), len(dashboard_shell))
+
+    def test_fragment_matches_the_server_rendered_module(self):
+        fragment = self.client.get(reverse('dashboard_module', args=['feedback']))
+        self.assertContains(fragment, "Today's Average Meal Rating")
+        self.assertNotContains(fragment, '<html')
+        self.assertIn('no-store', fragment['Cache-Control'])
+        self.assertEqual(self.client.get(reverse('dashboard_module', args=['timetable'])).status_code, 404)
+
+    def test_failed_submission_renders_the_module_that_owns_the_form(self):
+        response = self.client.post(reverse('student_dashboard'), {'form_action': 'leave', 'reason': ''})
+        self.assertContains(response, 'data-initial-module="leave"')
+        self.assertContains(response, 'Submission failed!')
+        self.assertNotContains(response, 'Last Mess Bill')
+
+
+class StudentSnapshotCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='lata', role=User.STUDENT)
+        seed_student_history(self.student, months=3)
+        self.client.force_login(self.student)
+
+    def test_polls_are_served_from_the_snapshot(self):
+        first = self.client.get(reverse('data_endpoint')).json()
+        with self.assertNumQueries(1):  # the user
+            second = self.client.get(reverse('data_endpoint')).json()
+        self.assertEqual(first, second)
+        self.assertEqual(second['dashboard']['pending_leaves'], 1)
+        self.assertEqual(get_cache_stats()['student_snapshot'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_changes_to_bills_leaves_and_ratings_invalidate_it(self):
+        self.assertEqual(get_student_snapshot(self.student.pk)['rated_meals_today'], ['B'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MealRating.objects.create(student=self.student, meal_type='L', rating_date=date.today(), rating_score=5)
+        self.assertEqual(sorted(get_student_snapshot(self.student.pk)['rated_meals_today']), ['B', 'L'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.filter(student=self.student, status='P').get().delete()
+        self.assertEqual(get_student_snapshot(self.student.pk)['pending_leaves_count'], 0)
+
+        bill = Bill.objects.filter(student=self.student).latest('month')
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.status = 'P'
+            bill.save()
+        self.assertEqual(get_student_snapshot(self.student.pk)['latest_bill']['status_display'], 'Paid')
+
+    def test_bill_generation_moves_one_coarse_version(self):
+        get_student_snapshot(self.student.pk)
+        month = date.today().replace(day=1) + timedelta(days=40)
+        with self.captureOnCommitCallbacks() as callbacks:
+            generate_monthly_bills(month, notify=False)
+        self.assertEqual(len(callbacks), 1)
+        with mock.patch('mess_app.versions.versions_changed.send') as send:
+            callbacks[0]()
+        send.assert_called_once_with(sender=None, scopes=(BILLS,))
+
+        new_bill = Bill.objects.get(student=self.student, month=month.replace(day=1))
+        self.assertEqual(get_student_snapshot(self.student.pk)['latest_bill']['last_date_of_payment'], new_bill.last_date_of_payment)
+
+    def test_only_staff_can_read_and_reset_the_counters(self):
+        get_student_snapshot(self.student.pk)
+        self.assertEqual(self.client.get(reverse('cache_stats')).status_code, 302)
+
+        self.client.force_login(User.objects.create(username='warden', role=User.ADMIN, is_staff=True))
+        stats = self.client.get(reverse('cache_stats')).json()['caches']
+        self.assertEqual(stats['student_snapshot']['misses'], 1)
+        stats = self.client.post(reverse('cache_stats')).json()['caches']
+        self.assertEqual(stats['student_snapshot'], {'hits': 0, 'misses': 0, 'hit_rate': None})
+
+
+class SessionStoreTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create(username='mani', role=User.STUDENT)
+
+    def poll_queries(self):
+        # A new client, since SessionMiddleware picks its engine when the handler loads
+        client = Client()
+        client.force_login(self.student)
+        client.get(reverse('data_endpoint'))
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('data_endpoint'))
+        return [query['sql'] for query in queries]
+
+    def test_cached_db_sessions_skip_the_session_table(self):
+        self.assertFalse(any('django_session' in sql for sql in self.poll_queries()))
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertTrue(any('django_session' in sql for sql in self.poll_queries()))
+
+    def test_cached_db_falls_back_to_the_database(self):
+        self.client.force_login(self.student)
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        self.assertEqual(self.client.get(reverse('data_endpoint')).status_code, 200)
+
+    def test_sessions_are_cached_where_every_worker_sees_a_logout(self):
+        self.assertEqual(settings.SESSION_CACHE_ALIAS, 'shared')
+        self.client.force_login(self.student)
+        cache_key = import_module(settings.SESSION_ENGINE).SessionStore(self.client.session.session_key).cache_key
+        self.assertIsNotNone(caches['shared'].get(cache_key))
+        self.assertIsNone(cache.get(cache_key))
+
+        self.client.logout()
+        self.assertIsNone(caches['shared'].get(cache_key))
+
+    def test_suite_never_touches_the_configured_caches(self):
+        configured = import_module(os.environ['DJANGO_SETTINGS_MODULE'])
+        self.assertNotEqual(caches['shared']._dir, os.path.abspath(configured.CACHES['shared']['LOCATION']))
+        self.assertEqual(settings.CACHES['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_cleanup_deletes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i:03d}', session_data='', expire_date=now - timedelta(days=1)) for i in range(25)]
+            + [Session(session_key=f'live{i:03d}', session_data='', expire_date=now + timedelta(days=1)) for i in range(5)]
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = clear_expired_sessions(batch_size=10)
+        self.assertEqual((summary['deleted'], summary['batches']), (25, 3))
+        self.assertEqual(sum(sql['sql'].startswith('DELETE') for sql in queries), 3)
+        self.assertEqual(set(Session.objects.values_list('session_key', flat=True)), {f'live{i:03d}' for i in range(5)})
+
+        out = StringIO()
+        call_command('clear_expired_sessions', stdout=out)
+        self.assertIn('Deleted 0 expired session(s)', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'sqlite', "Checks SQLite's EXPLAIN QUERY PLAN output")
+class IndexUsageTests(TestCase):
+    """The dashboard's hot queries must be answered from the composite indexes, not full table scans."""
+
+    def setUp(self):
+        self.student = User.objects.create(username='kavi', role=User.STUDENT)
+        seed_student_history(self.student)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        # "SCAN <table> USING INDEX" walks the index in order; a bare "SCAN <table>" reads every row
+        self.assertNotRegex(plan, r'(?m)\bSCAN (TABLE )?mess_app_\w+$')
+
+    def test_dashboard_queries_use_composite_indexes(self):
+        today = date.today()
+        cases = [
+            (LeaveRequest.objects.filter(student=self.student, status='P'), 'leave_student_status_idx'),
+            (Bill.objects.filter(student=self.student).order_by('-month'), 'bill_student_month_idx'),
+            (MealRating.objects.filter(rating_date=today, meal_type='B'), 'rating_date_meal_idx'),
+            (LostAndFound.objects.filter(is_approved=True).order_by('-posted_on', '-pk'), 'lostfound_approved_idx'),
+            (AdminNotification.objects.filter(is_active=True).order_by('-created_at'), 'notification_active_idx'),
+        ]
+        for queryset, index_name in cases:
+            with self.subTest(index=index_name):
+                self.assertUsesIndex(queryset, index_name)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmailOrUsernameLoginTests(TestCase):
+
+    def setUp(self):
+        self.student = User.objects.create_user(username='meera', email='Meera@Example.com', password='pass', role=User.STUDENT)
+
+    def authenticate(self, login, password):
+        with mock.patch.object(MD5PasswordHasher, 'encode', autospec=True, side_effect=MD5PasswordHasher.encode) as encode:
+            with self.assertNumQueries(1):
+                user = authenticate(None, username=login, password=password)
+        # At most one password hash per attempt, found or not
+        self.assertEqual(encode.call_count, 1)
+        return user
+
+    def test_username_or_any_case_email_logs_in_with_one_query_and_one_hash(self):
+        self.assertEqual(self.authenticate('meera', 'pass'), self.student)
+        self.assertEqual(self.authenticate('meera@example.COM', 'pass'), self.student)
+
+    def test_bad_logins_cost_one_hash(self):
+        self.assertIsNone(self.authenticate('meera@example.com', 'wrong'))
+        self.assertIsNone(self.authenticate('nobody@example.com', 'pass'))
+        self.assertIsNone(self.authenticate('nobody', 'pass'))
+
+    def test_shared_email_only_logs_in_by_username(self):
+        User.objects.create_user(username='meera2', email='meera@example.com', password='pass', role=User.STUDENT)
+        self.assertIsNone(self.authenticate('meera@example.com', 'pass'))
+        self.assertEqual(self.authenticate('meera2', 'pass').username, 'meera2')
+
+    def test_inactive_users_are_refused(self):
+        User.objects.filter(pk=self.student.pk).update(is_active=False)
+        self.assertIsNone(self.authenticate('meera', 'pass'))
+
+    def test_email_lookup_uses_the_lower_email_index(self):
+        plan = User.objects.annotate(email_lower=Lower('email')).filter(email_lower='meera@example.com').explain()
+        self.assertIn('user_email_lower_idx', plan)
+
+    def test_login_page_accepts_email(self):
+        response = self.client.post(reverse('login'), {'username': 'MEERA@example.com', 'password': 'pass'})
+        self.assertRedirects(response, reverse('student_dashboard'), fetch_redirect_response=False)
+        response = Client().post(reverse('login'), {'username': 'meera', 'password': 'nope'})
+        self.assertEqual(response.context['form'].errors.as_data()['__all__'][0].code, 'invalid_login')
+
+
+class MealRatingDailyTests(TestCase):
+
+    def setUp(self):
+        self.students = [User.objects.create(username=f'rater{i}', role=User.STUDENT) for i in range(3)]
+        self.today = date.today()
+
+    def test_totals_follow_inserts_updates_and_deletes(self):
+        for student, score in zip(self.students, ['5', 4, 2]):
+            MealRating.objects.create(student=student, meal_type='L', rating_date=self.today, rating_score=score)
+        MealRating.objects.create(student=self.students[0], meal_type='B', rating_date=self.today, rating_score=3)
+
+        lunch = MealRatingDaily.objects.get(rating_date=self.today, meal_type='L')
+        self.assertEqual((lunch.rating_count, lunch.score_total, lunch.average), (3, 11, 3.67))
+        self.assertEqual(lunch.histogram, {1: 0, 2: 1, 3: 0, 4: 1, 5: 1})
+        self.assertEqual(MealRatingDaily.average_for(self.today), 3.5)
+
+        rating = MealRating.objects.get(student=self.students[2], meal_type='L')
+        rating.rating_score = 5
+        rating.save()
+        MealRating.objects.filter(meal_type='B').delete()
+
+        lunch.refresh_from_db()
+        self.assertEqual((lunch.rating_count, lunch.score_total, lunch.score_2, lunch.score_5), (3, 14, 0, 2))
+        self.assertEqual(MealRatingDaily.objects.get(meal_type='B').rating_count, 0)
+        self.assertEqual(MealRatingDaily.average_for(self.today), 4.67)
+
+    def test_dashboard_reads_average_from_daily_totals(self):
+        MealRating.objects.create(student=self.students[1], meal_type='D', rating_date=self.today, rating_score=4)
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get(reverse('dashboard_module', args=['feedback'])).context['today_average_rating'], 4.0)
+        self.assertEqual(MealRatingDaily.average_for(self.today - timedelta(days=1)), None)
+
+
+class LeaveDayLedgerTests(TestCase):
+
+    def setUp(self):
+        self.student = User.objects.create(username='lata', role=User.STUDENT)
+        self.march, self.april = [
+            Bill.objects.create(
+                student=self.student, month=date(2026, month, 1), base_rate_per_day=Decimal('100'),
+                total_days_in_month=30, last_date_of_payment=date(2026, month, 28), notification_sent=True,
+            )
+            for month in (3, 4)
+        ]
+        self.leave = LeaveRequest.objects.create(
+            student=self.student, from_date=date(2026, 3, 29), to_date=date(2026, 4, 2), reason='Festival',
+        )
+
+    def ledger(self):
+        return dict(LeaveDayLedger.objects.filter(student=self.student).values_list('month', 'approved_days'))
+
+    def assertBillLeaveDays(self, march_days, april_days):
+        for bill, days in ((self.march, march_days), (self.april, april_days)):
+            bill.refresh_from_db()
+            self.assertEqual(bill.leave_days_approved, days)
+            self.assertEqual(bill.total_amount, Decimal(100 * (30 - days)))
+
+    def test_approval_splits_across_months_and_reprices_bills(self):
+        self.assertEqual(self.ledger(), {})
+        self.leave.status = 'A'
+        self.leave.save()
+
+        self.assertEqual(self.ledger(), {date(2026, 3, 1): 3, date(2026, 4, 1): 2})
+        self.assertBillLeaveDays(3, 2)
+
+        self.leave.to_date = date(2026, 4, 5)
+        self.leave.save()
+        self.assertBillLeaveDays(3, 5)
+
+        self.leave.status = 'R'
+        self.leave.save()
+        self.assertBillLeaveDays(0, 0)
+
+    def test_deleting_an_approved_leave_gives_the_days_back(self):
+        self.leave.status = 'A'
+        self.leave.save()
+        self.leave.delete()
+        self.assertEqual(set(self.ledger().values()), {0})
+        self.assertBillLeaveDays(0, 0)
+
+    def test_deleting_a_student_with_an_approved_leave(self):
+        self.march.delete()
+        self.april.delete()
+        self.leave.status = 'A'
+        self.leave.save()
+        self.student.delete()
+        # SQLite only checks foreign keys at commit; check now
+        connection.check_constraints()
+        self.assertFalse(LeaveDayLedger.objects.exists())
+
+    def test_deleting_a_student_with_bills_and_an_approved_leave(self):
+        self.leave.status = 'A'
+        self.leave.save()
+        User.objects.filter(pk=self.student.pk).delete()
+        connection.check_constraints()
+        self.assertFalse(LeaveDayLedger.objects.exists())
+        self.assertFalse(Bill.objects.exists())
+
+    def test_bulk_changes_cost_a_fixed_number_of_queries(self):
+        students = [User.objects.create(username=f'bulk{i}', role=User.STUDENT) for i in range(20)]
+        Bill.objects.bulk_create([
+            Bill(student=student, month=date(2026, 3, 1), base_rate_per_day=Decimal('100'), last_date_of_payment=date(2026, 4, 10))
+            for student in students
+        ])
+        added = [(student.pk, date(2026, 3, 30), date(2026, 4, 1)) for student in students]
+        # Ledger insert, one UPDATE per (month, change), ledger read, bill read, bill update, pending alert read
+        with self.assertNumQueries(7):
+            apply_leave_day_changes(added=added)
+        self.assertEqual(
+            LeaveDayLedger.objects.filter(student__in=students, month=date(2026, 3, 1), approved_days=2).count(), 20
+        )
+        self.assertEqual(Bill.objects.filter(student__in=students, leave_days_approved=2).count(), 20)
+
+
+class BulkLeaveActionTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='warden', password='pass', email='warden@example.com', role=User.ADMIN)
+        self.client.force_login(self.admin)
+        self.students = [User.objects.create(username=f'term{i}', role=User.STUDENT) for i in range(10)]
+        for student in self.students:
+            Bill.objects.create(
+                student=student, month=date(2026, 4, 1), base_rate_per_day=Decimal('100'),
+                total_days_in_month=30, last_date_of_payment=date(2026, 4, 28), notification_sent=True,
+            )
+            LeaveRequest.objects.create(student=student, from_date=date(2026, 4, 10), to_date=date(2026, 4, 12), reason='Term break')
+        self.changelist = reverse('admin:mess_app_leaverequest_changelist')
+
+    def run_action(self, action, leaves):
+        return self.client.post(self.changelist, {
+            'action': action, '_selected_action': [leave.pk for leave in leaves],
+        }, follow=True)
+
+    def test_approve_and_reject_reprice_bills_in_bulk(self):
+        leaves = list(LeaveRequest.objects.all())
+        # Changelist budgets cover page views, not bulk actions
+        with CaptureQueriesContext(connection) as queries, self.assertNoLogs('mess_app.instrumentation', level='WARNING'):
+            response = self.run_action('approve_selected_leaves', leaves)
+        self.assertContains(response, '10 leave request(s) approved')
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "mess_app_bill" SET "student_id"')],
+                         "bills must be re-priced with bulk_update, not Bill.save()")
+        self.assertEqual(Bill.objects.filter(leave_days_approved=3, total_amount=Decimal('2700.00')).count(), 10)
+
+        response = self.run_action('reject_selected_leaves', leaves[:4])
+        self.assertContains(response, '4 leave request(s) rejected')
+        self.assertEqual(Bill.objects.filter(leave_days_approved=0, total_amount=Decimal('3000.00')).count(), 4)
+        self.assertEqual(LeaveDayLedger.objects.filter(approved_days=3).count(), 6)
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        leaves = LeaveRequest.objects.all()
+        with CaptureQueriesContext(connection) as few:
+            change_leave_status(leaves.filter(student__in=self.students[:2]), 'A')
+        with CaptureQueriesContext(connection) as many:
+            change_leave_status(leaves, 'A')
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(change_leave_status(leaves, 'A'), 0)
+
+
+class AdminChangelistQueryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        seed_benchmark_data(students=30, years=1, prefix='cl')
+        Feedback.objects.create(student=None, comment='Left by a deleted account')
+        LostAndFound.objects.create(reporter=None, item_name='Umbrella', type='F', date_event=date.today(), is_approved=True)
+        for bill in Bill.objects.all()[:20]:
+            OutboundMessage.objects.create(recipient='+910000000000', body='Bill due', bill=bill)
+        self.client.force_login(User.objects.create_superuser(username='warden', email='', password='pass', role=User.ADMIN))
+
+    def test_every_changelist_page_stays_within_its_budget(self):
+        for model in admin.site._registry:
+            if model._meta.app_label != 'mess_app':
+                continue
+            url_name = f'mess_app_{model._meta.model_name}_changelist'
+            for params in ({}, {'o': '1'}):
+                with self.subTest(url_name, **params), assert_query_budget(self, url_name):
+                    response = self.client.get(reverse(f'admin:{url_name}'), params)
+                self.assertEqual(response.status_code, 200)
+
+    def test_names_are_annotated_and_sortable(self):
+        response = self.client.get(reverse('admin:mess_app_bill_changelist'), {'o': '1'})
+        names = [bill.student_display_name for bill in response.context['cl'].result_list]
+        self.assertEqual(names, sorted(names))
+        self.assertRegex(names[0], r'^\S+ \S+ \(cl\w+\)$')
+        self.assertContains(self.client.get(reverse('admin:mess_app_feedback_changelist')), 'N/A')
+        self.assertContains(self.client.get(reverse('admin:mess_app_lostandfound_changelist')), '>Reporter<')
+
+        bill = Bill.objects.select_related('student').first()
+        response = self.client.get(reverse('admin:mess_app_bill_change', args=[bill.pk]))
+        self.assertContains(response, f'<strong>{bill.student.first_name} {bill.student.last_name} ({bill.student.username})</strong>', html=True)
+
+
+class AccountingExportTests(TestCase):
+
+    def setUp(self):
+        self.students = [User.objects.create(username=f'acct{i}', first_name='Acct', last_name=str(i), role=User.STUDENT) for i in range(6)]
+        for i, student in enumerate(self.students):
+            for month in (3, 4):
+                Bill.objects.create(
+                    student=student, month=date(2026, month, 1), base_rate_per_day=Decimal('100'), total_days_in_month=30,
+                    last_date_of_payment=date(2026, month, 28), status='P' if i % 2 else 'D', notification_sent=True,
+                )
+            LeaveRequest.objects.create(student=student, from_date=date(2026, 3, 30), to_date=date(2026, 4, 2), reason='Home, "urgent"')
+            MealRating.objects.create(student=student, meal_type='L', rating_date=date(2026, 4, 5), rating_score=4)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_records', *args, stdout=out)
+        return out.getvalue()
+
+    def test_month_and_status_are_filtered_in_one_query(self):
+        with self.assertNumQueries(1):
+            output = self.export('bills', '--month', '2026-04', '--status', 'D', '--chunk-size', '2')
+        rows = list(csv.DictReader(StringIO(output)))
+        self.assertEqual([row['student_username'] for row in rows], ['acct0', 'acct2', 'acct4'])
+        self.assertEqual({(row['month'], row['status'], row['total_amount']) for row in rows}, {('2026-04', 'Due', '3000.00')})
+
+    def test_leaves_overlapping_the_month_as_json_lines(self):
+        lines = self.export('leaves', '--month', '2026-03', '--format', 'jsonl').splitlines()
+        self.assertEqual(len(lines), 6)
+        first = json.loads(lines[0])
+        self.assertEqual((first['from_date'], first['days'], first['reason']), ('2026-03-30', 4, 'Home, "urgent"'))
+        self.assertEqual(self.export('leaves', '--month', '2026-05', '--format', 'jsonl'), '')
+
+    def test_ratings_have_no_status(self):
+        with self.assertRaises(CommandError):
+            self.export('ratings', '--status', 'A')
+
+    def test_admin_action_streams_the_selection(self):
+        self.client.force_login(User.objects.create_superuser(username='accounts', password='pass', email='', role=User.ADMIN))
+        bills = Bill.objects.filter(month=date(2026, 3, 1))
+        response = self.client.post(reverse('admin:mess_app_bill_changelist'), {
+            'action': 'export_bills_csv', '_selected_action': [bill.pk for bill in bills],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="messnet-bills.csv"')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['month'] for row in rows}, {'2026-03'})
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StudentImportTests(TestCase):
+
+    def setUp(self):
+        User.objects.create(username='taken', email='Taken@Example.com', mobile_number='9000000000', role=User.STUDENT)
+
+    def csv_file(self, rows):
+        lines = ['username,first_name,last_name,email,department,mobile_number,password'] + rows
+        return StringIO('\n'.join(lines) + '\n')
+
+    def test_invalid_and_duplicate_rows_are_skipped(self):
+        result = import_students(self.csv_file([
+            'new1,New,One,new1@example.com,CSE,9000000001,secret-1',
+            'taken,Dup,Username,,,,',
+            'new2,Dup,Email,taken@example.com,,,',
+            'new3,Dup,Mobile,,,9000000000,',
+            'new1,Dup,InFile,,,,',
+            ',No,Username,,,,',
+            'new4,Bad,Email,not-an-email,,,',
+            'new5,No,Password,,,,',
+        ]), workers=1)
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([line for line, _ in result['errors']], [3, 4, 5, 6, 7, 8])
+        first = User.objects.get(username='new1')
+        self.assertEqual((first.role, first.department, first.mobile_number), (User.STUDENT, 'CSE', '9000000001'))
+        self.assertTrue(first.check_password('secret-1'))
+        self.assertFalse(User.objects.get(username='new5').has_usable_password())
+
+    def test_dry_run_creates_nothing(self):
+        result = import_students(self.csv_file(['dry1,,,,,,', 'taken,,,,,,']), dry_run=True)
+        self.assertEqual((result['valid'], len(result['errors'])), (1, 1))
+        self.assertFalse(User.objects.filter(username='dry1').exists())
+
+    def test_missing_username_column_is_refused(self):
+        with self.assertRaises(ValueError):
+            import_students(StringIO('name,email\nx,x@example.com\n'))
+
+    def test_pool_hashes_in_chunks_with_a_fixed_number_of_queries(self):
+        rows = [f'pool{i},Pool,{i},pool{i}@example.com,,,pw-{i}' for i in range(20)]
+        # One lookup of existing users, then one bulk insert per chunk, each in its own transaction (savepoint here)
+        with self.assertNumQueries(7):
+            result = import_students(self.csv_file(rows), workers=2, chunk_size=10)
+        self.assertEqual(result['created'], 20)
+        self.assertTrue(User.objects.get(username='pool13').check_password('pw-13'))
+
+    def test_passwords_are_hashed_outside_the_write_transaction(self):
+        outer_blocks = len(connection.savepoint_ids)
+        real_hash_passwords = hash_passwords
+
+        def hash_outside_transaction(*args):
+            self.assertEqual(len(connection.savepoint_ids), outer_blocks)
+            return real_hash_passwords(*args)
+
+        with mock.patch('mess_app.onboarding.hash_passwords', side_effect=hash_outside_transaction) as hashing:
+            result = import_students(self.csv_file([f'tx{i},,,,,,pw' for i in range(5)]), workers=1, chunk_size=2)
+        self.assertEqual((result['created'], hashing.call_count), (5, 3))
+
+    def test_rows_taken_during_the_import_are_skipped(self):
+        real_hash_passwords = hash_passwords
+
+        def someone_else_registers(*args):
+            # Another admin adds one of the chunk's usernames between validation and insert
+            User.objects.get_or_create(username='race2', role=User.STUDENT)
+            return real_hash_passwords(*args)
+
+        with mock.patch('mess_app.onboarding.hash_passwords', side_effect=someone_else_registers):
+            result = import_students(self.csv_file(['race1,,,,,,', 'race2,,,,,,', 'race3,,,,,,', 'taken,,,,,,']), workers=1)
+        self.assertEqual((result['created'], result['valid']), (2, 3))
+        self.assertEqual([line for line, _ in result['errors']], [3, 5])
+        self.assertIn('taken during the import', result['errors'][0][1])
+        self.assertEqual(User.objects.filter(username__in=['race1', 'race3']).count(), 2)
+
+    def test_command_reports_skipped_rows(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as csv_file:
+            csv_file.write(self.csv_file(['cmd1,,,,,,pw', 'taken,,,,,,']).getvalue())
+        out, err = StringIO(), StringIO()
+        try:
+            call_command('import_students', csv_file.name, '--workers', '1', stdout=out, stderr=err)
+        finally:
+            os.remove(csv_file.name)
+        self.assertIn('1 student(s) created, 1 row(s) skipped', out.getvalue())
+        self.assertIn("Line 3: username 'taken' already exists", err.getvalue())
+
+    def test_admin_upload(self):
+        self.client.force_login(User.objects.create_superuser(username='registrar', password='pass', email='', role=User.ADMIN))
+        url = reverse('admin:mess_app_user_import_students')
+        self.assertContains(self.client.get(reverse('admin:mess_app_user_changelist')), url)
+
+        upload = SimpleUploadedFile('students.csv', self.csv_file(['web1,Web,One,,,,pw']).getvalue().encode('utf-8-sig'))
+        with mock.patch('mess_app.onboarding.os.cpu_count', return_value=1):
+            response = self.client.post(url, {'csv_file': upload}, follow=True)
+        self.assertRedirects(response, reverse('admin:mess_app_user_changelist'))
+        self.assertContains(response, '1 student(s) created')
+        self.assertTrue(User.objects.get(username='web1').check_password('pw'))
+
+
+class StaticAssetPipelineTests(TestCase):
+    """collectstatic with the production storage, served by WhiteNoise."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.production_static = override_settings(
+            STATIC_ROOT=cls.static_root, STATICFILES_STORAGE='whitenoise.storage.CompressedManifestStaticFilesStorage',
+            WHITENOISE_AUTOREFRESH=False, WHITENOISE_USE_FINDERS=False,
+        )
+        cls.production_static.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.production_static.disable()
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        # A new client, so WhiteNoise indexes this STATIC_ROOT
+        self.client = Client()
+        self.client.force_login(User.objects.create(username='static', role=User.STUDENT))
+
+    def asset_urls(self):
+        html = self.client.get(reverse('student_dashboard')).content.decode()
+        return re.findall(r'(/static/(?:js/script|css/style)\.[0-9a-f]{12}\.(?:js|css))', html)
+
+    def fetch(self, url, **headers):
+        response = self.client.get(url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_pages_link_fingerprinted_assets_cached_forever(self):
+        urls = self.asset_urls()
+        self.assertEqual(len(urls), 2)
+        for url in urls:
+            response, body = self.fetch(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Cache-Control'], 'max-age=315360000, public, immutable')
+            self.assertEqual(body, open(os.path.join(self.static_root, url[len('/static/'):]), 'rb').read())
+
+            # Revalidation (e.g. a forced reload) costs no body
+            revalidated, body = self.fetch(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual((revalidated.status_code, body), (304, b''))
+
+    def test_precompressed_variants_are_negotiated(self):
+        url = self.asset_urls()[0]
+        plain_size = int(self.fetch(url)[0]['Content-Length'])
+        for accept, encoding in (('gzip', 'gzip'), ('gzip, deflate, br', 'br')):
+            response, body = self.fetch(url, HTTP_ACCEPT_ENCODING=accept)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertLess(len(body), plain_size)
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class SeedBenchmarkDataTests(TestCase):
+
+    def test_same_seed_gives_same_consistent_data(self):
+        end_date = date(2026, 5, 20)
+        first = seed_benchmark_data(students=6, years=1, seed=7, prefix='one', end_date=end_date)
+        second = seed_benchmark_data(students=6, years=1, seed=7, prefix='two', end_date=end_date)
+        self.assertEqual(first, second)
+        self.assertEqual(first['bills'], 6 * 12)
+
+        def bill_totals(prefix):
+            return list(Bill.objects.filter(student__username__startswith=prefix).order_by('student__username', 'month').values_list('total_amount', flat=True))
+        self.assertEqual(bill_totals('one'), bill_totals('two'))
+
+        # Derived tables agree with the rows they summarise
+        approved_days = sum(leave.total_leave_days for leave in LeaveRequest.objects.filter(status='A'))
+        self.assertEqual(LeaveDayLedger.objects.aggregate(total=Sum('approved_days'))['total'], approved_days)
+        self.assertEqual(Bill.objects.aggregate(total=Sum('leave_days_approved'))['total'], approved_days)
+        self.assertEqual(
+            MealRatingDaily.objects.aggregate(total=Sum('score_total'))['total'],
+            MealRating.objects.aggregate(total=Sum('rating_score'))['total'],
+        )
+
+    def test_command_refuses_to_reuse_a_prefix(self):
+        out = StringIO()
+        call_command('seed_benchmark_data', students=2, years=1, prefix='cmd', stdout=out)
+        self.assertIn('Created 2 students, ', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark_data', students=2, years=1, prefix='cmd', stdout=out)
+
+
+class SingleThreadedLiveServerThread(LiveServerThread):
+    # Only the server thread shares the test's in-memory database connection;
+    # request threads would open their own and hit shared-cache table locks
+    def _create_server(self):
+        return WSGIServer((self.host, self.port), QuietWSGIRequestHandler, allow_reuse_address=False)
+
+
+class MealRushLoadTests(LiveServerTestCase):
+    server_thread_class = SingleThreadedLiveServerThread
+
+    def setUp(self):
+        # User ids are reused after the flush: start without earlier tests' throttle counters
+        cache.clear()
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+
+    def test_percentiles_use_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, pct) for pct in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertIsNone(percentile([], 50))
+
+    def test_short_rush_against_live_server(self):
+        seed_benchmark_data(students=4, years=1, prefix='rush', rating_share=0)
+        report = run_meal_rush(self.live_server_url, students=4, duration=1.5, ramp_up=0.2, poll_interval=0.3, rating_share=1, prefix='rush')
+
+        endpoints = report['endpoints']
+        self.assertEqual(endpoints['student_dashboard']['requests'], 4)
+        self.assertEqual(endpoints['meal_rating']['statuses'], {302: 4})
+        self.assertGreater(endpoints['data_endpoint']['requests'], 4)
+        self.assertEqual(sum(row['error_rate'] for row in endpoints.values()), 0)
+        self.assertEqual(MealRating.objects.filter(rating_date=date.today()).count(), 4)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Checks the SQLite connection tuning")
+class SQLiteTuningTests(TestCase):
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            for pragma in ('synchronous', 'busy_timeout'):
+                cursor.execute(f"PRAGMA {pragma}")
+                # synchronous reads back as a number (NORMAL = 1)
+                expected = {'normal': 1}.get(settings.SQLITE_PRAGMAS[pragma], settings.SQLITE_PRAGMAS[pragma])
+                self.assertEqual(cursor.fetchone()[0], expected, pragma)
+
+    def test_broken_persistent_connections_are_dropped_before_requests(self):
+        broken = mock.Mock(connection=object(), settings_dict={'CONN_MAX_AGE': 600}, **{'is_usable.return_value': False})
+        fresh = mock.Mock(connection=None, settings_dict={'CONN_MAX_AGE': 600})
+        with mock.patch('mess_app.signals.connections') as all_connections:
+            all_connections.all.return_value = [broken, fresh]
+            request_started.send(sender=None)
+        broken.close.assert_called_once_with()
+        fresh.close.assert_not_called()
+
+    def test_file_database_uses_wal_and_immediate_transactions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tuning.sqlite3')
+            sqlite3.connect(path).execute("CREATE TABLE t (id INTEGER)")
+            with open(path, 'rb') as f:
+                header = f.read(100)
+            db = SQLiteDatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias='tuning')
+            try:
+                with db.cursor() as cursor:
+                    cursor.execute("PRAGMA mmap_size")
+                    self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['mmap_size'])
+                # Connecting leaves the file alone (a tracked database stays clean)...
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(100), header)
+
+                # ...and the migration switches it to WAL for good
+                import_module('mess_app.migrations.0015_sqlite_wal_mode').enable_wal_mode(None, mock.Mock(connection=db))
+                with db.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+
+                # An atomic block holds the write lock from its first statement on
+                db.set_autocommit(True)
+                db._start_transaction_under_autocommit()
+                other = sqlite3.connect(path, timeout=0)
+                with self.assertRaisesRegex(sqlite3.OperationalError, 'locked'):
+                    other.execute("BEGIN IMMEDIATE")
+                other.close()
+                db.connection.rollback()
+            finally:
+                db.close()
+
+    def test_immediate_transactions_are_pinned_to_django_3_2(self):
+        db = SQLiteDatabaseWrapper({**connection.settings_dict, 'NAME': ':memory:'}, alias='pinned')
+        with mock.patch('django.VERSION', (5, 1, 0, 'final', 0)):
+            with self.assertRaisesMessage(ImproperlyConfigured, "transaction_mode"):
+                db.ensure_connection()
+        db.close()
@@ -0,0 +1,98 @@
+"""
+Request throttling with fixed-window counters.
+
+Each client gets a counter per throttled view and time window, kept in the
+settings.THROTTLE_CACHE_ALIAS cache: every request increments it, and once
+it passes the view's `requests` limit the rest of the `seconds`-long window
+is refused with 429 Too Many Requests and a Retry-After header (seconds
+until the window ends), before the view touches the database. Signed-in users are keyed by
+user id, anonymous clients by IP address, so a hostel full of students
+behind one NAT address do not share a counter.
+
+This is a fixed-window approximation of a token bucket: a client may get up
+to twice the limit across a window boundary, which is fine for shielding
+SQLite from runaway tabs and scripts, and it needs only two atomic cache
+operations per request. The counter is created with add() and bumped with
+incr(), both atomic in the shared file cache (mess_app/cache_backends.py) and
+in Memcached, so a parallel burst cannot slip through on a stale read, and
+since that cache is shared every worker process counts against one limit.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+
+def client_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def count_request(key, limit, seconds, now=None):
+    """
+    Counts a request against `key`'s current window. Returns 0 while the
+    window has seen at most `limit` requests, otherwise the seconds until the
+    window ends.
+    """
+    now = time.time() if now is None else now
+    window_start = now // seconds * seconds
+    window_key = f'{key}:{int(window_start)}'
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+    cache.add(window_key, 0, timeout=seconds + 1)
+    try:
+        count = cache.incr(window_key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(window_key, 1, timeout=seconds + 1)
+        count = 1
+    if count <= limit:
+        return 0
+    return window_start + seconds - now
+
+
+def wants_json(request):
+    return (
+        request.method != 'POST'
+        or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('Accept', '')
+    )
+
+
+class ThrottleMiddleware:
+    """
+    Applies settings.THROTTLE_RATES (by URL name) to incoming requests. Must
+    come after AuthenticationMiddleware and MessageMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        rate = settings.THROTTLE_RATES.get(url_name)
+        if not settings.THROTTLE_ENABLED or rate is None or request.method not in rate.get('methods', ('GET', 'POST')):
+            return None
+
+        wait = count_request(f'messnet:throttle:{url_name}:{client_key(request)}', rate['requests'], rate['seconds'])
+        if not wait:
+            return None
+
+        retry_after = max(1, math.ceil(wait))
+        message = f'Too many requests. Try again in {retry_after} seconds.'
+        if not wants_json(request):
+            # A plain form submission: back to the page, with the reason on it
+            messages.error(request, message)
+            return redirect(request.get_full_path())
+
+        response = JsonResponse({'status': 'error', 'message': message}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -10,6 +10,16 @@ urlpatterns = [
     
     path('student-dashboard/', views.student_dashboard, name='student_dashboard'),
     path('', views.student_dashboard, name='home'), 
+    # Dashboard modules as HTML fragments, fetched by script.js when their tab is opened
+    path('student-dashboard/modules/<slug:module>/', views.dashboard_module, name='dashboard_module'),
     
     path('data-endpoint/', views.data_endpoint, name='data_endpoint'), 
+
+    # Paginated lists (keyset cursors), fetched on demand by script.js
+    path('api/leave-history/', views.leave_history, name='leave_history'),
+    path('api/bill-history/', views.bill_history, name='bill_history'),
+    path('api/lost-found/', views.lost_found_list, name='lost_found_list'),
+
+    # Dashboard cache hit rates, for staff
+    path('api/cache-stats/', views.cache_stats, name='cache_stats'),
 ]
\ No newline at end of file
@@ -1,31 +1,79 @@
-from twilio.rest import Client 
-from django.conf import settings 
-import logging
+from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+import threading
 
-logger = logging.getLogger(__name__)
+TWILIO_API_ROOT = 'https://api.twilio.com'
 
-def send_whatsapp_notification(recipient_number, message_body):
+
+class LocalTwilioHttpClient(TwilioHttpClient):
     """
-    Sends a WhatsApp message via Twilio.
-    Returns True if successful, False otherwise.
+    Redirects Twilio API calls to settings.TWILIO_API_BASE_URL,
+    e.g. a local fake server used by the tests and benchmarks.
     """
-    if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_WHATSAPP_NUMBER]):
-        logger.warning("Twilio API credentials are missing.")
-        return False
-
-    try:
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        
-        # Ensure the 'whatsapp:' prefix is added here so models.py doesn't need to worry about it
-        formatted_to = f"whatsapp:{recipient_number}"
-        
-        message = client.messages.create(
-            from_=settings.TWILIO_WHATSAPP_NUMBER, 
-            body=message_body,
-            to=formatted_to 
-        )
-        print(f"✅ Success! SID: {message.sid}")
-        return True
-    except Exception as e:
-        print(f"❌ Twilio Error: {e}")
-        return False
\ No newline at end of file
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(TWILIO_API_ROOT):
+            url = self.base_url + url[len(TWILIO_API_ROOT):]
+        return super().request(method, url, *args, **kwargs)
+
+
+def twilio_is_configured():
+    return all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_WHATSAPP_NUMBER])
+
+
+_client_lock = threading.Lock()
+_shared_client = None
+
+
+def _build_twilio_client():
+    if settings.TWILIO_API_BASE_URL:
+        http_client = LocalTwilioHttpClient(settings.TWILIO_API_BASE_URL, timeout=settings.TWILIO_TIMEOUT)
+    else:
+        http_client = TwilioHttpClient(timeout=settings.TWILIO_TIMEOUT)
+
+    # One keep-alive connection per broadcast thread, so fan-out never queues on the pool
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(settings.WHATSAPP_BROADCAST_WORKERS, 1))
+    http_client.session.mount('https://', adapter)
+    http_client.session.mount('http://', adapter)
+    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+
+
+def get_twilio_client():
+    """
+    Returns the Twilio client shared by the whole process.
+    Its pooled HTTP session keeps connections alive between sends, so only the
+    first message pays for the TCP/TLS handshake. Rebuilt if the settings change.
+    """
+    global _shared_client
+    config = (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_API_BASE_URL)
+    with _client_lock:
+        if _shared_client is None or _shared_client[0] != config:
+            _shared_client = (config, _build_twilio_client())
+        return _shared_client[1]
+
+
+def send_whatsapp_message(recipient_number, message_body):
+    """
+    Sends a WhatsApp message via Twilio and returns the message SID.
+    Raises on any failure so callers (e.g. the outbox worker) can retry.
+    """
+    if not twilio_is_configured():
+        raise ImproperlyConfigured("Twilio API credentials are missing.")
+
+    # Ensure the 'whatsapp:' prefix is added here so models.py doesn't need to worry about it
+    formatted_to = f"whatsapp:{recipient_number}"
+
+    message = get_twilio_client().messages.create(
+        from_=settings.TWILIO_WHATSAPP_NUMBER,
+        body=message_body,
+        to=formatted_to
+    )
+    return message.sid
+
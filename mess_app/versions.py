@@ -0,0 +1,67 @@
+"""
+Cheap change counters for cache keys and ETags.
+
+Every scope ('notifications', 'user:<id>', ...) has a version number kept in
+the settings.VERSION_CACHE_ALIAS cache. Signal handlers bump a scope when
+its data changes, so a reader can tell whether anything changed without
+touching the database. That cache is shared by all worker processes and
+does not cull: a lost counter is reseeded with a new value, which turns
+every ETag and cache key built on it into a miss.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal
+
+NOTIFICATIONS = 'notifications'
+MENU = 'menu'
+# Moved once per bill generation run, instead of once per student
+BILLS = 'bills'
+
+# Sent after commit with the list of `scopes` whose version just moved
+versions_changed = Signal()
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def _cache():
+    return caches[settings.VERSION_CACHE_ALIAS]
+
+
+def _key(scope):
+    return f'messnet:version:{scope}'
+
+
+def _new_version():
+    # Nanosecond clock: a counter that was evicted and re-seeded never repeats an old value
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    """Returns {scope: version}, seeding counters that are not in the cache yet."""
+    keys = {_key(scope): scope for scope in scopes}
+    found = _cache().get_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        _cache().set_many(missing, timeout=None)
+        found.update(missing)
+    return {scope: found[key] for key, scope in keys.items()}
+
+
+def bump_versions(*scopes):
+    """
+    Moves the given scopes to a new version once the current transaction
+    commits, so nobody caches old data under the new version.
+    """
+    if not scopes:
+        return
+
+    def apply():
+        _cache().set_many({_key(scope): _new_version() for scope in scopes}, timeout=None)
+        versions_changed.send(sender=None, scopes=scopes)
+
+    transaction.on_commit(apply)
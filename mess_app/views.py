@@ -1,20 +1,25 @@
-from django.shortcuts import render, redirect, get_object_or_404 
+from django.conf import settings
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test 
 from django.contrib.auth.views import LoginView 
 from django.urls import reverse 
-from django.db.models import Avg, Max 
 from django.contrib import messages 
-from django.http import JsonResponse 
+from django.http import JsonResponse, Http404
 from django.views.decorators.cache import never_cache 
-from datetime import date, datetime
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import condition, require_http_methods
+from django.contrib.admin.views.decorators import staff_member_required
+from datetime import date
 import calendar
 
 from .models import (
-    User, FoodMenu, LeaveRequest, Bill, Feedback, LostAndFound, AdminNotification, MealRating,
+    User, FoodMenu, LeaveRequest, Bill, LostAndFound, MealRatingDaily,
     WEEKDAYS 
 )
 from .forms import LeaveRequestForm, FeedbackForm, LostAndFoundForm, MealRatingForm, EmailOrUsernameAuthenticationForm 
-from .utils import send_whatsapp_notification
+from .caching import get_menu, get_active_notifications, get_student_snapshot, get_cache_stats, reset_cache_stats
+from .pagination import keyset_page, page_size_from, InvalidCursor
+from .versions import BILLS, MENU, NOTIFICATIONS, user_scope, get_versions
 
 def is_student(user):
     return user.role == User.STUDENT
@@ -36,25 +41,148 @@ class MessLoginView(LoginView):
 
 # --- Student Dashboard and Module Views---
 
+# Dashboard modules, in sidebar order, with the partial template each one renders
+DASHBOARD_MODULES = {
+    'dashboard': 'mess_app/modules/dashboard.html',
+    'menu': 'mess_app/modules/menu.html',
+    'leave': 'mess_app/modules/leave.html',
+    'bills': 'mess_app/modules/bills.html',
+    'feedback': 'mess_app/modules/feedback.html',
+    'lost-found': 'mess_app/modules/lost_found.html',
+}
+
+
+def menu_context():
+    """Today's meals and the weekly table, served from the cache until an admin edits the menu."""
+    today_day_num = str(date.today().weekday())
+    menu = get_menu()
+    menu_by_day_meal = menu['by_day']
+
+    menu_today = [
+        {'meal_name': meal_name, 'menu_details': menu_by_day_meal[today_day_num][meal_code]}
+        for meal_code, meal_name in FoodMenu.MEAL_CHOICES
+        if meal_code in menu_by_day_meal.get(today_day_num, {})
+    ]
+
+    weekly_menu_table = []
+    for day_num, day_name in WEEKDAYS:
+        day_menu = menu_by_day_meal.get(day_num, {})
+        weekly_menu_table.append({
+            'day_num': day_num,
+            'day_name': day_name,
+            'is_today': day_num == today_day_num,
+            'B': day_menu.get('B', 'N/A'),
+            'L': day_menu.get('L', 'N/A'),
+            'D': day_menu.get('D', 'N/A'),
+        })
+
+    return {
+        'menu_today': menu_today,
+        'weekly_menu_table': weekly_menu_table,
+        'latest_menu_update': menu['updated_at'],
+        'today_day_name': calendar.day_name[int(today_day_num)],
+        'today_day_num': today_day_num,
+    }
+
+
+def fragment_cache_context():
+    """
+    Keys for the {% cache %} blocks around the menu and notification panels:
+    the same version counters admin edits bump, so a cached fragment is never stale.
+    """
+    versions = get_versions(MENU, NOTIFICATIONS)
+    return {
+        'cache_timeout': settings.MESS_CACHE_TIMEOUT,
+        'menu_version': versions[MENU],
+        'notifications_version': versions[NOTIFICATIONS],
+    }
+
+
+def dashboard_module_context(user):
+    menu = menu_context()
+    # Cached until the student's bills, leaves or ratings change
+    snapshot = get_student_snapshot(user.pk)
+    return {
+        'latest_bill': snapshot['latest_bill'],
+        'pending_leaves_count': snapshot['pending_leaves_count'],
+        'latest_leave_status': snapshot['latest_leave_status'],
+        # Cached until an admin edits them
+        'admin_notifications': get_active_notifications(),
+        'menu_today': menu['menu_today'],
+        'today_day_name': menu['today_day_name'],
+        'today_day_num': menu['today_day_num'],
+        'latest_menu_update': menu['latest_menu_update'],
+        **fragment_cache_context(),
+    }
+
+
+def menu_module_context(user):
+    return {**menu_context(), **fragment_cache_context(), 'meal_choices': FoodMenu.MEAL_CHOICES}
+
+
+def feedback_module_context(user):
+    # Read from the running daily totals (at most one row per meal)
+    today_average_rating = MealRatingDaily.average_for(date.today())
+    return {
+        'rated_meals_today': get_student_snapshot(user.pk)['rated_meals_today'],
+        'meal_choices': FoodMenu.MEAL_CHOICES,
+        'today_average_rating': round(today_average_rating, 2) if today_average_rating else 'N/A',
+        'today_day_name': calendar.day_name[date.today().weekday()],
+    }
+
+
+# The data each module needs beyond its forms. Leave history, bill history and
+# the Lost & Found list are paged in by script.js from the history endpoints below.
+MODULE_CONTEXT = {
+    'dashboard': dashboard_module_context,
+    'menu': menu_module_context,
+    'feedback': feedback_module_context,
+}
+
+# The (unbound) forms each module shows
+MODULE_FORMS = {
+    'leave': {'leave_form': LeaveRequestForm},
+    'feedback': {'feedback_form': FeedbackForm, 'meal_rating_form': MealRatingForm},
+    'lost-found': {'lost_found_form': LostAndFoundForm},
+}
+
+
+def module_context(request, module, bound_forms=None):
+    """Everything the `module` partial renders: its data plus its forms (`bound_forms` win)."""
+    context = {'profile': request.user, 'initial_module': module}
+    context_func = MODULE_CONTEXT.get(module)
+    if context_func:
+        context.update(context_func(request.user))
+    for name, form_class in MODULE_FORMS.get(module, {}).items():
+        context[name] = form_class()
+    context.update(bound_forms or {})
+    return context
+
+
 @login_required
 @user_passes_test(is_student)
 @never_cache
+@ensure_csrf_cookie
 def student_dashboard(request):
+    """
+    The portal shell. Only the active module (?module=, default 'dashboard')
+    is rendered and queried; script.js fetches the other modules from
+    dashboard_module the first time their tab is opened. The CSRF cookie is
+    set here because the forms of those modules only arrive later.
+    """
     user = request.user
-    
-    # --- 1. Form Initialization and Processing ---
-    
+    bound_forms = {}
+    initial_module = request.GET.get('module') or 'dashboard'
+    if initial_module not in DASHBOARD_MODULES:
+        initial_module = 'dashboard'
+
+    # --- 1. Form Processing (only the submitted form is bound) ---
+
     if request.method == 'POST':
         form_action = request.POST.get('form_action')
-        
-        leave_form = LeaveRequestForm(request.POST)
-        feedback_form = FeedbackForm(request.POST)
-        lost_found_form = LostAndFoundForm(request.POST)
-        meal_rating_form = MealRatingForm(request.POST) 
-        
-        initial_module = request.GET.get('module') or 'dashboard' 
 
         if form_action == 'leave':
+            leave_form = LeaveRequestForm(request.POST)
             if leave_form.is_valid():
                 leave = leave_form.save(commit=False)
                 leave.student = user
@@ -63,20 +191,24 @@ def student_dashboard(request):
                 return redirect(reverse('student_dashboard') + '?module=leave')
             else:
                 initial_module = 'leave'
+                bound_forms = {'leave_form': leave_form}
                 messages.error(request, "Error submitting leave request. Please check the dates and provide a reason.")
-        
+
         elif form_action == 'feedback':
+            feedback_form = FeedbackForm(request.POST)
             if feedback_form.is_valid():
                 feedback = feedback_form.save(commit=False)
-                feedback.student = user 
+                feedback.student = user
                 feedback.save()
                 messages.success(request, "Feedback submitted successfully! Thank you for your input.")
                 return redirect(reverse('student_dashboard') + '?module=feedback')
             else:
                 initial_module = 'feedback'
+                bound_forms = {'feedback_form': feedback_form}
                 messages.error(request, "Error submitting feedback. Please ensure your comments are valid.")
 
         elif form_action == 'lost_found':
+            lost_found_form = LostAndFoundForm(request.POST)
             if lost_found_form.is_valid():
                 item = lost_found_form.save(commit=False)
                 item.reporter = user
@@ -85,177 +217,195 @@ def student_dashboard(request):
                 return redirect(reverse('student_dashboard') + '?module=lost-found')
             else:
                 initial_module = 'lost-found'
+                bound_forms = {'lost_found_form': lost_found_form}
                 messages.error(request, "Error submitting Lost & Found report. Please check all mandatory fields.")
-        
-        elif form_action == 'meal_rating': 
+
+        elif form_action == 'meal_rating':
+            meal_rating_form = MealRatingForm(request.POST)
             if meal_rating_form.is_valid():
                 rating = meal_rating_form.save(commit=False)
                 rating.student = user
-                rating.rating_date = date.today() 
+                rating.rating_date = date.today()
                 rating.save()
                 messages.success(request, f"{rating.get_meal_type_display()} rating submitted successfully!")
-                return redirect(reverse('student_dashboard') + '?module=feedback') 
+                return redirect(reverse('student_dashboard') + '?module=feedback')
             else:
-                initial_module = 'feedback' 
+                initial_module = 'feedback'
+                bound_forms = {'meal_rating_form': meal_rating_form}
                 messages.error(request, "Error submitting meal rating. Please ensure you have selected a score.")
-    else:
-        leave_form = LeaveRequestForm()
-        feedback_form = FeedbackForm()
-        lost_found_form = LostAndFoundForm()
-        meal_rating_form = MealRatingForm()
-        initial_module = request.GET.get('module') or 'dashboard' 
-
 
-    # --- 2. Data Fetching for All Modules ---
-    
-    # A. Menu Data & Update Status
-    today_day_num = str(date.today().weekday())
-    today_day_name = calendar.day_name[int(today_day_num)]
-    
-    menu_today = FoodMenu.objects.filter(day_of_week=today_day_num).order_by('meal_type')
-    latest_menu_update = FoodMenu.objects.aggregate(Max('updated_at'))['updated_at__max']
+    # --- 2. The Shell plus the Active Module ---
 
-    menu_all = FoodMenu.objects.all().order_by('day_of_week', 'meal_type') 
-    
-    menu_by_day_meal = {}
-    for menu_item in menu_all:
-        day_key = menu_item.day_of_week 
-        meal_key = menu_item.meal_type 
-        if day_key not in menu_by_day_meal:
-            menu_by_day_meal[day_key] = {}
-        menu_by_day_meal[day_key][meal_key] = menu_item.menu_details
-
-    WEEKDAY_CHOICES = WEEKDAYS 
-    weekly_menu_table = []
-    
-    for day_num, day_name in WEEKDAY_CHOICES:
-        day_menu = menu_by_day_meal.get(day_num, {})
-        weekly_menu_table.append({
-            'day_num': day_num,
-            'day_name': day_name,
-            'is_today': day_num == today_day_num,
-            'B': day_menu.get('B', 'N/A'),
-            'L': day_menu.get('L', 'N/A'),
-            'D': day_menu.get('D', 'N/A'),
-        })
-
-    # B. Leave Status
-    leave_history = LeaveRequest.objects.filter(student=user).order_by('-requested_on')
-    pending_leaves_count = leave_history.filter(status='P').count()
-    latest_leave = leave_history.first()
-    
-    # C. Bill Status
-    bill_history = Bill.objects.filter(student=user).order_by('-month')
-    latest_bill = bill_history.first()
-    
-    # D. Feedback & Lost & Found
-    overall_rating = 'N/A' 
-    lost_found_items = LostAndFound.objects.filter(is_approved=True).order_by('-posted_on')
-    
-    # E. Latest Admin Notifications
-    admin_notifications = AdminNotification.objects.filter(is_active=True).order_by('-created_at')[:5]
-
-    # F. Meal Rating Data 
-    rated_meals_today = MealRating.objects.filter(
-        student=user,
-        rating_date=date.today()
-    ).values_list('meal_type', flat=True)
-    today_average_rating = MealRating.objects.filter(rating_date=date.today()).aggregate(Avg('rating_score'))['rating_score__avg']
-
-
-    # --- 3. Context Preparation ---
-
-    context = {
-        'profile': user,
-        'initial_module': initial_module, 
-        
-        # Dashboard Stats
-        'latest_bill': latest_bill,
-        'pending_leaves_count': pending_leaves_count,
-        'latest_menu_update': latest_menu_update,
-        'admin_notifications': admin_notifications, 
-        
-        # Module Data
-        'menu_today': menu_today, 
-        'weekly_menu_table': weekly_menu_table, 
-        'today_day_name': today_day_name,
-        'today_day_num': today_day_num,
-        'bill_history': bill_history,
-        'leave_history': leave_history,
-        'latest_leave': latest_leave,
-        'overall_rating': overall_rating, 
-        'lost_found_items': lost_found_items,
-        
-        # Meal Rating Context
-        'rated_meals_today': list(rated_meals_today),
-        'meal_choices': FoodMenu.MEAL_CHOICES,
-        'today_average_rating': round(today_average_rating, 2) if today_average_rating else 'N/A',
-        
-        # Forms
-        'leave_form': leave_form,
-        'feedback_form': feedback_form,
-        'lost_found_form': lost_found_form,
-        'meal_rating_form': meal_rating_form,
-    }
-    
+    context = module_context(request, initial_module, bound_forms)
     response = render(request, 'mess_app/student_dashboard.html', context)
-    
+
     response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response['Pragma'] = 'no-cache'
     response['Expires'] = '0'
-    
+
     return response
 
 
-# --- JSON ENDPOINT FOR REAL-TIME POLLING ---
-# In your views.py, update the data_endpoint function:
 @login_required
 @user_passes_test(is_student)
 @never_cache
-def data_endpoint(request):
-    user = request.user
+def dashboard_module(request, module):
+    """One module of the dashboard as an HTML fragment, injected by script.js when its tab is opened."""
+    if module not in DASHBOARD_MODULES:
+        raise Http404("Unknown dashboard module.")
+    return render(request, DASHBOARD_MODULES[module], module_context(request, module))
+
+
+# --- JSON ENDPOINT FOR REAL-TIME POLLING ---
+
+# Bump when the shape of the payload changes so old ETags stop matching
+DASHBOARD_DATA_FORMAT = 1
 
-    # 1. FIX: Changed 'order_where' to 'order_by' and used .first() 
-    # This ensures a single object is returned for the JSON response.
-    latest_bill = Bill.objects.filter(student=user).order_by('-month').first()
-    pending_leaves_count = LeaveRequest.objects.filter(student=user, status='P').count()
-    latest_leave = LeaveRequest.objects.filter(student=user).order_by('-requested_on').first()
-    
-    # 2. Fetch data for other dashboard elements
-    pending_leaves_count = LeaveRequest.objects.filter(student=user, status='P').count()
 
-    # 3. FIX: Safely handle cases where no leave requests exist
-    latest_leave = LeaveRequest.objects.filter(student=user).order_by('-requested_on').first()
-    latest_leave_status_code = latest_leave.status if latest_leave else 'N'
+def dashboard_version(user_id):
+    """
+    Version token of the live dashboard data, built from the student's own
+    change counter and the global notifications and bill generation counters.
+    Costs no database query.
+    """
+    versions = get_versions(user_scope(user_id), NOTIFICATIONS, BILLS)
+    return f"{DASHBOARD_DATA_FORMAT}-{versions[user_scope(user_id)]}-{versions[NOTIFICATIONS]}-{versions[BILLS]}"
 
-    # 4. Fetch notifications
-    notifications = AdminNotification.objects.filter(is_active=True).order_by('-created_at')[:3]
+
+def dashboard_data_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return dashboard_version(request.user.pk)
+
+
+def build_dashboard_data(user):
+    """The live parts of the dashboard: latest bill, leave status and notifications."""
+    snapshot = get_student_snapshot(user.pk)
+    latest_bill = snapshot['latest_bill']
+    notifications = get_active_notifications()[:3]
 
     bill_data = {}
     if latest_bill:
         bill_data = {
-            'amount': str(latest_bill.total_amount),
-            # 5. FIX: Added safety check for empty date fields to prevent strftime crash
-            'due_date': latest_bill.last_date_of_payment.strftime('%b %d, %Y') if latest_bill.last_date_of_payment else 'N/A',
-            'status': latest_bill.get_status_display(),
-            'status_code': latest_bill.status,
+            'amount': str(latest_bill['total_amount']),
+            # Safety check for empty date fields to prevent strftime crash
+            'due_date': latest_bill['last_date_of_payment'].strftime('%b %d, %Y') if latest_bill['last_date_of_payment'] else 'N/A',
+            'status': latest_bill['status_display'],
+            'status_code': latest_bill['status'],
         }
 
     notifications_data = [
-        {'message': notif.message, 'date': notif.created_at.strftime('%d %b')}
+        {'message': notif['message'], 'date': notif['created_at'].strftime('%d %b')}
         for notif in notifications
     ]
 
+    return {
+        'bill': bill_data,
+        'pending_leaves': snapshot['pending_leaves_count'],
+        'latest_leave_status': snapshot['latest_leave_status'],
+        'notifications': notifications_data,
+    }
+
+
+@login_required
+@user_passes_test(is_student)
+@never_cache
+@condition(etag_func=dashboard_data_etag)
+def data_endpoint(request):
+    """
+    Polled by script.js every few seconds. Clients send back the ETag they got,
+    and get an empty 304 Not Modified while nothing they display has changed.
+    """
+    return JsonResponse({
+        'status': 'success',
+        'dashboard': build_dashboard_data(request.user),
+    })
+
+
+# --- PAGINATED HISTORY ENDPOINTS (loaded by script.js when a module is opened) ---
+
+def paginated_json(request, queryset, order_field, serialize):
+    """One keyset page of `queryset` as JSON: {'results': [...], 'next_cursor': ...}."""
+    try:
+        rows, next_cursor = keyset_page(queryset, order_field, request.GET.get('cursor'), page_size_from(request))
+    except InvalidCursor:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor.'}, status=400)
+
     return JsonResponse({
         'status': 'success',
-        'dashboard': {
-            'bill': bill_data,
-            'pending_leaves': pending_leaves_count,
-            'latest_leave_status': latest_leave_status_code, 
-            'notifications': notifications_data,
-        }
+        'results': [serialize(row) for row in rows],
+        'next_cursor': next_cursor,
     })
 
-# Manual override for extra safety
-    response['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-    return response
\ No newline at end of file
+
+@login_required
+@user_passes_test(is_student)
+@never_cache
+def leave_history(request):
+    return paginated_json(
+        request,
+        LeaveRequest.objects.filter(student=request.user),
+        'requested_on',
+        lambda req: {
+            'from_date': req.from_date.strftime('%d %b'),
+            'to_date': req.to_date.strftime('%d %b'),
+            'reason': req.reason,
+            'status': req.status,
+        },
+    )
+
+
+@login_required
+@user_passes_test(is_student)
+@never_cache
+def bill_history(request):
+    return paginated_json(
+        request,
+        Bill.objects.filter(student=request.user),
+        'month',
+        lambda bill: {
+            'month': bill.month.strftime('%B %Y'),
+            'total_amount': str(bill.total_amount),
+            'adjustment_amount': str(bill.adjustment_amount),
+            'leave_days_approved': bill.leave_days_approved,
+            'due_date': bill.last_date_of_payment.strftime('%d %b, %Y'),
+            'status': bill.status,
+        },
+    )
+
+
+@login_required
+@user_passes_test(is_student)
+@never_cache
+def lost_found_list(request):
+    return paginated_json(
+        request,
+        LostAndFound.objects.filter(is_approved=True).select_related('reporter'),
+        'posted_on',
+        lambda item: {
+            'item_name': item.item_name,
+            'type': item.type,
+            'type_display': item.get_type_display(),
+            'reporter': item.reporter.username if item.reporter else '',
+            'description': item.description,
+            'date_event': item.date_event.strftime('%d %b, %Y'),
+            'place_event': item.place_event,
+        },
+    )
+
+
+# --- CACHE STATISTICS (staff only) ---
+
+@staff_member_required
+@never_cache
+@require_http_methods(['GET', 'POST'])
+def cache_stats(request):
+    """
+    Hit and miss counts of the dashboard caches since the last reset, as kept
+    in the default cache: across all worker processes when that cache is
+    shared (e.g. Memcached), otherwise those of the worker that answers.
+    POST resets the counters, e.g. to measure one rush.
+    """
+    if request.method == 'POST':
+        reset_cache_stats()
+    return JsonResponse({'status': 'success', 'caches': get_cache_stats()})
@@ -1,7 +1,19 @@
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mess_management_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from mess_app.sse import dashboard_events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Long-lived SSE streams bypass Django's request cycle so they hold no worker thread
+    if scope['type'] == 'http' and scope['path'] == settings.SSE_DASHBOARD_PATH:
+        await dashboard_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
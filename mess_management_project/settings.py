@@ -20,29 +20,41 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # runserver leaves static files to WhiteNoise too, so development serves them like production
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
      
     'mess_app', # <--- MY APPLICATION
 ]
 
 MIDDLEWARE = [
+    'mess_app.instrumentation.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'mess_app.throttling.ThrottleMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'mess_management_project.urls'
 
+# Templates are parsed once per process and kept in memory unless DEBUG is on
+# (where edits must show up without a restart)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'], 
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -57,13 +69,89 @@ WSGI_APPLICATION = 'mess_management_project.wsgi.application'
 
 
 # Database
-# Using SQLite
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default. For production set DB_ENGINE=postgresql plus DB_NAME, DB_USER,
+# DB_PASSWORD, DB_HOST and DB_PORT (psycopg2-binary is in requirements.txt).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'messnet'),
+            'USER': os.environ.get('DB_USER', 'messnet'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Keep connections open between requests instead of reconnecting every time
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        }
     }
+
+# Check persistent connections before each request and drop broken ones
+# (Django 3.2 has no CONN_HEALTH_CHECKS; see mess_app/signals.py)
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Applied to every new SQLite connection (mess_app/signals.py). The busy timeout
+# makes concurrent writers wait for the lock instead of failing with "database
+# is locked". WAL mode, which lets readers and the single writer work at the same
+# time, is stored in the database file, so migration 0015 turns it on once;
+# setting it on every connection rewrote the file header on every manage.py run.
+SQLITE_PRAGMAS = {
+    'synchronous': 'normal',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 20000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+}
+# Start SQLite transactions (atomic blocks) with BEGIN IMMEDIATE so concurrent
+# read-then-write transactions queue on the busy timeout instead of failing
+SQLITE_IMMEDIATE_TRANSACTIONS = os.environ.get('SQLITE_IMMEDIATE_TRANSACTIONS', 'True') == 'True'
+
+
+# Cache
+# 'default' holds data that is keyed by a version counter (menu, notifications,
+# student snapshots, template fragments) plus throttle buckets and hit/miss
+# stats. It is local to each process unless CACHE_BACKEND names a shared one:
+#   CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache CACHE_LOCATION=127.0.0.1:11211
+# 'shared' holds what every worker must agree on: the version counters. An
+# evicted counter is reseeded with a new value, which changes every ETag and
+# cache key built on it. It defaults to files under BASE_DIR/var/shared-cache
+# (mess_app/cache_backends.py), which every process on the host sees, cron
+# jobs and the notification worker included; it never evicts a live entry
+# and sweeps expired ones every SHARED_CACHE_SWEEP_INTERVAL seconds. Keep
+# SHARED_CACHE_LOCATION out of /tmp: the entries are pickles. With workers on
+# several hosts, use a Memcached server that does not evict:
+#   SHARED_CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache SHARED_CACHE_LOCATION=127.0.0.1:11211
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'messnet'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 20000))},
+    },
+    'shared': {
+        'BACKEND': os.environ.get('SHARED_CACHE_BACKEND', 'mess_app.cache_backends.SharedFileCache'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', str(BASE_DIR / 'var' / 'shared-cache')),
+        'OPTIONS': {'SWEEP_INTERVAL': int(os.environ.get('SHARED_CACHE_SWEEP_INTERVAL', 300))},
+    },
 }
+# Cache alias of the version counters (mess_app/versions.py)
+VERSION_CACHE_ALIAS = 'shared'
+
+# Tests run against private caches, never the ones a running server uses
+TEST_RUNNER = 'mess_app.testing.TestRunner'
+
+# Lifetime of cached read-mostly data; edits invalidate entries long before this
+MESS_CACHE_TIMEOUT = int(os.environ.get('MESS_CACHE_TIMEOUT', 24 * 60 * 60))
 
 
 # Password validation
@@ -75,9 +163,27 @@ USE_TZ = True
 
 
 STATIC_URL = '/static/'
+# Project-wide assets, if any (the app's own live in mess_app/static); collectstatic fails on a missing directory
 STATICFILES_DIRS = [
-    BASE_DIR / "static", 
+    path for path in [BASE_DIR / "static"] if path.is_dir()
 ]
+# `manage.py collectstatic` copies every static file here for WhiteNoise to serve
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+# Outside DEBUG, collectstatic writes content-hashed copies (style.297933694194.css) plus gzip and Brotli
+# variants, and {% static %} links to the hashed names. WhiteNoise then sends those with
+# "Cache-Control: max-age=315360000, public, immutable", so a repeat visit requests no static files.
+# DEBUG keeps the plain names, which need no collectstatic run.
+STATICFILES_STORAGE = os.environ.get('STATICFILES_STORAGE', (
+    'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+    else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+))
+# With DEBUG, WhiteNoise serves straight from the app static directories and rescans them on each
+# request, so runserver and the tests need no collectstatic. Otherwise it indexes STATIC_ROOT once at
+# startup and warns if collectstatic has not been run.
+WHITENOISE_AUTOREFRESH = DEBUG
+WHITENOISE_USE_FINDERS = DEBUG
+# Unhashed files (e.g. favicon.ico at a fixed URL) are cached for this many seconds
+WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', 0 if DEBUG else 60 * 60))
 
 
 # Default primary key field typ
@@ -85,6 +191,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # 1. Custom User Model
 AUTH_USER_MODEL = 'mess_app.User'
+# Logs in by username or email with one query and one password hash (replaces ModelBackend)
+AUTHENTICATION_BACKENDS = ['mess_app.backends.EmailOrUsernameBackend']
 
 # 2. Login/Logout Redirects
 LOGIN_URL = '/login/'
@@ -97,10 +205,83 @@ TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 # Use the Twilio Sandbox WhatsApp number 
 TWILIO_WHATSAPP_NUMBER = os.environ.get('TWILIO_WHATSAPP_NUMBER')
+# Optional: send Twilio API calls to a local fake server instead of api.twilio.com
+TWILIO_API_BASE_URL = os.environ.get('TWILIO_API_BASE_URL')
+# Seconds to wait for one Twilio API call
+TWILIO_TIMEOUT = float(os.environ.get('TWILIO_TIMEOUT', 10))
+
+# Notification worker: concurrent senders and the messages-per-second cap (per worker process)
+WHATSAPP_BROADCAST_WORKERS = int(os.environ.get('WHATSAPP_BROADCAST_WORKERS', 8))
+WHATSAPP_MESSAGES_PER_SECOND = float(os.environ.get('WHATSAPP_MESSAGES_PER_SECOND', 20))
+
+# 4. Billing Defaults (used by the generate_bills command and admin action)
+MESS_BASE_RATE_PER_DAY = os.environ.get('MESS_BASE_RATE_PER_DAY', '100.00')
+# Days after the end of the month before a generated bill falls due
+MESS_BILL_DUE_DAYS = int(os.environ.get('MESS_BILL_DUE_DAYS', 10))
+
+# 5. Notification Outbox (delivered by the run_notification_worker command)
+NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', 5))
+# First retry waits this long; every further attempt doubles it (capped at one hour)
+NOTIFICATION_RETRY_BASE_SECONDS = int(os.environ.get('NOTIFICATION_RETRY_BASE_SECONDS', 30))
+
+# 6. Query Budgets: max SQL queries per request, by URL name (session and user lookups included),
+# either for every method or as {method: budget}.
+# QueryBudgetMiddleware logs a warning when a view goes over; the tests assert them.
+QUERY_BUDGETS = {
+    # Also covers the form POSTs, which write through MealRating.save() and friends
+    'student_dashboard': 10,
+    'home': 10,
+    'dashboard_module': 8,
+    # A student snapshot miss (after any change to their bills, leaves or ratings); a hit needs 2
+    'data_endpoint': 7,
+    'leave_history': 3,
+    'bill_history': 3,
+    'lost_found_list': 3,
+    # Admin changelists, one page: user, counts, rows (names annotated, not fetched per row), date hierarchy.
+    # GET only: a POST runs a bulk action, whose cost grows with the selection.
+    **{f'mess_app_{model}_changelist': {'GET': 6} for model in (
+        'user', 'foodmenu', 'leaverequest', 'feedback', 'bill', 'lostandfound', 'adminnotification',
+        'mealrating', 'mealratingdaily', 'outboundmessage',
+    )},
+}
+
+# 7. Live Dashboard Events (Server-Sent Events, served by asgi.py only)
+SSE_DASHBOARD_PATH = '/events/dashboard/'
+# Keep-alive interval; also how often a stream re-checks for changes made by other processes
+SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+
+# 8. Request Throttling: at most `requests` per `seconds` per user (or per IP when signed out),
+# by URL name. Over the limit, API calls get 429 with Retry-After and form posts a redirect with an error.
+# A fixed-window counter, not a token bucket: the count resets at the start of each window, so a
+# client can fit up to twice the limit into `seconds` across a window boundary. The counters live in
+# THROTTLE_CACHE_ALIAS, which every worker must share for the limit to hold across workers.
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', 'shared')
+THROTTLE_RATES = {
+    # The dashboard polls every 10 seconds; the margin covers reloads and several open tabs
+    'data_endpoint': {'requests': 20, 'seconds': 40},
+    # Leave, feedback, lost & found and meal rating submissions (form_action)
+    'student_dashboard': {'requests': 10, 'seconds': 30, 'methods': ('POST',)},
+    'home': {'requests': 10, 'seconds': 30, 'methods': ('POST',)},
+}
 
 
 # --- Session Control Settings---
 
+# Sessions are read from the cache and written through to the database
+# (cached_db), so a poll does not query django_session. Like the version
+# counters they live in the 'shared' cache, since a logout must reach every
+# worker. A per-process (locmem) session cache would keep a logged-out
+# session valid in the other workers, so with one the sessions are read from
+# the database on every request instead.
+SESSION_CACHE_ALIAS = os.environ.get('SESSION_CACHE_ALIAS', 'shared')
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', (
+    'django.contrib.sessions.backends.db' if CACHES[SESSION_CACHE_ALIAS]['BACKEND'].endswith('LocMemCache')
+    else 'django.contrib.sessions.backends.cached_db'
+))
+# Rows per transaction for `manage.py clear_expired_sessions`
+SESSION_CLEANUP_BATCH_SIZE = int(os.environ.get('SESSION_CLEANUP_BATCH_SIZE', 1000))
+
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False 
 
 SESSION_COOKIE_AGE = 604800 